@@ -1,28 +1,126 @@
+import sys
+import time
+_STARTUP_T0 = time.perf_counter() # --profile-startup measures from here
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # Device relay only: skip the GUI toolkits entirely (see engine.py for the options).
+    sys.argv.remove("--headless")
+    from engine import main
+    sys.exit(main())
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox, filedialog, font as tkFont
 import serial
-import serial.tools.list_ports
 import threading
-import time
-import pyautogui
-import json
 import os
 import random
 from collections import deque
-
-pyautogui.FAILSAFE = False
-PROFILES_DIR = "mouse_profiles"
-
-DEFAULT_SETTINGS = {
-    "HST": 360, "NMIN": 460, "NMAX": 550, "SPT": 600, "HPT": 700,
-    "JDZ": 20, "CSP": 10, "SAD": 150, "JMT": 5, "JFR": 100, "JCB": 20,
-    "JRC": 0.5, "JIR": 0.3, "JPA": 50,
-}
+from engine import (PROFILES_DIR, RECORDINGS_DIR, EVENT_STATUS, EVENT_PRESSURE, EVENT_CALIB,
+                    EVENT_JOY, EVENT_SERIAL_ERROR, EVENT_SETTING_CHANGED)
+from profiles import is_profile_database
+from sessions import SessionManager
+from ring_buffer import RingBuffer
+from cursor import CursorSampler, HotCornerMonitor
+from mouse_trail import MouseTrailRenderer, TRAIL_LINE
+from recording import REPLAY_PREFIX, RECORDING_EXTENSION
+from calibration import OnsetSegmenter
+from pressure_plot import PressurePlotRenderer, THRESHOLD_KEYS, STRATEGY_COORDS
+
+def _pyautogui():
+    # Imported on first use: it is slow to import and only the OSK hotkey still needs it.
+    import pyautogui
+    pyautogui.FAILSAFE = False
+    return pyautogui
+
+class UiPump:
+    # Serial and worker threads never touch Tk directly: they post the latest value (or a
+    # sample to append) here, and a single after() loop on the Tk thread hands each key to
+    # its handler at most once per tick. Superseded latest-values count as dropped redraws.
+    def __init__(self, root, rate_hz=30):
+        self.root = root; self.set_rate(rate_hz)
+        self._lock = threading.Lock()
+        self._latest = {}; self._samples = {}; self._handlers = {}
+        self._job = None; self._running = False
+        self.ticks = 0; self.redraws = 0; self.dropped_redraws = 0
+        self.queue_depth = 0; self.max_queue_depth = 0
+
+    def set_rate(self, rate_hz):
+        self.rate_hz = rate_hz; self.interval_ms = max(1, int(round(1000 / rate_hz)))
+
+    def register(self, key, handler):
+        self._handlers[key] = handler
+
+    def post_latest(self, key, value):
+        with self._lock:
+            if key in self._latest: self.dropped_redraws += 1
+            self._latest[key] = value
+
+    def post_sample(self, key, value):
+        with self._lock:
+            queue = self._samples.get(key)
+            if queue is None: self._samples[key] = [value]
+            else: queue.append(value)
+
+    def drain(self, key):
+        with self._lock: return self._samples.pop(key, [])
+
+    def start(self):
+        self._running = True
+        if self._job is None: self._job = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self, discard=True):
+        self._running = False
+        if self._job is not None:
+            self.root.after_cancel(self._job); self._job = None
+        if discard:
+            with self._lock: self._latest = {}; self._samples = {}
+
+    def summary(self):
+        return f"UI {self.rate_hz} Hz | q {self.queue_depth} (max {self.max_queue_depth}) | dropped redraws {self.dropped_redraws}"
+
+    def _tick(self):
+        self._job = None
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            samples, self._samples = self._samples, {}
+        self.ticks += 1
+        depth = sum(len(v) for v in samples.values())
+        self.queue_depth = depth
+        if depth > self.max_queue_depth: self.max_queue_depth = depth
+        for items in (samples, latest):
+            for key, value in items.items():
+                handler = self._handlers.get(key)
+                if handler is None: continue
+                try: handler(value); self.redraws += 1
+                except tk.TclError: pass
+                except Exception as e: print(f"UI pump handler '{key}' error: {e}")
+        if self._running and self._job is None: self._job = self.root.after(self.interval_ms, self._tick)
+
+class StartupProfiler:
+    # Per-phase wall time for --profile-startup; mark() closes the phase that just ran.
+    # Phases recorded after the report (lazy tabs, the port scan) are printed as they finish.
+    def __init__(self, t0=None, enabled=True):
+        self.enabled = enabled
+        self.t0 = self.last = time.perf_counter() if t0 is None else t0
+        self.phases = []; self.reported = False
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.record(name, now - self.last); self.last = now
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+        if self.enabled and self.reported: print(f"  {name:<32} {seconds * 1000:8.1f} ms")
+
+    def report(self):
+        if not self.enabled or self.reported: return
+        self.reported = True
+        print(f"Startup: {1000 * (time.perf_counter() - self.t0):.1f} ms to first paint")
+        for name, seconds in self.phases: print(f"  {name:<32} {seconds * 1000:8.1f} ms")
 
 class IntegratedMouthMouseApp:
-    def __init__(self, root_window):
+    def __init__(self, root_window, startup_profiler=None, profiles_location=PROFILES_DIR):
         self.root = root_window
+        self.startup = startup_profiler if startup_profiler is not None else StartupProfiler(enabled=False)
         self.root.title("Mouth Mouse Tuner, Trainer & Calibrator (CTk V7.2)")
         self.root.geometry("1050x850") # Can adjust if needed
 
@@ -42,20 +140,44 @@ class IntegratedMouthMouseApp:
         self.font_labelframe_title = ctk.CTkFont(family=base_font_family, size=12, weight="bold")
         # Using a slightly larger font for threshold labels for clarity
         self.font_canvas_threshold_text = tkFont.Font(family="Arial", size=9)
-
-
-        self.ser = None; self.is_connected = False; self.stop_read_thread = threading.Event()
+        self.startup.mark("fonts & theme")
+
+        # Every device has its own engine; self.engine is the one the GUI shows and controls.
+        self.sessions = SessionManager(profiles_location); self.DEFAULT_DEVICE_NAME = "Device 1"
+        self.engine = self.sessions.add(self.DEFAULT_DEVICE_NAME); self._engine_subscriptions = []
+        self.active_device_tkvar = tk.StringVar(value=self.DEFAULT_DEVICE_NAME)
+        self.use_binary_protocol_tkvar = tk.BooleanVar(value=False)
+        self.record_session_tkvar = tk.BooleanVar(value=False)
+        self.REPLAY_SPEEDS = {"1x": 1, "4x": 4, "16x": 16, "Max": 0} # "replay:<file>@<speed>", 0 = as fast as possible
+        self.replay_speed_tkvar = tk.StringVar(value="1x")
+        self.auto_reconnect_tkvar = tk.BooleanVar(value=True); self.engine.enable_auto_reconnect()
+        self.reader_stats_tkvar = tk.StringVar(value=""); self.READER_STATS_INTERVAL_MS = 1000; self._reader_stats_job = None
+        self.UI_REFRESH_HZ = 30
+        self.ui_pump = UiPump(self.root, self.UI_REFRESH_HZ)
+        self.ui_pump.register("calib", self._on_pump_calibration_samples)
+        self.ui_pump.register("pressure", self._on_pump_pressure)
+        self.ui_pump.register("joy", self._on_pump_joystick)
+        self.ui_pump.register("status", self.set_status)
+        self.ui_pump.register("serial_error", lambda _: self.handle_serial_error_disconnect())
+        self.ui_pump.register("settings", lambda changes: [self._set_param_tkvar(k, v) for k, v in changes])
+        self.ui_pump.register("hot_corner_move", lambda _: self.hot_corners.reschedule() if self.hot_corners is not None else None)
         self.params_tkvars = {}
-        for key, value in DEFAULT_SETTINGS.items():
+        for key, value in self.engine.settings.as_dict().items():
             if key in ["JRC", "JIR"]: self.params_tkvars[key] = tk.DoubleVar(value=value)
             else: self.params_tkvars[key] = tk.IntVar(value=value)
+        self._subscribe_to_engine()
         self.current_pressure_tkvar = tk.StringVar(value="Pressure: N/A")
         self.current_profile_name = tk.StringVar(value="<Default Settings>")
 
-        self.osk_open = False; self.OSK_ZONE_SIZE = 30; self.OSK_POLL_INTERVAL_MS = 100
-        try: self.screen_width,self.screen_height=pyautogui.size()
-        except Exception: self.screen_width,self.screen_height=1920,1080
-        self.pyautogui_left_button_down=False; self.pyautogui_right_button_down=False
+        self.osk_open = False; self.OSK_ZONE_SIZE = 30
+        self.HOT_CORNER_ACTIONS = {"bottom_left": "osk_open", "top_right": "osk_close", "top_left": None, "bottom_right": None}
+        self.HOT_CORNER_MIN_INTERVAL_MS = 50; self.HOT_CORNER_MAX_INTERVAL_MS = 1000; self.hot_corners = None
+        try: self.screen_width,self.screen_height=self.root.winfo_screenwidth(),self.root.winfo_screenheight()
+        except tk.TclError: self.screen_width,self.screen_height=1920,1080
+        self.host_pointer_tkvar = tk.BooleanVar(value=False)
+        self.live_updates_tkvar = tk.BooleanVar(value=True); self.engine.live_updates = True
+        self.track_drift_tkvar = tk.BooleanVar(value=False)
+        self.pointer_stats_tkvar = tk.StringVar(value="")
 
         self.trainer_score_display_var=tk.StringVar(value="Score: 0"); self.trainer_score_value=0
         self.trainer_target_hits=0; self.trainer_target_misses=0; self.trainer_target_active=False
@@ -67,37 +189,57 @@ class IntegratedMouthMouseApp:
         self.is_target_hit_and_waiting_for_respawn=False
         
         self.mouse_trail_points = deque(maxlen=20) 
-        self.mouse_trail_ids = []
-        self.TRAIL_UPDATE_INTERVAL_MS = 16 
-        self._mouse_trail_job_id = None
+        self.TRAIL_MODE = TRAIL_LINE # or TRAIL_FADE, see mouse_trail.py
+        self.mouse_trail_renderer = None; self.trail_color = self._get_trail_color()
+        self.TRAIL_UPDATE_INTERVAL_MS = 16; self.TRAINER_HOVER_INTERVAL_MS = 50
+        self.cursor_sampler = None
 
-        self.calibrating_action_name=tk.StringVar(value=""); self.calibration_samples=[]
+        self.CALIBRATION_SAMPLE_CAPACITY = 65536
+        self.calibrating_action_name=tk.StringVar(value=""); self.calibration_samples=RingBuffer(self.CALIBRATION_SAMPLE_CAPACITY)
         self.calibration_current_value_tkvar=tk.StringVar(value="Raw Pressure: ---")
-        self.is_calibrating_arduino_mode=False; self.collected_calibration_data={}; self._calibration_collect_job=None
-        self.pressure_history = []
+        self.is_calibrating_arduino_mode=False; self.collected_calibration_data={}
+        self.calibration_segmenter=None; self.calibration_repetitions=0
         self.pressure_canvas_min_width = 450 
         self.pressure_canvas_min_height = 450 
+        self.PRESSURE_PLOT_STRATEGY = STRATEGY_COORDS # or STRATEGY_SCROLL, see pressure_plot.py
+        self._pressure_canvas_size = (0, 0)
         
         self.pressure_label_area_width = 70 
         self._calculate_pressure_label_area_width() 
 
         self.max_history_points = self.pressure_canvas_min_width - self.pressure_label_area_width 
         if self.max_history_points <=0: self.max_history_points = 1 
+        self.pressure_history = RingBuffer(self.max_history_points)
         
         self.joystick_x_centered_tkvar = tk.IntVar(value=0); self.joystick_y_centered_tkvar = tk.IntVar(value=0)
         self.joystick_canvas_min_width = 200; self.joystick_canvas_min_height = 200
         self.joystick_indicator_id = None; self.joystick_deadzone_viz_id = None
         self.joystick_movethresh_viz_id = None
 
-        if not os.path.exists(PROFILES_DIR):
-            try: os.makedirs(PROFILES_DIR)
-            except OSError as e: print(f"Error creating profiles directory {PROFILES_DIR}: {e}")
+        if not is_profile_database(profiles_location) and not os.path.exists(profiles_location):
+            try: os.makedirs(profiles_location)
+            except OSError as e: print(f"Error creating profiles directory {profiles_location}: {e}")
 
+        self._port_scan = None
+        self.startup.mark("engine & state")
         self.create_main_layout()
+        self.startup.mark("main layout (first tab)")
         self.populate_ports(); self.populate_profiles_dropdown()
+        # The watcher thread only raises a flag; the dropdown is refreshed from a Tk timer.
+        self.PROFILE_REFRESH_MS = 1000; self._profiles_dirty = False
+        self.engine.profiles.on_change = self._on_profiles_changed; self.engine.profiles.start_watching()
+        self._profiles_job = self.root.after(self.PROFILE_REFRESH_MS, self._check_profiles)
         self.set_status("Disconnected. Select port and connect.")
-        self.schedule_osk_check()
         self.root.bind("<Configure>", self._on_window_resize)
+        self.cursor_sampler = CursorSampler(self.root, self._cursor_position, self.TRAIL_UPDATE_INTERVAL_MS)
+        try: ctk.AppearanceModeTracker.add(self._on_appearance_mode_changed) # "System" mode can flip at runtime
+        except Exception: pass
+        self._start_hot_corners()
+        self.startup.mark("profiles & cursor services")
+
+    def _cursor_position(self):
+        # Tk's own pointer query: same coordinate space as winfo_rootx(), no pyautogui import.
+        return self.root.winfo_pointerxy()
 
     def _calculate_pressure_label_area_width(self):
         if not hasattr(self, 'font_canvas_threshold_text') or not self.font_canvas_threshold_text:
@@ -151,16 +293,21 @@ class IntegratedMouthMouseApp:
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=5)
         self.tab_view = ctk.CTkTabview(self.root, command=self.on_tab_change)
         self.tab_view.pack(expand=True, fill='both', padx=10, pady=(5,10))
-        self.tab_view.add("Tuner & Profiles")
-        self.tab_view.add("Trainer")
-        self.tab_view.add("Calibrate Sensor")
-        self.tab_view.add("Stick Control")
-        self.create_tuner_widgets(self.tab_view.tab("Tuner & Profiles"))
-        self.create_trainer_widgets(self.tab_view.tab("Trainer"))
-        self.create_calibration_widgets(self.tab_view.tab("Calibrate Sensor"))
-        self.create_joystick_control_widgets(self.tab_view.tab("Stick Control"))
+        # Only the first tab is built here; the others on first selection (on_tab_change).
+        self.tab_builders = {"Tuner & Profiles": self.create_tuner_widgets, "Trainer": self.create_trainer_widgets,
+                             "Calibrate Sensor": self.create_calibration_widgets, "Stick Control": self.create_joystick_control_widgets}
+        self._built_tabs = set()
+        for tab_name in self.tab_builders: self.tab_view.add(tab_name)
+        self._ensure_tab_built("Tuner & Profiles")
         self.tab_view.set("Tuner & Profiles")
 
+    def _ensure_tab_built(self, tab_name):
+        if tab_name in self._built_tabs or tab_name not in self.tab_builders: return
+        self._built_tabs.add(tab_name)
+        start = time.perf_counter()
+        self.tab_builders[tab_name](self.tab_view.tab(tab_name))
+        self.startup.record(f"build tab '{tab_name}'", time.perf_counter() - start)
+
     def _create_labeled_frame(self, parent, title_text, **kwargs):
         fg_color_main = kwargs.pop("fg_color", None) 
         outer_frame = ctk.CTkFrame(parent, border_width=1, fg_color=fg_color_main, **kwargs)
@@ -173,13 +320,21 @@ class IntegratedMouthMouseApp:
     def create_connection_widgets(self, parent_frame):
         conn_lf_outer, conn_frame = self._create_labeled_frame(parent_frame, "Serial Connection")
         conn_lf_outer.pack(side=tk.LEFT, padx=5, pady=5, fill=tk.X)
+        ctk.CTkLabel(conn_frame, text="Device:", font=self.font_normal).pack(side=tk.LEFT, padx=(5,0), pady=5)
+        self.device_combo = ctk.CTkComboBox(conn_frame, variable=self.active_device_tkvar, values=self.sessions.names(), command=self.switch_device, width=120, state="readonly", font=self.font_normal); self.device_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        self.add_device_button = ctk.CTkButton(conn_frame, text="+", command=self.add_device, font=self.font_bold, width=30); self.add_device_button.pack(side=tk.LEFT, padx=(0,5), pady=5)
         ctk.CTkLabel(conn_frame, text="Port:", font=self.font_normal).pack(side=tk.LEFT, padx=(5,0), pady=5)
-        self.port_combo = ctk.CTkComboBox(conn_frame, width=180, state="readonly", font=self.font_normal); self.port_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        self.port_combo = ctk.CTkComboBox(conn_frame, width=180, state="readonly", command=self._on_port_selected, font=self.font_normal); self.port_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        self.replay_speed_combo = ctk.CTkComboBox(conn_frame, variable=self.replay_speed_tkvar, values=list(self.REPLAY_SPEEDS), width=70, state="disabled", font=self.font_normal); self.replay_speed_combo.pack(side=tk.LEFT, padx=(0,5), pady=5)
         self.connect_button = ctk.CTkButton(conn_frame, text="Connect", command=self.toggle_connect, font=self.font_bold, width=100); self.connect_button.pack(side=tk.LEFT, padx=5, pady=5)
         self.refresh_button = ctk.CTkButton(conn_frame, text="Refresh Ports", command=self.populate_ports, font=self.font_bold, width=120); self.refresh_button.pack(side=tk.LEFT, padx=5, pady=5)
+        self.binary_protocol_checkbox = ctk.CTkCheckBox(conn_frame, text="Binary", variable=self.use_binary_protocol_tkvar, font=self.font_normal, width=70); self.binary_protocol_checkbox.pack(side=tk.LEFT, padx=5, pady=5)
+        self.record_session_checkbox = ctk.CTkCheckBox(conn_frame, text="Record", variable=self.record_session_tkvar, font=self.font_normal, width=70); self.record_session_checkbox.pack(side=tk.LEFT, padx=5, pady=5)
+        self.auto_reconnect_checkbox = ctk.CTkCheckBox(conn_frame, text="Reconnect", variable=self.auto_reconnect_tkvar, command=self._on_auto_reconnect_toggled, font=self.font_normal, width=70); self.auto_reconnect_checkbox.pack(side=tk.LEFT, padx=5, pady=5)
         pressure_lf_outer, pressure_display_frame = self._create_labeled_frame(parent_frame, "Live Pressure (Avg)")
         pressure_lf_outer.pack(side=tk.LEFT, padx=10, pady=5, fill=tk.X, expand=True)
-        self.pressure_label = ctk.CTkLabel(pressure_display_frame, textvariable=self.current_pressure_tkvar, font=self.font_pressure); self.pressure_label.pack(padx=10, pady=(3,6))
+        self.pressure_label = ctk.CTkLabel(pressure_display_frame, textvariable=self.current_pressure_tkvar, font=self.font_pressure); self.pressure_label.pack(padx=10, pady=(3,0))
+        self.reader_stats_label = ctk.CTkLabel(pressure_display_frame, textvariable=self.reader_stats_tkvar, font=self.font_small, text_color=("gray30", "gray70")); self.reader_stats_label.pack(padx=10, pady=(0,3))
 
     def create_tuner_widgets(self, parent_tab):
         main_tuner_pane = ctk.CTkFrame(parent_tab, fg_color="transparent"); main_tuner_pane.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -204,7 +359,9 @@ class IntegratedMouthMouseApp:
         row_idx_col2=self.create_param_slider_widget(col2_frame, "Soft Action Delay ms (SAD):", self.params_tkvars["SAD"], "SAD", 0, 1000, row_idx_col2)
         col1_frame.columnconfigure(1, weight=1); col2_frame.columnconfigure(1, weight=1)
         self.apply_button = ctk.CTkButton(params_content_frame, text="Apply All Settings to Arduino", command=self.apply_all_settings, state=tk.DISABLED, font=self.font_bold)
-        self.apply_button.grid(row=max(row_idx_col1, row_idx_col2)+1, column=0, columnspan=2, pady=20, padx=5, sticky="ew") 
+        self.apply_button.grid(row=max(row_idx_col1, row_idx_col2)+1, column=0, columnspan=2, pady=(20,5), padx=5, sticky="ew") 
+        ctk.CTkCheckBox(params_content_frame, text="Send changes to the Arduino live while tuning", variable=self.live_updates_tkvar, command=self._on_live_updates_toggled, font=self.font_normal).grid(row=max(row_idx_col1, row_idx_col2)+2, column=0, columnspan=2, pady=(0,5), padx=5, sticky="w")
+        ctk.CTkCheckBox(params_content_frame, text="Follow sensor drift at rest (shifts the pressure thresholds, see drift.py)", variable=self.track_drift_tkvar, command=self._on_track_drift_toggled, font=self.font_normal).grid(row=max(row_idx_col1, row_idx_col2)+3, column=0, columnspan=2, pady=(0,15), padx=5, sticky="w")
         profile_lf_outer, profile_content_frame = self._create_labeled_frame(main_tuner_pane, "Profiles")
         profile_lf_outer.pack(padx=5, pady=10, fill=tk.X, side=tk.TOP)
         self.create_profile_widgets_content(profile_content_frame)
@@ -217,6 +374,9 @@ class IntegratedMouthMouseApp:
         slider.grid(row=row_idx+1, column=1, padx=5, pady=(5,0), sticky="ew")
         entry = ctk.CTkEntry(parent, textvariable=tk_var, width=50, font=self.font_normal)
         entry.grid(row=row_idx+1, column=2, padx=5, pady=(5,0))
+        # Typed values take effect on Enter or leaving the field, never per keystroke ("5" on the way to "530").
+        entry.bind("<Return>", lambda _, k=param_key: self._commit_param(k))
+        entry.bind("<FocusOut>", lambda _, k=param_key: self._commit_param(k))
         current_row = row_idx + 1 
         if desc_text:
             current_row +=1 
@@ -231,14 +391,12 @@ class IntegratedMouthMouseApp:
     def _slider_update_wrapper(self, value, tk_var_ref, param_key_ref, is_float_type):
         if is_float_type: tk_var_ref.set(round(value, 1))
         else: tk_var_ref.set(int(value))
+        self._commit_param(param_key_ref)
         if param_key_ref in ["JDZ", "JMT", "HST", "NMIN", "NMAX", "SPT", "HPT"]: 
             if hasattr(self, 'tab_view') and self.tab_view.winfo_exists():
                 current_tab = self.tab_view.get()
                 if current_tab == "Stick Control" and param_key_ref in ["JDZ", "JMT"]:
                     self._update_joystick_visualizer()
-                elif current_tab == "Calibrate Sensor" and param_key_ref in ["HST", "NMIN", "NMAX", "SPT", "HPT"]:
-                    if self.is_calibrating_arduino_mode: 
-                         self._update_pressure_visualizer()
 
 
     def create_profile_widgets_content(self, profile_frame):
@@ -260,17 +418,16 @@ class IntegratedMouthMouseApp:
              selected_tab_name = self.tab_view.get()
         elif not hasattr(self, 'tab_view') or not self.tab_view.winfo_exists():
             return 
-        if self._mouse_trail_job_id:
+        self._ensure_tab_built(selected_tab_name)
+        if self.cursor_sampler.is_subscribed("trail"):
             if selected_tab_name != 'Trainer' or not (self.trainer_target_active and hasattr(self, 'trainer_active_tk_canvas') and self.trainer_active_tk_canvas):
-                self.root.after_cancel(self._mouse_trail_job_id)
-                self._mouse_trail_job_id = None
+                self.cursor_sampler.unsubscribe("trail")
         if selected_tab_name != 'Calibrate Sensor' and self.is_calibrating_arduino_mode: self.stop_arduino_calibration_mode()
         if selected_tab_name == 'Tuner & Profiles': self.trainer_target_active=False; self._trainer_clear_canvas_content()
         elif selected_tab_name == 'Trainer':
             if hasattr(self,'instructions_label_trainer'):self.instructions_label_trainer.configure(text="Select a training mode.")
             if self.trainer_target_active and hasattr(self, 'trainer_active_tk_canvas') and self.trainer_active_tk_canvas: 
-                if self._mouse_trail_job_id: self.root.after_cancel(self._mouse_trail_job_id) 
-                self._mouse_trail_job_id = self.root.after(self.TRAIL_UPDATE_INTERVAL_MS, self._update_mouse_trail_loop) 
+                self.cursor_sampler.subscribe("trail", self._on_trail_sample, self.TRAIL_UPDATE_INTERVAL_MS)
         elif selected_tab_name == 'Calibrate Sensor':
              if hasattr(self,'calibration_instructions_label'):
                  initial_calib_text = "Click 'Start Sensor Stream' then select an action." if not self.is_calibrating_arduino_mode else "Sensor stream active. Select an action or Stop Stream."
@@ -323,6 +480,11 @@ class IntegratedMouthMouseApp:
                                                     height=self.pressure_canvas_min_height, bg=canvas_bg,
                                                     highlightthickness=0)
         self.pressure_visualizer_canvas.pack(pady=5, padx=5, expand=True, fill=tk.BOTH, anchor=tk.CENTER)
+        self.pressure_visualizer_canvas.bind("<Configure>", self._on_pressure_canvas_configure)
+        self.pressure_plot = PressurePlotRenderer(self.pressure_visualizer_canvas, self.pressure_label_area_width,
+                                                  self.font_canvas_threshold_text, self.PRESSURE_PLOT_STRATEGY)
+        for key in THRESHOLD_KEYS: self.params_tkvars[key].trace_add("write", self._on_pressure_threshold_changed)
+        self._on_pressure_threshold_changed()
 
         actions_and_log_frame = ctk.CTkFrame(calib_main_frame, fg_color="transparent")
         actions_and_log_frame.grid(row=2, column=0, sticky="nsew", pady=(0,5), padx=0) 
@@ -369,7 +531,7 @@ class IntegratedMouthMouseApp:
         desc_texts = {
             "JMT": "Min stick movement (%) to trigger cursor motion.",
             "JFR": "Stick deflection (%) considered as full speed.",
-            "JCB": "Stick must be within this % of center for clicks.",
+            "JCB": "Host pointer: stick must be within this % of center for clicks.",
             "JRC": "Time (s) for stick to auto-recenter (0=disabled).",
             "JIR": "Time (s) to hold in inner band for repeat action.",
             "JPA": "Pointer acceleration (0-100). 50 is linear."
@@ -384,6 +546,11 @@ class IntegratedMouthMouseApp:
         row_idx += 1 
         ctk.CTkLabel(params_content_frame, text="Note: JDZ (Reset Zone) and CSP (Pointer Speed)\nare set in Tuner tab.",
                   font=self.font_small, justify=tk.LEFT, text_color=("gray30", "gray70")).grid(row=row_idx, column=0, columnspan=3, pady=(15,0), padx=5, sticky="w")
+        row_idx += 1
+        self.host_pointer_checkbox = ctk.CTkCheckBox(params_content_frame, text="Host pointer (apply stick parameters on this PC)", variable=self.host_pointer_tkvar, command=self._on_host_pointer_toggled, font=self.font_normal)
+        self.host_pointer_checkbox.grid(row=row_idx, column=0, columnspan=3, pady=(15,0), padx=5, sticky="w")
+        row_idx += 1
+        ctk.CTkLabel(params_content_frame, textvariable=self.pointer_stats_tkvar, font=self.font_small, justify=tk.LEFT, text_color=("gray30", "gray70"), wraplength=260).grid(row=row_idx, column=0, columnspan=3, pady=(5,0), padx=5, sticky="w")
 
     def _update_joystick_visualizer(self):
         if not hasattr(self, 'joystick_canvas') or not self.joystick_canvas.winfo_exists(): return
@@ -405,173 +572,269 @@ class IntegratedMouthMouseApp:
 
     # --- Serial and Core Logic Methods ---
     def populate_ports(self):
-        ports = [port.device for port in serial.tools.list_ports.comports()]
+        # Enumeration can take seconds on some systems, so it runs on a worker thread and the
+        # result is picked up by an after() poll on the Tk thread.
+        if self._port_scan is not None: return
+        self._port_scan = scan = {"ports": None, "seconds": 0.0}
+        scan["thread"] = threading.Thread(target=self._scan_ports, args=(scan,), name="port-scan", daemon=True)
+        scan["thread"].start()
+        self.refresh_button.configure(state=tk.DISABLED)
+        self.root.after(50, self._finish_port_scan)
+
+    @staticmethod
+    def _scan_ports(scan):
+        start = time.perf_counter(); ports = []
+        try:
+            import serial.tools.list_ports
+            ports = [port.device for port in serial.tools.list_ports.comports()]
+        except Exception as e: print(f"Port enumeration failed: {e}")
+        if os.path.isdir(RECORDINGS_DIR): # Recorded sessions, played at the speed picked next to the port list
+            ports += sorted(f"{REPLAY_PREFIX}{os.path.join(RECORDINGS_DIR, f)}" for f in os.listdir(RECORDINGS_DIR) if f.endswith(RECORDING_EXTENSION))
+        scan["seconds"] = time.perf_counter() - start; scan["ports"] = ports
+
+    def _finish_port_scan(self):
+        scan = self._port_scan
+        if scan is None: return
+        if scan["thread"].is_alive(): self.root.after(50, self._finish_port_scan); return
+        self._port_scan = None
+        self.refresh_button.configure(state=tk.NORMAL)
+        self.startup.record("port scan (background)", scan["seconds"])
+        ports = scan["ports"] or []
         self.port_combo.configure(values=ports)
         if ports:
             self.port_combo.set(ports[0])
         else:
             self.port_combo.set("")
+        self._on_port_selected(self.port_combo.get())
+
+    def _on_port_selected(self, port):
+        # The speed list only means something for recorded sessions.
+        self.replay_speed_combo.configure(state="readonly" if port.startswith(REPLAY_PREFIX) else "disabled")
 
     def toggle_connect(self):
-        if not self.is_connected:
+        if not self.is_connected and not self.engine.reconnect_pending: # While reconnecting the button reads "Disconnect"
             port = self.port_combo.get()
             if not port:
                 messagebox.showerror("Error", "No serial port selected.", parent=self.root)
                 return
+            if port.startswith(REPLAY_PREFIX): port += f"@{self.REPLAY_SPEEDS.get(self.replay_speed_tkvar.get(), 1)}"
+            other = self.sessions.port_in_use(port, exclude=self.engine)
+            if other: messagebox.showerror("Error", f"{port} is already open for {other}.", parent=self.root); return
+            self.engine.move_listener = self.hot_corners.notify_relative_move if self.hot_corners is not None else None
+            self.ui_pump.start()
             try:
-                self.ser = serial.Serial(port, 115200, timeout=0.1)
-                self.is_connected = True
-                self.connect_button.configure(text="Disconnect")
-                if hasattr(self, 'apply_button'):
-                    self.apply_button.configure(state=tk.NORMAL)
-                self.set_status(f"Connected to {port}")
-                self.stop_read_thread.clear()
-                self.read_thread = threading.Thread(target=self.read_from_arduino, daemon=True)
-                self.read_thread.start()
-                self.send_command("H\n")
-                self.apply_all_settings()
-            except serial.SerialException as e:
+                self.engine.connect(port, binary=self.use_binary_protocol_tkvar.get(), record=self.record_session_tkvar.get(),
+                                    host_pointer=self.host_pointer_tkvar.get(), apply_settings=False)
+            except (serial.SerialException, OSError, ValueError) as e:
+                self.ui_pump.stop()
                 messagebox.showerror("Connection Error", str(e), parent=self.root)
-                self.ser = None
-                self.is_connected = False
+                return
+            self._show_connected(port)
+            if self.host_pointer_tkvar.get() and self.engine.pointer_pipeline is None: self.host_pointer_tkvar.set(False)
+            self.apply_all_settings()
         else:
             if self.is_calibrating_arduino_mode:
                 self.stop_arduino_calibration_mode(silent=True)
-            self.is_connected = False
-            self.stop_read_thread.set()
-            if hasattr(self, 'read_thread') and self.read_thread.is_alive():
-                self.read_thread.join(timeout=0.5)
-            if self.ser and self.ser.is_open:
-                self.ser.close()
-            self.ser = None
-            self.connect_button.configure(text="Connect")
-            if hasattr(self, 'apply_button'):
-                self.apply_button.configure(state=tk.DISABLED)
-            self.set_status("Disconnected")
-            self.current_pressure_tkvar.set("Pressure: N/A")
-            self.joystick_x_centered_tkvar.set(0)
-            self.joystick_y_centered_tkvar.set(0)
-            if hasattr(self, 'joystick_canvas') and self.joystick_canvas.winfo_exists():
-                self._update_joystick_visualizer()
+            self.engine.disconnect()
+            self._show_disconnected()
+
+    def _show_connected(self, port):
+        self.ui_pump.start()
+        self.connect_button.configure(text="Disconnect")
+        if hasattr(self, 'apply_button'):
+            self.apply_button.configure(state=tk.NORMAL)
+        self.set_status(f"Connected to {port}")
+        self._schedule_reader_stats()
+
+    def _show_disconnected(self):
+        if self._reader_stats_job: self.root.after_cancel(self._reader_stats_job); self._reader_stats_job = None
+        self.ui_pump.stop()
+        self.reader_stats_tkvar.set(""); self.pointer_stats_tkvar.set("")
+        self.connect_button.configure(text="Connect")
+        if hasattr(self, 'apply_button'):
+            self.apply_button.configure(state=tk.DISABLED)
+        self.set_status("Disconnected")
+        self.current_pressure_tkvar.set("Pressure: N/A")
+        self.joystick_x_centered_tkvar.set(0)
+        self.joystick_y_centered_tkvar.set(0)
+        if hasattr(self, 'joystick_canvas') and self.joystick_canvas.winfo_exists():
+            self._update_joystick_visualizer()
+
+    # --- Devices ---
+    def add_device(self):
+        dialog = ctk.CTkInputDialog(text="Name for the new device (e.g. the user's name):", title="Add Device")
+        name = (dialog.get_input() or "").strip()
+        if not name: return
+        try: engine = self.sessions.add(name)
+        except ValueError as e: messagebox.showerror("Add Device", str(e), parent=self.root); return
+        engine.live_updates = self.live_updates_tkvar.get()
+        if self.auto_reconnect_tkvar.get(): engine.enable_auto_reconnect()
+        self.device_combo.configure(values=self.sessions.names())
+        self.switch_device(name)
+
+    def switch_device(self, name):
+        # Shows another device; the others stay connected and keep relaying.
+        engine = self.sessions.get(name)
+        self.active_device_tkvar.set(name)
+        if engine is self.engine: return
+        if self.is_calibrating_arduino_mode: self.stop_arduino_calibration_mode(silent=True)
+        self.ui_pump.stop() # Drops values still queued from the previous device
+        for unsubscribe in self._engine_subscriptions: unsubscribe()
+        self.engine = engine
+        self._subscribe_to_engine()
+        for key, value in engine.settings.as_dict().items(): self._set_param_tkvar(key, value)
+        self.live_updates_tkvar.set(engine.live_updates); self.track_drift_tkvar.set(engine.drift_adapter is not None)
+        self.auto_reconnect_tkvar.set(engine.reconnector is not None); self.host_pointer_tkvar.set(engine.pointer_pipeline is not None)
+        if engine.profile_name and hasattr(self, 'profile_combo'): self.profile_combo.set(engine.profile_name); self.current_profile_name.set(engine.profile_name)
+        if engine.is_connected or engine.reconnect_pending: self._show_connected(engine.port)
+        else: self._show_disconnected()
+        self.set_status(f"Showing {name}" + (f" on {engine.port}" if engine.is_connected else " (not connected)"))
+
+    @property
+    def is_connected(self):
+        return self.engine.is_connected
 
     def send_command(self, command):
-        if self.ser and self.ser.is_open:
-            try:
-                if not command.endswith('\n'): command += '\n'
-                self.ser.write(command.encode('utf-8'))
-            except serial.SerialException as e:
-                self.set_status(f"Send Error: {e}")
-                self.handle_serial_error_disconnect()
+        self.engine.send_command(command)
 
     def apply_all_settings(self):
         if not self.is_connected:
             messagebox.showwarning("Not Connected", "Connect to Arduino first to apply settings.", parent=self.root)
             return
-        self.set_status("Applying all settings to Arduino...")
-        for key, tk_var in self.params_tkvars.items():
-            value_to_send = tk_var.get()
-            value_to_send_int = 0
-
-            if isinstance(tk_var, tk.DoubleVar): 
-                if key in ["JRC", "JIR"]: 
-                    value_to_send_int = int(value_to_send * 10) 
-                else: 
-                    value_to_send_int = int(value_to_send)
-            else: 
-                 value_to_send_int = int(value_to_send)
-
-            self.send_param_update(key, value_to_send_int)
-            time.sleep(0.02) 
-        self.set_status("All settings applied to Arduino.")
+        for key in self.params_tkvars: self._commit_param(key) # An entry still being typed in
+        self.engine.apply_all_settings()
         if self.is_calibrating_arduino_mode and hasattr(self, 'pressure_visualizer_canvas'):
             self._update_pressure_visualizer()
         if hasattr(self, 'joystick_control_tab') and self.tab_view.winfo_exists() and self.tab_view.get() == "Stick Control":
             self._update_joystick_visualizer()
 
     def send_param_update(self, param_key, value):
-        self.send_command(f"SET_{param_key}:{value}\n")
-
-
-    def read_from_arduino(self):
-        while not self.stop_read_thread.is_set():
-            if not self.ser or not self.ser.is_open: break
-            try:
-                if self.ser.in_waiting > 0:
-                    line = self.ser.readline().decode('utf-8', errors='ignore').strip()
-                    if line:
-                        if self.is_calibrating_arduino_mode and line.startswith("CALIB_P:"):
-                            try:
-                                value = int(line.split(":")[1])
-                                self.calibration_current_value_tkvar.set(f"Raw Pressure: {value}")
-                                self.pressure_history.append(value)
-                                if len(self.pressure_history) > self.max_history_points:
-                                    self.pressure_history.pop(0)
-                                self.root.after(0, self._update_pressure_visualizer)
-                                if self.calibrating_action_name.get():
-                                    self.calibration_samples.append(value)
-                            except (ValueError, IndexError): pass 
-                        elif line.startswith("P:"):
-                            if not self.is_calibrating_arduino_mode:
-                                try: self.current_pressure_tkvar.set(f"Pressure: {line.split(':')[1]}")
-                                except IndexError: pass
-                        elif line.startswith("JOY:"):
-                            try:
-                                parts = line.split(':')[1].split(',')
-                                joy_x = int(parts[0])
-                                joy_y = int(parts[1])
-                                self.joystick_x_centered_tkvar.set(joy_x)
-                                self.joystick_y_centered_tkvar.set(joy_y)
-                                if hasattr(self, 'tab_view') and self.tab_view.winfo_exists() and self.tab_view.get() == "Stick Control":
-                                    self.root.after(0, self._update_joystick_visualizer)
-                            except (IndexError, ValueError, tk.TclError): pass 
-                        elif line.startswith("ACK:") or line.startswith("ERR:") or line.startswith("CMD_RECV:"):
-                            self.set_status(f"Arduino: {line}")
-                        else:
-                            if not self.is_calibrating_arduino_mode:
-                                self.handle_mouse_command_from_arduino(line)
-            except serial.SerialException:
-                self.root.after(0, self.handle_serial_error_disconnect)
-                break
-            except Exception as e: 
-                if not self.stop_read_thread.is_set():
-                    print(f"Read thread error: {e}")
-            time.sleep(0.005) 
-
-    def handle_mouse_command_from_arduino(self,line):
-        parts=line.split(',');cmd=parts[0]
+        self.engine.send_param_update(param_key, value)
+
+    # Engine observers may run on the serial read thread; anything that touches Tk goes
+    # through the UI pump unless we are already on the Tk thread.
+    def _subscribe_to_engine(self):
+        engine = self.engine
+        on_tk_thread = lambda: threading.current_thread() is threading.main_thread()
+        self._engine_subscriptions = [
+            engine.subscribe(EVENT_CALIB, lambda v: self.ui_pump.post_sample("calib", v)),
+            engine.subscribe(EVENT_PRESSURE, lambda v: self.ui_pump.post_latest("pressure", v)),
+            engine.subscribe(EVENT_JOY, lambda x, y: self.ui_pump.post_latest("joy", (x, y))),
+            engine.subscribe(EVENT_STATUS, lambda m: self.set_status(m) if on_tk_thread() else self.ui_pump.post_latest("status", m)),
+            engine.subscribe(EVENT_SERIAL_ERROR, lambda e: self.root.after_idle(self.handle_serial_error_disconnect) if on_tk_thread() else self.ui_pump.post_latest("serial_error", True)),
+            engine.settings.subscribe(EVENT_SETTING_CHANGED, lambda k, v: self._set_param_tkvar(k, v) if on_tk_thread() else self.ui_pump.post_sample("settings", (k, v))),
+        ]
+
+    def _commit_param(self, key):
+        # Slider moves and finished entry edits go to the engine (and, live, to the device).
+        try: self.engine.settings.set(key, self.params_tkvars[key].get())
+        except (tk.TclError, ValueError): self._set_param_tkvar(key, self.engine.settings.get(key)) # Not a number: put it back
+
+    def _on_live_updates_toggled(self):
+        self.engine.live_updates = self.live_updates_tkvar.get()
+        if self.engine.live_updates and self.is_connected: self.engine.apply_all_settings() # Catch up on edits made while off
+
+    def _on_track_drift_toggled(self):
+        if self.track_drift_tkvar.get(): self.engine.enable_drift_tracking(); self.set_status("Drift tracking on: thresholds follow the rest baseline.")
+        else: self.engine.disable_drift_tracking(); self.set_status("Drift tracking off.")
+
+    def _set_param_tkvar(self, key, value):
+        tk_var = self.params_tkvars.get(key)
+        if tk_var is None: return
         try:
-            if cmd=='MOVE' and len(parts)==3:pyautogui.moveRel(int(parts[1]),int(parts[2]),duration=0)
-            elif cmd=='LEFT_CLICK_DOWN':pyautogui.mouseDown(button='left');self.pyautogui_left_button_down=True
-            elif cmd=='LEFT_CLICK_UP':pyautogui.mouseUp(button='left');self.pyautogui_left_button_down=False
-            elif cmd=='RIGHT_CLICK_DOWN':pyautogui.mouseDown(button='right');self.pyautogui_right_button_down=True
-            elif cmd=='RIGHT_CLICK_UP':pyautogui.mouseUp(button='right');self.pyautogui_right_button_down=False
-            elif cmd=='SCROLL_UP':pyautogui.scroll(20)
-            elif cmd=='SCROLL_DOWN':pyautogui.scroll(-20)
-        except Exception as e:self.set_status(f"PyAutoGUI Err: {str(e)[:50]}")
+            if tk_var.get() == value: return
+        except tk.TclError: pass
+        tk_var.set(value)
+
+    def _schedule_reader_stats(self):
+        if self._reader_stats_job: self.root.after_cancel(self._reader_stats_job)
+        self._reader_stats_job = self.root.after(self.READER_STATS_INTERVAL_MS, self._update_reader_stats)
+
+    def _update_reader_stats(self):
+        self._reader_stats_job = None
+        engine = self.engine
+        if not self.is_connected or not engine.serial_reader:
+            if engine.reconnect_pending: self.reader_stats_tkvar.set(engine.reconnector.summary()); self._schedule_reader_stats()
+            return
+        summary = f"{engine.serial_reader.summary()} | {self.ui_pump.summary()}"
+        if engine.mouse_relay and engine.mouse_relay.batches: summary += f"\n{engine.mouse_relay.summary()}"
+        if engine.settings_ack_latency.count: summary += f" | {engine.settings_upload_summary()}"
+        if engine.drift_adapter is not None: summary += f"\n{engine.drift_adapter.summary()}"
+        if engine.time_to_usable.count: summary += f"\n{engine.connection_summary()}"
+        if engine.reconnector is not None and engine.reconnector.reconnects: summary += f" | {engine.reconnector.summary()}"
+        if len(self.sessions.sessions) > 1: summary += f"\n{self.sessions.overview(exclude=engine)}"
+        if self.hot_corners is not None: summary += f"\n{self.hot_corners.summary()}"
+        if self.cursor_sampler.running: summary += f" | {self.cursor_sampler.summary()}"
+        if engine.pointer_pipeline: self.pointer_stats_tkvar.set(engine.pointer_pipeline.summary())
+        self.reader_stats_tkvar.set(summary)
+        self._schedule_reader_stats()
+
+    def _on_pump_calibration_samples(self, samples):
+        if not samples or not self.is_calibrating_arduino_mode: return
+        self.calibration_current_value_tkvar.set(f"Raw Pressure: {samples[-1]}")
+        self.pressure_history.extend(samples)
+        if self.calibrating_action_name.get(): self._segment_calibration_samples(samples)
+        self._update_pressure_visualizer(len(samples))
+
+    def _segment_calibration_samples(self, samples):
+        # Neutral keeps every sample taken at rest; the other actions keep the plateau of
+        # each held repetition in the expected direction.
+        action_name = self.calibrating_action_name.get(); segmenter = self.calibration_segmenter
+        wanted = OnsetSegmenter.SIP if "Sip" in action_name else OnsetSegmenter.PUFF
+        for p in samples:
+            segment = segmenter.feed(p)
+            if action_name == "Neutral":
+                if segmenter.at_rest: self.calibration_samples.append(p)
+            elif segment is not None:
+                if segment.direction != wanted:
+                    self._add_to_calib_log(f"Ignored a {'sip' if segment.direction == OnsetSegmenter.SIP else 'puff'} while recording {action_name}."); continue
+                self.calibration_samples.extend(segment.samples); self.calibration_repetitions += 1
+                self._add_to_calib_log(f"{action_name} #{self.calibration_repetitions}: {len(segment.samples)} plateau samples, level {segment.level:.0f}")
+
+    def _on_pump_pressure(self, value):
+        if not self.is_calibrating_arduino_mode: self.current_pressure_tkvar.set(f"Pressure: {value}")
+
+    def _on_pump_joystick(self, joy):
+        self.joystick_x_centered_tkvar.set(joy[0])
+        self.joystick_y_centered_tkvar.set(joy[1])
+        if hasattr(self, 'tab_view') and self.tab_view.winfo_exists() and self.tab_view.get() == "Stick Control":
+            self._update_joystick_visualizer()
+
+    def _on_host_pointer_toggled(self):
+        if not self.is_connected: return
+        if self.host_pointer_tkvar.get():
+            if not self.engine.start_host_pointer(): self.host_pointer_tkvar.set(False)
+        else:
+            self.engine.stop_host_pointer(); self.pointer_stats_tkvar.set("")
 
     def handle_serial_error_disconnect(self):
+        if self.engine.reconnect_pending: return # The reconnect manager reopens the device
         if self.is_connected:self.toggle_connect()
+        else: # The session manager has already closed the port
+            if self.is_calibrating_arduino_mode: self.stop_arduino_calibration_mode(silent=True)
+            self._show_disconnected()
+
+    def _on_auto_reconnect_toggled(self):
+        if self.auto_reconnect_tkvar.get(): self.engine.enable_auto_reconnect()
+        else:
+            if self.engine.reconnect_pending: self.toggle_connect() # Stop waiting and show the disconnected state
+            self.engine.disable_auto_reconnect()
 
     # --- Profile Methods ---
     def get_current_settings_dict(self): 
-        return {key:tk_var.get() for key,tk_var in self.params_tkvars.items()}
+        for key in self.params_tkvars: self._commit_param(key) # An entry still being typed in
+        return self.engine.settings.as_dict()
 
     def apply_settings_from_dict(self,settings_dict,profile_name="<Loaded Profile>"):
         actual_settings=settings_dict.get("settings",settings_dict)
-        for key,value in actual_settings.items():
-            if key in self.params_tkvars:
-                if key in ["JRC", "JIR"] and isinstance(self.params_tkvars[key], tk.DoubleVar):
-                    self.params_tkvars[key].set(float(value))
-                elif key in self.params_tkvars: 
-                    self.params_tkvars[key].set(int(value))
+        self.engine.settings.update(actual_settings) # Tk variables follow via EVENT_SETTING_CHANGED
         self.current_profile_name.set(profile_name)
         self.set_status(f"Settings from '{profile_name}' loaded into GUI.")
         if self.is_connected:self.apply_all_settings()
 
     def populate_profiles_dropdown(self):
         try:
-            profile_files=[f for f in os.listdir(PROFILES_DIR) if f.endswith(".json")]
-            profile_names=[os.path.splitext(f)[0] for f in profile_files]
+            profile_names=self.engine.profiles.list_names()
             current_selection_is_valid_profile = self.current_profile_name.get() in profile_names
             if hasattr(self,'profile_combo'):
                 self.profile_combo.configure(values=profile_names)
@@ -582,41 +845,37 @@ class IntegratedMouthMouseApp:
                 else: self.profile_combo.set(""); self.current_profile_name.set("<Default Settings>")
         except Exception as e:self.set_status(f"Err listing profiles: {e}")
 
+    def _on_profiles_changed(self, names):
+        self._profiles_dirty = True # Watcher thread
+
+    def _check_profiles(self):
+        if self._profiles_dirty: self._profiles_dirty = False; self.populate_profiles_dropdown()
+        self._profiles_job = self.root.after(self.PROFILE_REFRESH_MS, self._check_profiles)
+
     def load_selected_profile(self):
         profile_name=self.profile_combo.get()
         if not profile_name or profile_name=="<Default Settings>": messagebox.showwarning("Load Profile","No profile selected.",parent=self.root);return
         self._load_profile_by_name(profile_name)
 
     def _load_profile_by_name(self,profile_name_to_load):
-        filepath=os.path.join(PROFILES_DIR,f"{profile_name_to_load}.json")
         try:
-            with open(filepath,'r') as f:settings_data=json.load(f)
+            settings_data=self.engine.profiles.load(profile_name_to_load)
             self.apply_settings_from_dict(settings_data,profile_name_to_load); 
-            self.current_profile_name.set(profile_name_to_load)
+            self.current_profile_name.set(profile_name_to_load); self.engine.profile_name = profile_name_to_load
         except FileNotFoundError:messagebox.showerror("Load Error",f"Profile '{profile_name_to_load}' not found.",parent=self.root)
         except Exception as e:messagebox.showerror("Load Error",f"Failed to load '{profile_name_to_load}': {e}",parent=self.root)
 
     def load_default_settings(self):
         if messagebox.askyesno("Load Defaults","Reset sliders to factory defaults?",parent=self.root):
-            for key, value in DEFAULT_SETTINGS.items():
-                if key in self.params_tkvars:
-                    if isinstance(self.params_tkvars[key], tk.DoubleVar):
-                        self.params_tkvars[key].set(float(value))
-                    else:
-                        self.params_tkvars[key].set(int(value))
+            self.engine.settings.reset()
             self.current_profile_name.set("<Default Settings Applied>")
             self.set_status(f"Default settings loaded into GUI.")
             if self.is_connected:self.apply_all_settings()
 
     def _save_profile_to_file(self,profile_name,settings_dict): 
         if not profile_name.strip() or profile_name=="<Default Settings>": messagebox.showerror("Save Profile","Invalid profile name.",parent=self.root);return False
-        native_settings_dict = {}
-        for key, tk_var in self.params_tkvars.items():
-            native_settings_dict[key] = tk_var.get()
-        data_to_save={"profile_name_meta":profile_name,"settings":native_settings_dict}
-        filepath=os.path.join(PROFILES_DIR,f"{profile_name}.json")
         try:
-            with open(filepath,'w') as f:json.dump(data_to_save,f,indent=2)
+            self.engine.profiles.save(profile_name,settings_dict); self.engine.profile_name = profile_name
             self.set_status(f"Profile '{profile_name}' saved.");self.populate_profiles_dropdown()
             self.profile_combo.set(profile_name);self.current_profile_name.set(profile_name); return True
         except Exception as e:messagebox.showerror("Save Error",f"Could not save profile: {e}",parent=self.root);return False
@@ -637,20 +896,18 @@ class IntegratedMouthMouseApp:
         if not name or name=="<Default Settings>" or name=="<Default Settings Applied>": messagebox.showwarning("Delete Profile","No saved profile selected.",parent=self.root);return
         if messagebox.askyesno("Confirm Delete",f"Delete profile '{name}'? This cannot be undone.",parent=self.root):
             try:
-                os.remove(os.path.join(PROFILES_DIR,f"{name}.json")); self.set_status(f"Profile '{name}' deleted.")
+                self.engine.profiles.delete(name); self.set_status(f"Profile '{name}' deleted.")
                 self.current_profile_name.set("<Default Settings>"); self.populate_profiles_dropdown()
             except Exception as e:messagebox.showerror("Delete Error",f"Failed to delete '{name}': {e}",parent=self.root)
 
     # --- Trainer Methods ---
     def _trainer_clear_canvas_content(self):
         self.trainer_target_active = False
-        if self._mouse_trail_job_id:
-            self.root.after_cancel(self._mouse_trail_job_id)
-            self._mouse_trail_job_id = None
+        self.cursor_sampler.unsubscribe("trail"); self.cursor_sampler.unsubscribe("hover")
         if hasattr(self, 'trainer_content_host_frame') and self.trainer_content_host_frame and self.trainer_content_host_frame.winfo_exists():
             for widget in self.trainer_content_host_frame.winfo_children(): widget.destroy()
         self.trainer_active_tk_canvas = None
-        self.mouse_trail_points.clear(); self.mouse_trail_ids = []
+        self.mouse_trail_points.clear(); self.mouse_trail_renderer = None
         if hasattr(self, 'instructions_label_trainer'): self.instructions_label_trainer.configure(text="Select a training mode.")
         if hasattr(self, 'trainer_score_display_var'): self.trainer_score_display_var.set("Score: 0")
         self.trainer_target_id, self.trainer_target_coords, self.is_target_hit_and_waiting_for_respawn = None, None, False
@@ -679,29 +936,28 @@ class IntegratedMouthMouseApp:
         self.trainer_active_tk_canvas = tk.Canvas(host, bg=canvas_bg, highlightthickness=0)
         self.trainer_active_tk_canvas.pack(fill=tk.BOTH, expand=True)
         self.trainer_target_size=30; self.trainer_target_id=None; self.trainer_target_coords=None; self.is_target_hit_and_waiting_for_respawn=False
-        self.mouse_trail_points.clear(); self.mouse_trail_ids = []
+        self.mouse_trail_points.clear()
+        self.mouse_trail_renderer = MouseTrailRenderer(self.trainer_active_tk_canvas, self.mouse_trail_points.maxlen, self.trail_color, canvas_bg, self.TRAIL_MODE)
         self.trainer_active_tk_canvas.after(100, self._trainer_spawn_hover_target)
-        if self._mouse_trail_job_id: self.root.after_cancel(self._mouse_trail_job_id)
-        self._mouse_trail_job_id = self.root.after(self.TRAIL_UPDATE_INTERVAL_MS, self._update_mouse_trail_loop)
-        self._trainer_check_hover_loop()
+        self.cursor_sampler.subscribe("trail", self._on_trail_sample, self.TRAIL_UPDATE_INTERVAL_MS)
+        self.cursor_sampler.subscribe("hover", self._trainer_on_hover_sample, self.TRAINER_HOVER_INTERVAL_MS)
 
-    def _update_mouse_trail_loop(self):
+    def _on_trail_sample(self, mx_g, my_g):
         if not self.trainer_target_active or not hasattr(self, 'trainer_active_tk_canvas') or not self.trainer_active_tk_canvas or not self.trainer_active_tk_canvas.winfo_exists():
-            self._mouse_trail_job_id = None 
+            self.cursor_sampler.unsubscribe("trail")
             return
         canvas = self.trainer_active_tk_canvas
-        if canvas.winfo_exists():
-            mx_g, my_g = pyautogui.position()
-            try:
-                crx, cry = canvas.winfo_rootx(), canvas.winfo_rooty()
-                rel_mx, rel_my = mx_g - crx, my_g - cry
-                if 0 <= rel_mx <= canvas.winfo_width() and 0 <= rel_my <= canvas.winfo_height():
-                    self.mouse_trail_points.append((rel_mx, rel_my))
-                self._draw_mouse_trail()
-            except tk.TclError: 
-                self._mouse_trail_job_id = None
-                return
-        self._mouse_trail_job_id = self.root.after(self.TRAIL_UPDATE_INTERVAL_MS, self._update_mouse_trail_loop)
+        rel = self.cursor_sampler.to_widget(canvas, mx_g, my_g)
+        if rel is None:
+            self.cursor_sampler.unsubscribe("trail")
+            return
+        try:
+            rel_mx, rel_my = rel
+            if 0 <= rel_mx <= canvas.winfo_width() and 0 <= rel_my <= canvas.winfo_height():
+                self.mouse_trail_points.append((rel_mx, rel_my))
+            self._draw_mouse_trail()
+        except tk.TclError: 
+            self.cursor_sampler.unsubscribe("trail")
 
     def _trainer_spawn_hover_target(self):
         if not self.trainer_target_active or not hasattr(self,'trainer_active_tk_canvas') or not self.trainer_active_tk_canvas or not self.trainer_active_tk_canvas.winfo_exists():return
@@ -720,38 +976,29 @@ class IntegratedMouthMouseApp:
 
     def _draw_mouse_trail(self):
         if not hasattr(self, 'trainer_active_tk_canvas') or not self.trainer_active_tk_canvas or not self.trainer_active_tk_canvas.winfo_exists(): return
-        canvas = self.trainer_active_tk_canvas
-        for trail_id in self.mouse_trail_ids:
-            try: canvas.delete(trail_id)
+        if self.mouse_trail_renderer is not None: self.mouse_trail_renderer.render(self.mouse_trail_points)
+
+    def _get_trail_color(self):
+        return "lightgrey" if ctk.get_appearance_mode() == "Dark" else "darkgrey"
+
+    def _on_appearance_mode_changed(self, mode=None):
+        self.trail_color = self._get_trail_color()
+        if self.mouse_trail_renderer is not None:
+            try: self.mouse_trail_renderer.set_colors(self.trail_color, self._get_themed_canvas_bg())
             except tk.TclError: pass
-        self.mouse_trail_ids.clear()
-        if len(self.mouse_trail_points) > 1:
-            trail_color = "lightgrey" if ctk.get_appearance_mode() == "Dark" else "darkgrey"
-            line_coords = []
-            for point in self.mouse_trail_points: line_coords.extend(point)
-            if line_coords:
-                line_id = canvas.create_line(line_coords, fill=trail_color, width=2, tags="trail", smooth=True, splinesteps=5)
-                self.mouse_trail_ids.append(line_id)
-
-    def _trainer_check_hover_loop(self): 
-        if not self.trainer_target_active or not hasattr(self,'trainer_active_tk_canvas') or not self.trainer_active_tk_canvas or not self.trainer_active_tk_canvas.winfo_exists():return
+
+    def _trainer_on_hover_sample(self, mx_g, my_g): 
+        if not self.trainer_target_active or not hasattr(self,'trainer_active_tk_canvas') or not self.trainer_active_tk_canvas or not self.trainer_active_tk_canvas.winfo_exists():
+            self.cursor_sampler.unsubscribe("hover");return
         canvas = self.trainer_active_tk_canvas
-        rel_mx, rel_my = -1, -1 
-        if canvas.winfo_exists():
-            mx_g, my_g = pyautogui.position()
-            try:
-                crx, cry = canvas.winfo_rootx(), canvas.winfo_rooty()
-                rel_mx, rel_my = mx_g - crx, my_g - cry
-            except tk.TclError: 
-                if self.trainer_target_active: self.root.after(50, self._trainer_check_hover_loop)
-                return
-        if self.is_target_hit_and_waiting_for_respawn:
-            if self.trainer_target_active:self.root.after(50,self._trainer_check_hover_loop);return
-        if self.trainer_target_id and self.trainer_target_coords and rel_mx != -1:
+        rel = self.cursor_sampler.to_widget(canvas, mx_g, my_g)
+        if rel is None or self.is_target_hit_and_waiting_for_respawn: return
+        rel_mx, rel_my = rel
+        if self.trainer_target_id and self.trainer_target_coords:
             try:
                 if not canvas.coords(self.trainer_target_id): 
                     self.trainer_target_id,self.trainer_target_coords=None,None
-                    if self.trainer_target_active:self.root.after(50,self._trainer_check_hover_loop);return
+                    return
                 if self.trainer_target_coords[0]<rel_mx<self.trainer_target_coords[2] and self.trainer_target_coords[1]<rel_my<self.trainer_target_coords[3]:
                     self.trainer_score_value+=1;self.trainer_score_display_var.set(f"Score: {self.trainer_score_value}")
                     canvas.itemconfig(self.trainer_target_id,fill="lightgreen");self.is_target_hit_and_waiting_for_respawn=True
@@ -767,7 +1014,6 @@ class IntegratedMouthMouseApp:
                     self.root.after(400,delayed_actions_after_hit)
             except tk.TclError:self.trainer_target_id,self.trainer_target_coords=None,None
             except Exception:pass 
-        if self.trainer_target_active:self.root.after(50,self._trainer_check_hover_loop) 
 
     def start_click_accuracy(self):
         self._trainer_clear_canvas_content();self.trainer_target_active=True
@@ -851,19 +1097,22 @@ class IntegratedMouthMouseApp:
         self.trainer_active_tk_canvas = None 
 
     # --- OSK Methods ---
-    def schedule_osk_check(self): 
-        self.check_osk_trigger();self.root.after(self.OSK_POLL_INTERVAL_MS,self.schedule_osk_check)
+    def _start_hot_corners(self):
+        commands = {"osk_open": self._osk_open, "osk_close": self._osk_close, "osk_toggle": self.toggle_osk}
+        actions = {corner: commands.get(name) for corner, name in self.HOT_CORNER_ACTIONS.items() if name}
+        if not actions: return
+        self.hot_corners = HotCornerMonitor(self.root, self._cursor_position, (self.screen_width, self.screen_height),
+                                            self.OSK_ZONE_SIZE, actions, self.HOT_CORNER_MIN_INTERVAL_MS, self.HOT_CORNER_MAX_INTERVAL_MS,
+                                            wake=lambda: self.ui_pump.post_latest("hot_corner_move", True)) # Relay moves only happen while connected, when the pump runs
+        self.hot_corners.start()
+        self.cursor_sampler.subscribe("hot_corners", self.hot_corners.feed_position, self.HOT_CORNER_MIN_INTERVAL_MS, keep_alive=False)
     def toggle_osk(self):
-        try:pyautogui.hotkey('win','ctrl','o');self.osk_open=not self.osk_open; state='Opened' if self.osk_open else 'Closed'; self.set_status(f"{state} On-Screen Keyboard")
+        try:_pyautogui().hotkey('win','ctrl','o');self.osk_open=not self.osk_open; state='Opened' if self.osk_open else 'Closed'; self.set_status(f"{state} On-Screen Keyboard")
         except Exception as e:self.set_status(f"OSK err: {e}")
-    def check_osk_trigger(self):
-        try:
-            x,y=pyautogui.position()
-            if x<self.OSK_ZONE_SIZE and y>self.screen_height-self.OSK_ZONE_SIZE:
-                if not self.osk_open:self.toggle_osk()
-            elif x>self.screen_width-self.OSK_ZONE_SIZE and y<self.OSK_ZONE_SIZE:
-                if self.osk_open:self.toggle_osk()
-        except Exception:pass
+    def _osk_open(self):
+        if not self.osk_open:self.toggle_osk()
+    def _osk_close(self):
+        if self.osk_open:self.toggle_osk()
         
     # --- Calibration Methods ---
     def _add_to_calib_log(self, message):
@@ -873,78 +1122,56 @@ class IntegratedMouthMouseApp:
             self.calib_log_text.see(tk.END)
             self.calib_log_text.configure(state=tk.DISABLED)
 
-    def _update_pressure_visualizer(self):
+    def _on_pressure_canvas_configure(self, event):
+        self._pressure_canvas_size = (event.width, event.height)
+
+    def _on_pressure_threshold_changed(self, *args):
+        values = {}
+        for key in THRESHOLD_KEYS:
+            try: values[key] = self.params_tkvars[key].get()
+            except tk.TclError: pass # Entry is mid-edit
+        if hasattr(self, 'pressure_plot'): self.pressure_plot.set_thresholds(values)
+
+    def _update_pressure_visualizer(self, new_samples=0):
         if not hasattr(self, 'pressure_visualizer_canvas') or \
            not self.pressure_visualizer_canvas.winfo_exists() or \
            not self.is_calibrating_arduino_mode:
             return
-        canvas = self.pressure_visualizer_canvas
-        canvas_bg = self._get_themed_canvas_bg()
-        canvas.configure(bg=canvas_bg)
-        w = canvas.winfo_width(); h = canvas.winfo_height()
-        if w <=1 or h <=1: self.root.after(50, self._update_pressure_visualizer); return
-
-        label_area_width = self.pressure_label_area_width 
-        
-        graph_area_x_start = label_area_width 
-        graph_area_width = w - label_area_width
+        w, h = self._pressure_canvas_size
+        if w <=1 or h <=1:
+            canvas = self.pressure_visualizer_canvas
+            w = canvas.winfo_width(); h = canvas.winfo_height()
+            if w <=1 or h <=1: self.root.after(50, self._update_pressure_visualizer); return
+            self._pressure_canvas_size = (w, h)
+
+        graph_area_width = w - self.pressure_label_area_width
         if graph_area_width <=0 : graph_area_width = 1 
         
         if abs(self.max_history_points - graph_area_width) > 5 or self.max_history_points <= 1 :
            self.max_history_points = graph_area_width
            if self.max_history_points <=0: self.max_history_points = 1
 
-
-        canvas.delete("all") 
-        y_padding = 10 
-        def pressure_to_y(pressure_val):
-            graph_height = h - (2 * y_padding)
-            if graph_height <= 0: graph_height = 1 
-            scaled_pressure = max(0, min(1023, pressure_val))
-            return (h - y_padding) - ((scaled_pressure / 1023.0) * graph_height)
-        
-        threshold_colors = {"HPT": "orangered", "SPT": "gold", "NMAX": "lightgreen", "NMIN": "lightgreen", "HST": "deepskyblue"}
-        text_color = "white" if ctk.get_appearance_mode() == "Dark" else "black"
-        current_font = self.font_canvas_threshold_text
-        sorted_threshold_keys = ["HPT", "SPT", "NMAX", "NMIN", "HST"]
-        
-        gap_between_text_and_graph = 5 
-
-        for key in sorted_threshold_keys:
-            if key in self.params_tkvars:
-                value = self.params_tkvars[key].get(); y_coord = pressure_to_y(value)
-                canvas.create_line(graph_area_x_start, y_coord, w, y_coord, fill=threshold_colors.get(key, "gray50"), width=1, dash=(4, 2))
-                label_text = f"{key}: {value}" 
-                canvas.create_text(graph_area_x_start - gap_between_text_and_graph, y_coord, text=label_text, fill=text_color, anchor="e", font=current_font)
-        
-        if self.pressure_history:
-            points = []; 
-            current_max_history = max(1, int(self.max_history_points)) 
-            
-            step_x = 0
-            if current_max_history > 0 and graph_area_width > 0 :
-                step_x = graph_area_width / current_max_history
-            
-            drawable_history = self.pressure_history[-current_max_history:]
-            for i, pressure_val in enumerate(drawable_history):
-                x = graph_area_x_start + (i * step_x)
-                y = pressure_to_y(pressure_val)
-                points.extend([x, y])
-            if len(points) >= 4: canvas.create_line(points, fill="cyan", width=2, tags="pressure_line")
+        plot = self.pressure_plot
+        plot.set_colors(self._get_themed_canvas_bg(), "white" if ctk.get_appearance_mode() == "Dark" else "black")
+        if self.pressure_history.capacity != self.max_history_points: self.pressure_history.resize(self.max_history_points)
+        plot.resize(w, h, self.max_history_points)
+        plot.render(self.pressure_history, new_samples)
 
 
     def start_arduino_calibration_mode(self):
         if not self.is_connected: messagebox.showwarning("Not Connected", "Connect to Arduino first.", parent=self.root); return
-        self.send_command("START_CALIBRATION\n"); self.is_calibrating_arduino_mode = True
+        self.engine.start_calibration(); self.is_calibrating_arduino_mode = True
         self.start_arduino_calib_button.configure(state=tk.DISABLED); self.stop_arduino_calib_button.configure(state=tk.NORMAL)
         for btn_key in self.action_buttons: self.action_buttons[btn_key].configure(state=tk.NORMAL)
         self._add_to_calib_log("Arduino calibration stream started."); self.calibration_instructions_label.configure(text="Sensor stream active. Select an action.")
-        self.pressure_history = [] 
+        self.pressure_history.clear()
+        self.pressure_plot.clear()
         self._update_pressure_visualizer() 
 
     def stop_arduino_calibration_mode(self, silent=False):
         if not self.is_connected and not silent : return 
-        if self.is_calibrating_arduino_mode or silent: self.send_command("STOP_CALIBRATION\n")
+        if self.calibrating_action_name.get(): self.finish_collecting_samples()
+        if self.is_calibrating_arduino_mode or silent: self.engine.stop_calibration()
         self.is_calibrating_arduino_mode = False
         if hasattr(self, 'start_arduino_calib_button'): 
             self.start_arduino_calib_button.configure(state=tk.NORMAL); self.stop_arduino_calib_button.configure(state=tk.DISABLED)
@@ -954,26 +1181,35 @@ class IntegratedMouthMouseApp:
             if not silent: self._add_to_calib_log("Arduino calibration stream stopped.")
             if hasattr(self,'calibration_instructions_label'): self.calibration_instructions_label.configure(text="Click 'Start Sensor Stream'.")
         if hasattr(self, 'pressure_visualizer_canvas') and self.pressure_visualizer_canvas.winfo_exists():
-             self.pressure_visualizer_canvas.delete("all") 
-        self.pressure_history = []
+             self.pressure_plot.clear()
+        self.pressure_history.clear()
 
     def start_collecting_samples(self, action_name):
         if not self.is_calibrating_arduino_mode: messagebox.showinfo("Info", "Start Arduino stream first.", parent=self.root); return
-        self.calibrating_action_name.set(action_name); self.calibration_samples = []
-        self.calibration_instructions_label.configure(text=f"PERFORMING: {action_name.upper()}. Hold pressure for ~3s..."); self._add_to_calib_log(f"--- Recording for {action_name} ---")
-        for btn in self.action_buttons.values(): btn.configure(state=tk.DISABLED)
+        # Recording runs until the action's button is clicked again; the segmenter picks out
+        # each repetition, so the user can hold and release as many times as they like.
+        if self.calibrating_action_name.get() == action_name: self.finish_collecting_samples(); return
+        self.calibrating_action_name.set(action_name); self.calibration_samples.clear()
+        self.calibration_segmenter = OnsetSegmenter(); self.calibration_repetitions = 0
+        if action_name == "Neutral": instructions = "RECORDING NEUTRAL: breathe normally without sipping or puffing."
+        else: instructions = f"RECORDING {action_name.upper()}: start at rest, then hold and release it as many times as you like."
+        self.calibration_instructions_label.configure(text=f"{instructions} Click 'Finish {action_name}' when done.")
+        self._add_to_calib_log(f"--- Recording for {action_name} ---")
+        for name, btn in self.action_buttons.items(): btn.configure(state=tk.NORMAL if name == action_name else tk.DISABLED)
+        self.action_buttons[action_name].configure(text=f"Finish {action_name}")
         self.stop_arduino_calib_button.configure(state=tk.DISABLED)
-        COLLECTION_DURATION_MS = 3000
-        if self._calibration_collect_job: self.root.after_cancel(self._calibration_collect_job)
-        self._calibration_collect_job = self.root.after(COLLECTION_DURATION_MS, self.finish_collecting_samples)
 
     def finish_collecting_samples(self):
-        self._calibration_collect_job = None 
+        self._on_pump_calibration_samples(self.ui_pump.drain("calib"))
         action_name = self.calibrating_action_name.get()
         if action_name:
-            self.collected_calibration_data[action_name] = list(self.calibration_samples)
-            self._add_to_calib_log(f"Collected {len(self.calibration_samples)} samples for {action_name}.")
-            self.calibrating_action_name.set("")
+            self.action_buttons[action_name].configure(text=f"Record {action_name}")
+            if len(self.calibration_samples):
+                self.collected_calibration_data[action_name] = self.calibration_samples.tolist()
+                repetitions = "" if action_name == "Neutral" else f" from {self.calibration_repetitions} repetition(s)"
+                self._add_to_calib_log(f"Collected {len(self.calibration_samples)} samples{repetitions} for {action_name}.")
+            else: self._add_to_calib_log(f"No complete {action_name} detected; nothing recorded.")
+            self.calibrating_action_name.set(""); self.calibration_segmenter = None
         if self.is_calibrating_arduino_mode: 
             for btn_key in self.action_buttons: self.action_buttons[btn_key].configure(state=tk.NORMAL)
             self.stop_arduino_calib_button.configure(state=tk.NORMAL)
@@ -987,122 +1223,14 @@ class IntegratedMouthMouseApp:
             self._add_to_calib_log("No data collected.")
             return
         self._add_to_calib_log("\n--- Analysis & Suggested Thresholds ---")
-        stats = {}
-        for action, samples in self.collected_calibration_data.items():
-            if samples:
-                avg = sum(samples) // len(samples)
-                m_min = min(samples)
-                m_max = max(samples)
-            else:
-                avg, m_min, m_max = 0, 0, 0
-            stats[action] = {"avg": avg, "min": m_min, "max": m_max, "count": len(samples)}
-            self._add_to_calib_log(f"{action}: Avg={avg}, Min={m_min}, Max={m_max} (Cnt:{len(samples)})")
-
-        sug = {k: self.params_tkvars[k].get() for k in DEFAULT_SETTINGS}
-        
-        MIN_ZONE_SEPARATION = 25
-        
-        # --- User-defined stable neutral range ---
-        KNOWN_NEUTRAL_LOW = 425  # MODIFIED: User's typical low neutral
-        KNOWN_NEUTRAL_HIGH = 520 # MODIFIED: User's typical high neutral
-        
-        if KNOWN_NEUTRAL_LOW >= KNOWN_NEUTRAL_HIGH: 
-            self._add_to_calib_log(f"Warning: KNOWN_NEUTRAL_LOW ({KNOWN_NEUTRAL_LOW}) is not less than KNOWN_NEUTRAL_HIGH ({KNOWN_NEUTRAL_HIGH}). Using defaults for known range.")
-            known_neutral_low_eff = DEFAULT_SETTINGS["NMIN"]
-            known_neutral_high_eff = DEFAULT_SETTINGS["NMAX"]
-        else:
-            known_neutral_low_eff = KNOWN_NEUTRAL_LOW
-            known_neutral_high_eff = KNOWN_NEUTRAL_HIGH
-
-        sug["NMIN"] = known_neutral_low_eff
-        sug["NMAX"] = known_neutral_high_eff
-        
-        neutral_data = stats.get("Neutral")
-        if neutral_data and neutral_data["count"] > 0:
-            self._add_to_calib_log(f"Observed 'Neutral' during calibration: Min={neutral_data['min']}, Avg={neutral_data['avg']}, Max={neutral_data['max']}")
-            self._add_to_calib_log(f"Prioritizing known stable neutral range: {known_neutral_low_eff}-{known_neutral_high_eff} for NMIN/NMAX base.")
-            if sug["NMIN"] >= sug["NMAX"]:
-                 sug["NMIN"] = known_neutral_low_eff 
-                 sug["NMAX"] = known_neutral_high_eff 
-                 if sug["NMIN"] >= sug["NMAX"]: 
-                     sug["NMIN"] = neutral_data["avg"] - 10 
-                     sug["NMAX"] = neutral_data["avg"] + 10
-        else: 
-            self._add_to_calib_log(f"Warning: No 'Neutral' data collected. Using known stable range: {known_neutral_low_eff}-{known_neutral_high_eff} for NMIN/NMAX.")
-
-        soft_sip_data = stats.get("Soft Sip")
-        hard_sip_data = stats.get("Hard Sip")
-
-        if soft_sip_data and soft_sip_data["count"] > 0:
-            required_nmin_from_softsip = soft_sip_data["max"] + MIN_ZONE_SEPARATION
-            sug["NMIN"] = max(sug["NMIN"], required_nmin_from_softsip) 
-        
-        if hard_sip_data and hard_sip_data["count"] > 0:
-            sug["HST"] = hard_sip_data["avg"] 
-            if soft_sip_data and soft_sip_data["count"] > 0:
-                 sug["HST"] = min(sug["HST"], soft_sip_data["min"] - MIN_ZONE_SEPARATION) 
-            sug["HST"] = min(sug["HST"], sug["NMIN"] - MIN_ZONE_SEPARATION) 
-        elif soft_sip_data and soft_sip_data["count"] > 0: 
-            sug["HST"] = soft_sip_data["min"] - MIN_ZONE_SEPARATION
-        
-        soft_puff_data = stats.get("Soft Puff")
-        hard_puff_data = stats.get("Hard Puff")
-
-        if soft_puff_data and soft_puff_data["count"] > 0:
-            required_nmax_from_softpuff = soft_puff_data["min"] - MIN_ZONE_SEPARATION
-            sug["NMAX"] = min(sug["NMAX"], required_nmax_from_softpuff) 
-            sug["SPT"] = soft_puff_data["avg"]
-        
-        if hard_puff_data and hard_puff_data["count"] > 0:
-            sug["HPT"] = hard_puff_data["avg"]
-            current_spt_base = sug.get("SPT")
-            if current_spt_base is None: 
-                current_spt_base = sug.get("NMAX", DEFAULT_SETTINGS["NMAX"]) + MIN_ZONE_SEPARATION 
-                sug["SPT"] = current_spt_base 
-            sug["HPT"] = max(sug["HPT"], current_spt_base + MIN_ZONE_SEPARATION)
-        elif soft_puff_data and soft_puff_data["count"] > 0:
-            sug["HPT"] = sug.get("SPT", DEFAULT_SETTINGS["SPT"]) + MIN_ZONE_SEPARATION * 2
-
-        for k_val in ["HST", "NMIN", "NMAX", "SPT", "HPT"]:
-            sug[k_val] = max(0, min(1023, sug.get(k_val, DEFAULT_SETTINGS[k_val])))
-
-        if sug["NMIN"] >= sug["NMAX"]:
-            self._add_to_calib_log(f"Warning: NMIN ({sug['NMIN']}) >= NMAX ({sug['NMAX']}) after sip/puff adjustment. Re-centering neutral band.")
-            neutral_center_target = (known_neutral_low_eff + known_neutral_high_eff) // 2
-            if neutral_data and neutral_data["count"] > 0: 
-                if known_neutral_low_eff >= known_neutral_high_eff : neutral_center_target = neutral_data["avg"]
-            
-            min_neutral_width = max(10, MIN_ZONE_SEPARATION // 2) 
-            sug["NMIN"] = neutral_center_target - (min_neutral_width // 2)
-            sug["NMAX"] = sug["NMIN"] + min_neutral_width 
-
-            sug["HST"] = min(sug.get("HST", DEFAULT_SETTINGS["HST"]), sug["NMIN"] - MIN_ZONE_SEPARATION)
-            sug["SPT"] = max(sug.get("SPT", DEFAULT_SETTINGS["SPT"]), sug["NMAX"] + MIN_ZONE_SEPARATION)
-            sug["HPT"] = max(sug.get("HPT", DEFAULT_SETTINGS["HPT"]), sug.get("SPT",DEFAULT_SETTINGS["SPT"]) + MIN_ZONE_SEPARATION)
-
-        sug["HST"] = max(0, min(sug.get("HST", DEFAULT_SETTINGS["HST"]), sug["NMIN"] - MIN_ZONE_SEPARATION, 1023 - 4 * MIN_ZONE_SEPARATION))
-        sug["NMIN"] = max(sug["HST"] + MIN_ZONE_SEPARATION, min(sug.get("NMIN", DEFAULT_SETTINGS["NMIN"]), sug["NMAX"] - MIN_ZONE_SEPARATION, 1023 - 3 * MIN_ZONE_SEPARATION))
-        sug["NMAX"] = max(sug["NMIN"] + MIN_ZONE_SEPARATION, min(sug.get("NMAX", DEFAULT_SETTINGS["NMAX"]), sug.get("SPT", DEFAULT_SETTINGS["SPT"]) - MIN_ZONE_SEPARATION, 1023 - 2 * MIN_ZONE_SEPARATION))
-        sug["SPT"] = max(sug["NMAX"] + MIN_ZONE_SEPARATION, min(sug.get("SPT", DEFAULT_SETTINGS["SPT"]), sug.get("HPT", DEFAULT_SETTINGS["HPT"]) - MIN_ZONE_SEPARATION, 1023 - 1 * MIN_ZONE_SEPARATION))
-        sug["HPT"] = max(sug["SPT"] + MIN_ZONE_SEPARATION, min(sug.get("HPT", DEFAULT_SETTINGS["HPT"]), 1023))
-        
-        if sug["NMIN"] >= sug["NMAX"]:
-            sug["NMAX"] = sug["NMIN"] + MIN_ZONE_SEPARATION
-            sug["SPT"] = max(sug["NMAX"] + MIN_ZONE_SEPARATION, sug.get("SPT", DEFAULT_SETTINGS["SPT"]))
-            sug["HPT"] = max(sug["SPT"] + MIN_ZONE_SEPARATION, sug.get("HPT", DEFAULT_SETTINGS["HPT"]))
-
-        for k_val in ["HST", "NMIN", "NMAX", "SPT", "HPT"]:
-            sug[k_val] = int(max(0, min(1023, sug.get(k_val, DEFAULT_SETTINGS[k_val]))))
+        sug = self.engine.suggest_thresholds(self.collected_calibration_data, log=self._add_to_calib_log)
 
         self._add_to_calib_log("\nSuggested values for Tuner tab (Review & Apply Manually or via prompt):")
         for k, v_val in sug.items():
-            if k in ["HST", "NMIN", "NMAX", "SPT", "HPT"]:
-                self._add_to_calib_log(f"  {k}: {v_val}")
+            self._add_to_calib_log(f"  {k}: {v_val}")
 
         if messagebox.askyesno("Apply Suggestions?", "Apply these suggested pressure thresholds to Tuner sliders?", parent=self.root):
-            for k, v_val in sug.items():
-                if k in self.params_tkvars and k in ["HST", "NMIN", "NMAX", "SPT", "HPT"]:
-                    self.params_tkvars[k].set(v_val)
+            self.engine.settings.update(sug)
             self._add_to_calib_log("Pressure threshold suggestions applied to Tuner sliders.")
             if self.is_connected:
                 self.apply_all_settings()
@@ -1112,20 +1240,29 @@ class IntegratedMouthMouseApp:
         if hasattr(self, 'status_var'): self.status_var.set(message)
 
     def on_closing(self):
-        if self._mouse_trail_job_id:
-            self.root.after_cancel(self._mouse_trail_job_id)
-            self._mouse_trail_job_id = None
-        if self._calibration_collect_job: 
-            self.root.after_cancel(self._calibration_collect_job)
-            self._calibration_collect_job = None
+        self.ui_pump.stop()
+        self.engine.profiles.stop_watching()
+        if self._profiles_job: self.root.after_cancel(self._profiles_job); self._profiles_job = None
+        if self.hot_corners is not None: self.hot_corners.stop()
+        if self._reader_stats_job:
+            self.root.after_cancel(self._reader_stats_job)
+            self._reader_stats_job = None
+        if self.cursor_sampler is not None:
+            self.cursor_sampler.unsubscribe("trail"); self.cursor_sampler.unsubscribe("hover")
         if self.is_calibrating_arduino_mode: self.stop_arduino_calibration_mode(silent=True)
         self.trainer_target_active = False
-        self.stop_read_thread.set()
         if self.is_connected: self.toggle_connect() 
+        self.sessions.close() # Disconnects the devices not on screen
         self.root.destroy()
 
 if __name__ == "__main__":
+    startup = StartupProfiler(_STARTUP_T0, enabled="--profile-startup" in sys.argv[1:])
+    startup.mark("imports")
     root = ctk.CTk()
-    app = IntegratedMouthMouseApp(root)
+    startup.mark("Tk root window")
+    argv = sys.argv[1:]
+    profiles_location = argv[argv.index("--profiles") + 1] if "--profiles" in argv[:-1] else PROFILES_DIR # Directory or *.db
+    app = IntegratedMouthMouseApp(root, startup, profiles_location)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    root.after(0, lambda: root.after_idle(startup.report)) # Fires once the first frame has been drawn
     root.mainloop()
\ No newline at end of file
@@ -14,24 +14,54 @@ bool isRightPressed = false;
 // Cursor movement variables
 const int CURSOR_UPDATE_PERIOD = 10; // Time between cursor updates in milliseconds
 unsigned long cursorTimer = 0;
-const int CURSOR_SPEED = 10;         // Maximum cursor speed in pixels per update
+int cursorSpeed = 10;                // Maximum cursor speed in pixels per update (CSP)
 
 // Joystick variables
 const int JOYSTICK_DEADZONE = 10;    // Ignore joystick movements smaller than this
 int joystickX = 0;
 int joystickY = 0;
 
-// Pressure thresholds - these will need calibration for your specific sensor
-const int HARD_SIP_THRESHOLD = 360;  // Threshold for right click
+// Pressure thresholds - these will need calibration for your specific sensor.
+// The host uploads its values with SET_<KEY>:<v> or SETALL (see protocol.py).
+int hardSipThreshold = 360;          // Threshold for right click (HST)
 const int SOFT_SIP_THRESHOLD = 410;  // Threshold for scroll down
-const int NEUTRAL_MIN = 460;         // Lower bound of neutral zone
-const int NEUTRAL_MAX = 550;         // Upper bound of neutral zone
-const int SOFT_PUFF_THRESHOLD = 600; // Threshold for scroll up
-const int HARD_PUFF_THRESHOLD = 700; // Threshold for left click
+int neutralMin = 460;                // Lower bound of neutral zone (NMIN)
+int neutralMax = 550;                // Upper bound of neutral zone (NMAX)
+int softPuffThreshold = 600;         // Threshold for scroll up (SPT)
+int hardPuffThreshold = 700;         // Threshold for left click (HPT)
+int clickBand = 20;                  // Host pointer: clicks only within this % of stick center (JCB)
+
+// Host setting keys this firmware applies; any other key is accepted and ignored
+struct Setting {
+const char* key;
+int* value;
+};
+Setting settings[] = {
+{"HST", &hardSipThreshold}, {"NMIN", &neutralMin}, {"NMAX", &neutralMax},
+{"SPT", &softPuffThreshold}, {"HPT", &hardPuffThreshold}, {"CSP", &cursorSpeed},
+{"JCB", &clickBand},
+};
+const byte SETTING_COUNT = sizeof(settings) / sizeof(settings[0]);
+
+// Binary telemetry framing (see protocol.py on the host side)
+// Packet: sync | type | pressure (u16) | joyX (i16) | joyY (i16) | XOR checksum of type..joyY
+const byte PACKET_SYNC = 0xA5;
+const byte PKT_TELEMETRY = 0x01;
+const byte PKT_CALIBRATION = 0x02;
+const byte PKT_MOVE = 0x03;           // Host-relay firmware only, V2 moves the cursor itself
+const byte PKT_EVENT = 0x04;          // Host-relay firmware only
+bool binaryProtocol = false;          // Switched on by the host with "PROTO:BIN"
+bool hostPointer = false;             // "HOSTPTR:1": stream the raw stick, the host moves the cursor
+int lastPressure = 0;
+
+// Serial command input
+const byte COMMAND_BUFFER_LENGTH = 128; // Room for a SETALL of every setting
+char commandBuffer[COMMAND_BUFFER_LENGTH];
+byte commandLength = 0;
 
 void setup() {
 // Initialize serial communication for debugging (optional)
-Serial.begin(155200);
+Serial.begin(115200);
 Serial.println("Pro Micro Mouth-Operated Mouse");
 
 // Initialize the Mouse library
@@ -43,6 +73,9 @@ cursorTimer = millis() + CURSOR_UPDATE_PERIOD;
 }
 
 void loop() {
+// Handle host commands (protocol negotiation)
+handleSerialCommands();
+
 // Sample pressure sensor at regular intervals
 if (millis() >= sampleTimer) {
 samplePressure();
@@ -77,49 +110,205 @@ sum += samples[i];
 return sum / SAMPLE_LENGTH;
 }
 
+// Read host commands a byte at a time so the sampling loop never blocks
+void handleSerialCommands() {
+while (Serial.available() > 0) {
+char c = Serial.read();
+if (c == '\n' || c == '\r') {
+if (commandLength > 0) {
+commandBuffer[commandLength] = '\0';
+processCommand(commandBuffer);
+commandLength = 0;
+}
+}
+else if (commandLength < COMMAND_BUFFER_LENGTH - 1) {
+commandBuffer[commandLength++] = c;
+}
+}
+}
+
+void applySetting(const char* key, int value) {
+for (byte i = 0; i < SETTING_COUNT; i++) {
+if (strcmp(key, settings[i].key) == 0) {
+*settings[i].value = value;
+return;
+}
+}
+}
+
+// "SETALL:KEY=v,KEY=v*CS": CS is the XOR of the characters between ':' and '*' in hex.
+// Nothing is applied unless the checksum matches, so a torn line can't half-update.
+void processSetAll(char* payload) {
+char* star = strrchr(payload, '*');
+if (star == NULL || star == payload) {
+Serial.println("ERR:SETALL:FORMAT");
+return;
+}
+byte checksum = 0;
+for (char* p = payload; p < star; p++) {
+checksum ^= *p;
+}
+if (strtol(star + 1, NULL, 16) != checksum) {
+Serial.println("ERR:SETALL:CHECKSUM");
+return;
+}
+*star = '\0';
+for (char* pair = strtok(payload, ","); pair != NULL; pair = strtok(NULL, ",")) {
+char* eq = strchr(pair, '=');
+if (eq != NULL) {
+*eq = '\0';
+applySetting(pair, atoi(eq + 1));
+}
+}
+Serial.print("ACK:SETALL:");
+Serial.println(star + 1);
+}
+
+// FNV-1a of "HST=360,NMIN=460,...,JCB=20" over settings[], the same text the host hashes
+// (settings_hash() in protocol.py), so it can tell whether a re-upload is needed.
+uint32_t hashBytes(uint32_t hash, const char* text) {
+for (const char* p = text; *p != '\0'; p++) {
+hash = (hash ^ (byte)*p) * 16777619UL;
+}
+return hash;
+}
+
+void sendSettingsHash() {
+uint32_t hash = 2166136261UL;
+char number[8];
+for (byte i = 0; i < SETTING_COUNT; i++) {
+if (i > 0) {
+hash = hashBytes(hash, ",");
+}
+hash = hashBytes(hash, settings[i].key);
+hash = hashBytes(hash, "=");
+itoa(*settings[i].value, number, 10);
+hash = hashBytes(hash, number);
+}
+Serial.print("ACK:HASH:");
+Serial.println(hash, HEX);
+}
+
+void processCommand(char* command) {
+if (strncmp(command, "SETALL:", 7) == 0) {
+processSetAll(command + 7);
+}
+else if (strcmp(command, "HASH") == 0) {
+sendSettingsHash();
+}
+else if (strncmp(command, "SET_", 4) == 0) {
+char* colon = strchr(command + 4, ':');
+if (colon != NULL) {
+*colon = '\0';
+applySetting(command + 4, atoi(colon + 1));
+*colon = ':';
+Serial.print("ACK:");
+Serial.println(command);
+}
+}
+else if (strcmp(command, "PROTO:BIN") == 0) {
+Serial.println("ACK:PROTO:BIN");  // Last text line before binary telemetry starts
+binaryProtocol = true;
+}
+else if (strcmp(command, "PROTO:TXT") == 0) {
+binaryProtocol = false;
+Serial.println("ACK:PROTO:TXT");
+}
+else if (strcmp(command, "HOSTPTR:1") == 0) {
+hostPointer = true;
+Serial.println("ACK:HOSTPTR:1");
+}
+else if (strcmp(command, "HOSTPTR:0") == 0) {
+hostPointer = false;
+Serial.println("ACK:HOSTPTR:0");
+}
+}
+
+// Write one fixed-size binary packet
+void sendPacket(byte type, int pressure, int x, int y) {
+byte packet[9];
+packet[0] = PACKET_SYNC;
+packet[1] = type;
+packet[2] = pressure & 0xFF;
+packet[3] = (pressure >> 8) & 0xFF;
+packet[4] = x & 0xFF;
+packet[5] = (x >> 8) & 0xFF;
+packet[6] = y & 0xFF;
+packet[7] = (y >> 8) & 0xFF;
+byte checksum = 0;
+for (byte i = 1; i < 8; i++) {
+checksum ^= packet[i];
+}
+packet[8] = checksum;
+Serial.write(packet, sizeof(packet));
+}
+
+// Debug text would corrupt the packet stream, so it is only sent in text mode
+void debugPrint(const char* message) {
+if (!binaryProtocol) {
+Serial.println(message);
+}
+}
+
+// In host pointer mode a sip or puff only clicks while the stick is within JCB% of center,
+// so a click can't land mid-movement. The firmware moves the cursor itself otherwise.
+bool clicksAllowed() {
+if (!hostPointer) {
+return true;
+}
+long limit = (long)clickBand * 512 / 100;
+return (long)joystickX * joystickX + (long)joystickY * joystickY <= limit * limit;
+}
+
 // Process pressure reading and perform mouse actions
 void processPressure(int pressure) {
-// For debugging
-Serial.print("Pressure: ");
+lastPressure = pressure;
+if (binaryProtocol) {
+sendPacket(PKT_TELEMETRY, pressure, joystickX, joystickY);
+}
+else {
+// "P:<value>", the text telemetry line the host reads (live pressure, drift tracking)
+Serial.print("P:");
 Serial.println(pressure);
+}
 
 // Hard sip - right click
-if (pressure < HARD_SIP_THRESHOLD) {
-if (!isRightPressed) {
+if (pressure < hardSipThreshold) {
+if (!isRightPressed && clicksAllowed()) {
 Mouse.press(MOUSE_RIGHT);
 isRightPressed = true;
-Serial.println("Right click pressed");
+debugPrint("Right click pressed");
 }
 }
 // Soft sip - scroll down
-else if (pressure >= HARD_SIP_THRESHOLD && pressure < NEUTRAL_MIN) {
+else if (pressure >= hardSipThreshold && pressure < neutralMin) {
 Mouse.move(0, 0, -1);  // Scroll down
-Serial.println("Scroll down");
+debugPrint("Scroll down");
 }
 // Neutral zone - release buttons
-else if (pressure >= NEUTRAL_MIN && pressure <= NEUTRAL_MAX) {
+else if (pressure >= neutralMin && pressure <= neutralMax) {
 if (isLeftPressed) {
 Mouse.release(MOUSE_LEFT);
 isLeftPressed = false;
-Serial.println("Left click released");
+debugPrint("Left click released");
 }
 if (isRightPressed) {
 Mouse.release(MOUSE_RIGHT);
 isRightPressed = false;
-Serial.println("Right click released");
+debugPrint("Right click released");
 }
 }
 // Soft puff - scroll up
-else if (pressure > NEUTRAL_MAX && pressure <= SOFT_PUFF_THRESHOLD) {
+else if (pressure > neutralMax && pressure <= softPuffThreshold) {
 Mouse.move(0, 0, 1);  // Scroll up
-Serial.println("Scroll up");
+debugPrint("Scroll up");
 }
 // Hard puff - left click
-else if (pressure > HARD_PUFF_THRESHOLD) {
-if (!isLeftPressed) {
+else if (pressure > hardPuffThreshold) {
+if (!isLeftPressed && clicksAllowed()) {
 Mouse.press(MOUSE_LEFT);
 isLeftPressed = true;
-Serial.println("Left click pressed");
+debugPrint("Left click pressed");
 }
 }
 }
@@ -130,13 +319,27 @@ void updateCursorPosition() {
 joystickX = analogRead(A1) - 512; // Center at 0, using A1 on Pro Micro
 joystickY = analogRead(A2) - 512; // Center at 0, using A2 on Pro Micro
 
+// Host pointer mode: the host applies deadzone, speed and acceleration itself
+if (hostPointer) {
+if (binaryProtocol) {
+sendPacket(PKT_TELEMETRY, lastPressure, joystickX, joystickY);
+}
+else {
+Serial.print("JOY:");
+Serial.print(joystickX);
+Serial.print(",");
+Serial.println(joystickY);
+}
+return;
+}
+
 // Apply deadzone
 if (abs(joystickX) < JOYSTICK_DEADZONE) joystickX = 0;
 if (abs(joystickY) < JOYSTICK_DEADZONE) joystickY = 0;
 
 // Map joystick values to cursor movement speed
-int moveX = map(joystickX, -512, 512, -CURSOR_SPEED, CURSOR_SPEED);
-int moveY = map(joystickY, -512, 512, -CURSOR_SPEED, CURSOR_SPEED);
+int moveX = map(joystickX, -512, 512, -cursorSpeed, cursorSpeed);
+int moveY = map(joystickY, -512, 512, -cursorSpeed, cursorSpeed);
 
 // Invert Y axis so pushing forward moves cursor up
 moveY = -moveY;
@@ -145,10 +348,12 @@ moveY = -moveY;
 if (moveX != 0 || moveY != 0) {
 Mouse.move(moveX, moveY, 0);
 
+if (!binaryProtocol) {
 // For debugging
 Serial.print("Cursor move: X=");
 Serial.print(moveX);
 Serial.print(", Y=");
 Serial.println(moveY);
 }
+}
 }
\ No newline at end of file
@@ -0,0 +1,190 @@
+# Micro-benchmarks for the host-side hot paths.
+#
+#   python bench.py pressure-plot [--samples 500]
+#   python bench.py trail [--samples 500]
+#   python bench.py replay [--recording FILE] [--speed 0]
+#   python bench.py stream [--rate 5000] [--seconds 5] [--binary]
+#
+# GUI benchmarks need a display; on a headless box run them under xvfb-run.
+import argparse
+import math
+import random
+import time
+
+
+def _pressure_wave(n, seed=1):
+    rnd = random.Random(seed)
+    return [int(500 + 250 * math.sin(i / 40.0) + rnd.uniform(-15, 15)) for i in range(n)]
+
+
+def _legacy_pressure_redraw(canvas, w, h, label_area_width, font, thresholds, history):
+    # The pre-retained-mode renderer: delete everything and recreate it for each sample.
+    from pressure_plot import THRESHOLD_COLORS, THRESHOLD_KEYS
+    canvas.delete("all")
+    y_padding = 10
+    def pressure_to_y(p):
+        graph_height = max(1, h - 2 * y_padding)
+        return (h - y_padding) - ((max(0, min(1023, p)) / 1023.0) * graph_height)
+    for key in THRESHOLD_KEYS:
+        y = pressure_to_y(thresholds[key])
+        canvas.create_line(label_area_width, y, w, y, fill=THRESHOLD_COLORS[key], width=1, dash=(4, 2))
+        canvas.create_text(label_area_width - 5, y, text=f"{key}: {thresholds[key]}", anchor="e", font=font)
+    max_points = max(1, w - label_area_width)
+    step = (w - label_area_width) / max_points
+    points = []
+    for i, p in enumerate(history[-max_points:]):
+        points.extend([label_area_width + i * step, pressure_to_y(p)])
+    if len(points) >= 4: canvas.create_line(points, fill="cyan", width=2)
+
+
+def bench_pressure_plot(args):
+    import tkinter as tk
+    from tkinter import font as tkFont
+    from pressure_plot import PressurePlotRenderer, STRATEGIES
+
+    root = tk.Tk()
+    font = tkFont.Font(family="Arial", size=9)
+    label_area_width = 70; height = 450
+    thresholds = {"HST": 360, "NMIN": 460, "NMAX": 550, "SPT": 600, "HPT": 700}
+    print(f"Pressure plot redraw cost, {args.samples} samples after a full history")
+    print(f"{'width':>7}  {'strategy':<8}  {'ms/sample':>9}")
+    for width in args.widths:
+        max_points = width - label_area_width
+        wave = _pressure_wave(max_points + args.samples)
+        for name in ("legacy",) + STRATEGIES:
+            canvas = tk.Canvas(root, width=width, height=height, highlightthickness=0)
+            canvas.pack(); root.update()
+            history = list(wave[:max_points])
+            renderer = None
+            if name != "legacy":
+                renderer = PressurePlotRenderer(canvas, label_area_width, font, name)
+                renderer.set_thresholds(thresholds); renderer.resize(width, height, max_points)
+                renderer.render(history)
+            root.update_idletasks()
+            start = time.perf_counter()
+            for p in wave[max_points:max_points + args.samples]:
+                history.append(p); del history[0]
+                if renderer is None: _legacy_pressure_redraw(canvas, width, height, label_area_width, font, thresholds, history)
+                else: renderer.render(history, 1)
+                root.update_idletasks()
+            elapsed = time.perf_counter() - start
+            print(f"{width:>5}px  {name:<8}  {1000.0 * elapsed / args.samples:>9.3f}")
+            canvas.destroy()
+    root.destroy()
+
+
+def _legacy_trail_redraw(canvas, trail_ids, points):
+    # The pre-retained-mode trail: delete the old line and create a new one every frame.
+    for trail_id in trail_ids: canvas.delete(trail_id)
+    trail_ids.clear()
+    if len(points) > 1:
+        coords = []
+        for point in points: coords.extend(point)
+        trail_ids.append(canvas.create_line(coords, fill="darkgrey", width=2, tags="trail", smooth=True, splinesteps=5))
+
+
+def bench_trail(args):
+    import tkinter as tk
+    from collections import deque
+    from mouse_trail import MouseTrailRenderer, TRAIL_MODES
+
+    root = tk.Tk()
+    width, height = 800, 600; frame_budget_ms = 1000.0 / 60
+    path = [(width / 2 + 300 * math.cos(i / 15.0), height / 2 + 200 * math.sin(i / 11.0)) for i in range(args.samples)]
+    print(f"Trainer trail frame time, {args.samples} frames, 20-point trail, {frame_budget_ms:.1f} ms budget")
+    print(f"{'mode':<7}  {'mean ms':>8}  {'p99 ms':>8}  {'max ms':>8}  {'items':>6}")
+    for name in ("legacy",) + TRAIL_MODES:
+        canvas = tk.Canvas(root, width=width, height=height, bg="#DBDBDB", highlightthickness=0)
+        canvas.pack(); root.update()
+        points = deque(maxlen=20); trail_ids = []
+        renderer = None if name == "legacy" else MouseTrailRenderer(canvas, points.maxlen, "darkgrey", "#DBDBDB", name)
+        frames = []
+        for p in path:
+            start = time.perf_counter()
+            points.append(p)
+            if renderer is None: _legacy_trail_redraw(canvas, trail_ids, points)
+            else: renderer.render(points)
+            root.update()
+            frames.append(1000.0 * (time.perf_counter() - start))
+        frames.sort()
+        items = len(canvas.find_all())
+        print(f"{name:<7}  {sum(frames) / len(frames):>8.3f}  {frames[int(0.99 * (len(frames) - 1))]:>8.3f}  {frames[-1]:>8.3f}  {items:>6}")
+        canvas.destroy()
+    root.destroy()
+
+
+def _synthetic_recording(path, seconds=10.0, rate_hz=1000):
+    from recording import SessionRecorder, DIR_RX
+    recorder = SessionRecorder(path)
+    wave = _pressure_wave(int(seconds * rate_hz))
+    for i, p in enumerate(wave):
+        recorder.record(DIR_RX, f"P:{p}\nJOY:{i % 7 - 3},{i % 5 - 2}\n".encode(), t=recorder._t0 + i / rate_hz)
+    recorder.close()
+
+
+def bench_replay(args):
+    # Feeds a recording through the same reader/decoder path the read thread uses.
+    import os
+    import tempfile
+    from recording import ReplaySerial
+    from serial_reader import SerialReader
+
+    path = args.recording
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "synthetic.mrec")
+        _synthetic_recording(path)
+    ser = ReplaySerial(path, args.speed, timeout=0.05)
+    reader = SerialReader(ser)
+    messages = 0
+    start = time.perf_counter()
+    while not ser.finished: messages += len(reader.read_batch())
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {ser.bytes_replayed / 1024:.1f} KB, {messages} messages in {elapsed:.3f} s at speed {args.speed or 'max'}")
+    print(f"{ser.bytes_replayed / 1048576 / elapsed:.2f} MB/s | {messages / elapsed:.0f} msg/s | "
+          f"{reader.stats.reads} reads | dropped {reader.dropped_frames}")
+    ser.close()
+
+
+def bench_stream(args):
+    # Live throughput against the pty simulator, through pyserial like the app.
+    import serial
+    from simulator import DeviceSimulator
+    from serial_reader import SerialReader
+
+    with DeviceSimulator(args.rate, min(args.rate, 100), binary=args.binary) as sim:
+        ser = serial.Serial(sim.port, 115200, timeout=0.1)
+        reader = SerialReader(ser)
+        messages = 0; end = time.monotonic() + args.seconds
+        start = time.perf_counter()
+        while time.monotonic() < end: messages += len(reader.read_batch())
+        elapsed = time.perf_counter() - start
+        ser.close()
+        print(f"{'binary' if args.binary else 'text'} stream at {args.rate:.0f} Hz for {elapsed:.1f} s")
+        print(f"{messages / elapsed:.0f} msg/s received | {reader.summary()}")
+        print(sim.summary())
+
+
+BENCHMARKS = {
+    "pressure-plot": bench_pressure_plot,
+    "trail": bench_trail,
+    "replay": bench_replay,
+    "stream": bench_stream,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mouth mouse host micro-benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--widths", type=int, nargs="+", default=[450, 1000, 2000])
+    parser.add_argument("--recording", help="session recording for the replay benchmark (default: synthetic)")
+    parser.add_argument("--speed", type=float, default=0, help="replay speed, 0 = as fast as possible")
+    parser.add_argument("--rate", type=float, default=5000, help="simulator sample rate for the stream benchmark")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--binary", action="store_true", help="stream binary telemetry packets")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# Robust threshold suggestions from calibration samples (NumPy).
+#
+# Each action's samples are cleaned with a median/MAD outlier test, so a spike or a stray
+# transient can't drag a threshold. The remaining samples are the empirical class-conditional
+# distributions; the cut between each pair of adjacent zones minimises the balanced error
+# (fraction of the lower class above the cut + fraction of the upper class below it),
+# evaluated for every ADC value at once. The zones follow processPressure() in V2.ino:
+#   p < HST: Hard Sip | HST <= p < NMIN: Soft Sip | NMIN <= p <= NMAX: Neutral
+#   NMAX < p <= SPT: Soft Puff | SPT < p <= HPT: nothing | p > HPT: Hard Puff
+import importlib.util
+
+np = None # Imported when the analyzer first runs, not at startup (it takes ~130 ms)
+
+ACTIONS = ("Hard Sip", "Soft Sip", "Neutral", "Soft Puff", "Hard Puff") # Low to high pressure
+ZONES = ("Hard Sip", "Soft Sip", "Neutral", "Soft Puff", "None", "Hard Puff")
+ADC_MAX = 1023
+MAD_SCALE = 1.4826 # MAD -> standard deviation for normal data
+
+
+def available():
+    return np is not None or importlib.util.find_spec("numpy") is not None
+
+
+def _load_numpy():
+    global np
+    if np is None: import numpy as np
+    return np
+
+
+def classify(values, thresholds):
+    # Zone index (into ZONES) of every sample for ordered thresholds.
+    _load_numpy()
+    p = np.asarray(values)
+    return ((p >= thresholds["HST"]).astype(np.int8) + (p >= thresholds["NMIN"]) + (p > thresholds["NMAX"])
+            + (p > thresholds["SPT"]) + (p > thresholds["HPT"]))
+
+
+def reject_outliers(values, k=3.5):
+    # Keeps samples within k robust standard deviations of the median.
+    _load_numpy()
+    x = np.asarray(values, dtype=np.float64)
+    if x.size == 0: return x, 0.0
+    median = np.median(x)
+    mad = MAD_SCALE * np.median(np.abs(x - median))
+    keep = np.abs(x - median) <= k * max(mad, 1.0)
+    return x[keep], mad
+
+
+def trimmed_mean(x, proportion=0.1):
+    if x.size == 0: return 0.0
+    _load_numpy()
+    cut = int(x.size * proportion)
+    s = np.sort(x)
+    return float(s[cut:x.size - cut].mean()) if x.size > 2 * cut else float(s.mean())
+
+
+def best_cut(lower, upper):
+    # Cut c (lower correct iff p < c) minimising the balanced error; ties go to the middle
+    # of the widest optimal plateau, i.e. the largest margin to both classes.
+    _load_numpy()
+    cuts = np.arange(ADC_MAX + 2)
+    lower = np.sort(lower); upper = np.sort(upper)
+    err = (1.0 - np.searchsorted(lower, cuts, "left") / lower.size) + np.searchsorted(upper, cuts, "left") / upper.size
+    best = np.flatnonzero(err <= err.min() + 1e-12)
+    runs = np.split(best, np.flatnonzero(np.diff(best) > 1) + 1)
+    run = max(runs, key=len)
+    return int(run[len(run) // 2]), float(err.min() / 2)
+
+
+class RobustCalibrationAnalyzer:
+    MIN_ZONE_SEPARATION = 25
+    OUTLIER_K = 3.5
+    TAIL_QUANTILE = 0.5 # Percent; one-sided boundaries sit this far into the other class's tail
+
+    def __init__(self, log=print):
+        self.log = log
+        self.last_stats = {}; self.last_confusion = None
+
+    def action_stats(self, collected):
+        _load_numpy(); stats = {}
+        for action, samples in collected.items():
+            raw = np.asarray(samples, dtype=np.float64)
+            clean, mad = reject_outliers(raw, self.OUTLIER_K)
+            if clean.size == 0:
+                stats[action] = {"count": int(raw.size), "kept": 0, "samples": clean}; continue
+            p5, p50, p95 = np.percentile(clean, (5, 50, 95))
+            stats[action] = {"count": int(raw.size), "kept": int(clean.size), "samples": clean, "median": float(p50),
+                             "trimmed_mean": trimmed_mean(clean), "mad": float(mad), "p5": float(p5), "p95": float(p95),
+                             "low": float(np.percentile(clean, self.TAIL_QUANTILE)), "high": float(np.percentile(clean, 100 - self.TAIL_QUANTILE))}
+            s = stats[action]
+            self.log(f"{action}: median={s['median']:.0f}, trimmed mean={s['trimmed_mean']:.1f}, p5-p95={s['p5']:.0f}-{s['p95']:.0f}, "
+                     f"MAD={s['mad']:.1f} (kept {s['kept']}/{s['count']})")
+        return stats
+
+    def _cut(self, stats, lower, upper):
+        # None when neither side was recorded; one side only puts the cut just past its tail.
+        a = stats.get(lower); b = stats.get(upper)
+        a = a if a and a["kept"] else None; b = b if b and b["kept"] else None
+        sep = self.MIN_ZONE_SEPARATION
+        if a and b:
+            cut, error = best_cut(a["samples"], b["samples"])
+            self.log(f"{lower} | {upper}: cut at {cut}, expected overlap {error * 100:.1f}%")
+            return cut
+        if a: return int(round(a["high"])) + sep
+        if b: return int(round(b["low"])) - sep + 1
+        return None
+
+    def suggest(self, collected, current):
+        _load_numpy()
+        stats = self.action_stats(collected)
+        self.last_stats = stats
+        sep = self.MIN_ZONE_SEPARATION; half = sep // 2
+        cut_hs = self._cut(stats, "Hard Sip", "Soft Sip")
+        cut_ss = self._cut(stats, "Soft Sip", "Neutral")
+        cut_n = self._cut(stats, "Neutral", "Soft Puff")
+        cut_sp = self._cut(stats, "Soft Puff", "Hard Puff")
+        values = [current["HST"] if cut_hs is None else cut_hs, current["NMIN"] if cut_ss is None else cut_ss,
+                  current["NMAX"] if cut_n is None else cut_n - 1, current["SPT"], current["HPT"]]
+        # The SPT..HPT band is dead on the device: straddle the soft/hard puff cut with it.
+        if cut_sp is not None: values[3] = cut_sp - 1 - half; values[4] = cut_sp - 1 + (sep - half)
+        for i in range(1, len(values)): values[i] = max(values[i], values[i - 1] + sep)
+        values[-1] = min(values[-1], ADC_MAX)
+        for i in range(len(values) - 2, -1, -1): values[i] = min(values[i], values[i + 1] - sep)
+        sug = {key: int(max(0, v)) for key, v in zip(("HST", "NMIN", "NMAX", "SPT", "HPT"), values)}
+        self.last_confusion = self.confusion_matrix(collected, sug)
+        self.log_confusion(self.last_confusion)
+        return sug
+
+    def confusion_matrix(self, collected, thresholds):
+        # {action: fraction of its raw samples landing in each of ZONES}
+        _load_numpy(); matrix = {}
+        for action in ACTIONS:
+            samples = collected.get(action)
+            if samples is None or len(samples) == 0: continue
+            counts = np.bincount(classify(samples, thresholds), minlength=len(ZONES))
+            matrix[action] = counts / counts.sum()
+        return matrix
+
+    def log_confusion(self, matrix):
+        if not matrix: return
+        self.log("Predicted zones (% of samples):")
+        self.log("  " + " " * 10 + "".join(f"{zone[:9]:>10}" for zone in ZONES))
+        for action, row in matrix.items():
+            self.log(f"  {action:<10}" + "".join(f"{100 * v:>10.1f}" for v in row))
+
+
+class Segment:
+    __slots__ = ("direction", "start", "end", "samples")
+
+    def __init__(self, direction, start, end, samples):
+        self.direction = direction; self.start = start; self.end = end; self.samples = samples
+
+    @property
+    def level(self):
+        return sum(self.samples) / len(self.samples) if self.samples else 0.0
+
+
+class OnsetSegmenter:
+    # Splits a live CALIB_P stream into held sips and puffs, O(1) per sample.
+    # At rest, EWMAs track the baseline and its mean absolute deviation (the noise). A
+    # segment starts when the signal leaves the baseline by enter_k noise units and ends
+    # when it comes back within exit_k (hysteresis). Inside a segment a fast EWMA follows
+    # the level; a sample only counts as plateau once settle consecutive samples have stayed
+    # within plateau_k noise units (or plateau_rel of the excursion) of it, which drops the
+    # onset ramp, and the last settle plateau samples are dropped at the end, which covers
+    # the start of the release.
+    SIP = -1
+    PUFF = 1
+
+    def __init__(self, baseline_alpha=0.01, noise_alpha=0.05, enter_k=6.0, exit_k=3.0, min_enter=15.0,
+                 level_alpha=0.25, plateau_k=3.0, plateau_rel=0.08, settle=4, min_plateau=10, warmup=30):
+        self.baseline_alpha = baseline_alpha; self.noise_alpha = noise_alpha
+        self.enter_k = enter_k; self.exit_k = exit_k; self.min_enter = min_enter
+        self.level_alpha = level_alpha; self.plateau_k = plateau_k; self.plateau_rel = plateau_rel
+        self.settle = settle; self.min_plateau = min_plateau; self.warmup = warmup
+        self.baseline = None; self.noise = 2.0; self.count = 0
+        self.active = False; self.direction = 0; self._start = 0
+        self._level = 0.0; self._run = 0; self._plateau = []; self._recent = [0] * settle
+        self.segments = 0; self.rejected = 0
+
+    @property
+    def at_rest(self):
+        return not self.active and self.count > self.warmup
+
+    def _enter_threshold(self):
+        return max(self.min_enter, self.enter_k * self.noise)
+
+    def feed(self, p):
+        # Returns a finished Segment, or None.
+        self.count += 1
+        if self.baseline is None: self.baseline = float(p); return None
+        d = p - self.baseline
+        if not self.active:
+            if self.count > self.warmup and abs(d) > self._enter_threshold():
+                self.active = True; self.direction = self.PUFF if d > 0 else self.SIP; self._start = self.count - 1
+                self._level = float(p); self._run = 0; self._plateau = []
+                return None
+            self.baseline += self.baseline_alpha * d
+            self.noise += self.noise_alpha * (abs(d) - self.noise)
+            if self.noise < 1.0: self.noise = 1.0
+            return None
+        if d * self.direction < max(self.exit_k * self.noise, self.min_enter / 2): return self._finish()
+        self._level += self.level_alpha * (p - self._level)
+        band = max(self.plateau_k * self.noise, self.plateau_rel * abs(self._level - self.baseline))
+        if abs(p - self._level) <= band:
+            if self._run < self.settle:
+                self._recent[self._run] = p; self._run += 1
+                if self._run == self.settle: self._plateau.extend(self._recent)
+            else: self._plateau.append(p)
+        else: self._run = 0
+        return None
+
+    def _finish(self):
+        self.active = False
+        plateau = self._plateau[:-self.settle] if len(self._plateau) > self.settle else []
+        self._plateau = []
+        if len(plateau) < self.min_plateau: self.rejected += 1; return None
+        self.segments += 1
+        return Segment(self.direction, self._start, self.count - 1, plateau)
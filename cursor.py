@@ -0,0 +1,191 @@
+# Cursor position sampling shared by the trainer loops and the hot-corner monitor.
+import time
+
+from injection import LatencyStats
+
+CORNERS = ("top_left", "top_right", "bottom_left", "bottom_right")
+
+
+class HotCornerMonitor:
+    # Fires an action when the cursor enters a screen corner. Positions come from
+    # feed_position() (a shared sampler or any code that already knows the cursor) and from
+    # the monitor's own polls, which back off with the distance to the nearest zone: the
+    # cursor can't reach a corner faster than max_speed_px_per_ms, so there is no point in
+    # asking the window system before then. Relative moves injected by the host relay are
+    # dead-reckoned onto the last known position; when that brings a corner closer than the
+    # scheduled poll allows for, wake() (thread-safe, e.g. a UI pump post) gets reschedule()
+    # called on the Tk thread, which pulls the poll in.
+    def __init__(self, root, get_position, screen_size, zone_size, actions,
+                 min_interval_ms=50, max_interval_ms=1000, max_speed_px_per_ms=4.0, wake=None):
+        self.root = root; self.get_position = get_position; self.wake = wake
+        self.screen_width, self.screen_height = screen_size
+        self.zone_size = zone_size
+        self.actions = {corner: action for corner, action in actions.items() if action and corner in CORNERS}
+        self.min_interval_ms = min_interval_ms; self.max_interval_ms = max_interval_ms
+        self.max_speed_px_per_ms = max_speed_px_per_ms
+        self._job = None; self._running = False; self._due = 0.0 # monotonic time of the scheduled poll
+        self._last_pos = None; self._last_pos_time = 0.0; self._active_corner = None
+        self._pending_dx = 0; self._pending_dy = 0
+        self.polls = 0; self.fed_positions = 0; self.triggers = 0; self.reschedules = 0
+        self.poll_cost = LatencyStats(window=256)
+        self._started_at = time.monotonic()
+
+    def start(self):
+        self._running = True; self._started_at = time.monotonic()
+        if self._job is None: self._job = self.root.after(0, self._poll); self._due = time.monotonic()
+
+    def stop(self):
+        self._running = False
+        if self._job is not None: self.root.after_cancel(self._job); self._job = None
+
+    def notify_relative_move(self, dx, dy):
+        # Called from the relay thread; plain int adds are safe under the GIL.
+        self._pending_dx += dx; self._pending_dy += dy
+        if self.wake is not None and self._running and time.monotonic() + self.next_interval_ms() / 1000.0 < self._due:
+            self.wake()
+
+    def reschedule(self):
+        # Tk thread: moves the pending poll earlier if the dead-reckoned position calls for it.
+        if not self._running or self._job is None: return
+        interval_ms = self.next_interval_ms()
+        if time.monotonic() + interval_ms / 1000.0 >= self._due: return
+        self.root.after_cancel(self._job); self.reschedules += 1
+        self._schedule(interval_ms)
+
+    def _schedule(self, interval_ms):
+        self._job = self.root.after(interval_ms, self._poll); self._due = time.monotonic() + interval_ms / 1000.0
+
+    def feed_position(self, x, y):
+        self.fed_positions += 1
+        self._update(x, y)
+
+    def corner_at(self, x, y):
+        z = self.zone_size
+        left = x < z; right = x > self.screen_width - z
+        top = y < z; bottom = y > self.screen_height - z
+        if top and left: return "top_left"
+        if top and right: return "top_right"
+        if bottom and left: return "bottom_left"
+        if bottom and right: return "bottom_right"
+        return None
+
+    def distance_to_zone(self, x, y):
+        # Chebyshev-style distance to the nearest monitored corner square.
+        best = None; z = self.zone_size; w = self.screen_width; h = self.screen_height
+        for corner in self.actions:
+            dx = max(0, x - z) if corner.endswith("left") else max(0, (w - z) - x)
+            dy = max(0, y - z) if corner.startswith("top") else max(0, (h - z) - y)
+            d = max(dx, dy)
+            if best is None or d < best: best = d
+        return best if best is not None else float("inf")
+
+    def next_interval_ms(self):
+        if self._last_pos is None: return self.min_interval_ms
+        x = self._last_pos[0] + self._pending_dx; y = self._last_pos[1] + self._pending_dy
+        interval = self.distance_to_zone(x, y) / self.max_speed_px_per_ms
+        return int(max(self.min_interval_ms, min(self.max_interval_ms, interval)))
+
+    def _update(self, x, y):
+        self._last_pos = (x, y); self._last_pos_time = time.monotonic()
+        self._pending_dx = 0; self._pending_dy = 0 # A real position already includes the moves so far
+        corner = self.corner_at(x, y)
+        if corner != self._active_corner:
+            self._active_corner = corner
+            action = self.actions.get(corner)
+            if action is not None:
+                self.triggers += 1
+                action()
+
+    def _poll(self):
+        self._job = None
+        if not self._running: return
+        # Skip the round-trip if someone fed a position more recently than we would poll.
+        if self._last_pos is None or (time.monotonic() - self._last_pos_time) * 1000 >= self.min_interval_ms:
+            start = time.perf_counter()
+            try: x, y = self.get_position()
+            except Exception: x = y = None
+            self.poll_cost.record(time.perf_counter() - start); self.polls += 1
+            if x is not None: self._update(x, y)
+        if self._running: self._schedule(self.next_interval_ms())
+
+    def summary(self):
+        elapsed = max(1e-6, time.monotonic() - self._started_at)
+        return (f"hot corners: {self.polls / elapsed:.1f} polls/s (+{self.fed_positions} fed, {self.reschedules} pulled in by moves), "
+                f"poll cost p50 {self.poll_cost.percentile(50):.2f} ms, next in {self.next_interval_ms()} ms")
+
+
+class CursorSampler:
+    # One pyautogui.position() per tick, fanned out to subscribers at their own rates
+    # (rounded to whole ticks). Keep-alive subscribers keep the timer running; passive ones
+    # (e.g. the hot-corner monitor) only ride along while someone else needs samples.
+    # Widget root offsets are cached and dropped on any <Configure> under the toplevel,
+    # which covers widget resizes as well as window moves.
+    def __init__(self, root, get_position, interval_ms=16):
+        self.root = root; self.get_position = get_position
+        self.interval_ms = interval_ms
+        self._subscribers = {} # name -> [callback, every_n_ticks, countdown, keep_alive]
+        self._offsets = {}
+        self._job = None
+        self.samples = 0; self.offset_lookups = 0
+        self.sample_cost = LatencyStats(window=512); self.fanout_cost = LatencyStats(window=512)
+        self._started_at = time.monotonic(); self._samples_at_start = 0
+        root.bind("<Configure>", self.invalidate_offsets, add="+")
+
+    def subscribe(self, name, callback, interval_ms=None, keep_alive=True):
+        every = max(1, round((interval_ms or self.interval_ms) / self.interval_ms))
+        self._subscribers[name] = [callback, every, 1, keep_alive]
+        if keep_alive and self._job is None:
+            self._started_at = time.monotonic(); self._samples_at_start = self.samples
+            self._job = self.root.after(self.interval_ms, self._tick)
+
+    def unsubscribe(self, name):
+        self._subscribers.pop(name, None)
+        if self._job is not None and not self._has_keep_alive():
+            self.root.after_cancel(self._job); self._job = None
+
+    def is_subscribed(self, name):
+        return name in self._subscribers
+
+    @property
+    def running(self):
+        return self._job is not None
+
+    def _has_keep_alive(self):
+        return any(sub[3] for sub in self._subscribers.values())
+
+    def invalidate_offsets(self, event=None):
+        self._offsets.clear()
+
+    def to_widget(self, widget, x, y):
+        # Global screen position -> widget coordinates, or None if the widget is gone.
+        offset = self._offsets.get(widget)
+        if offset is None:
+            try: offset = (widget.winfo_rootx(), widget.winfo_rooty())
+            except Exception: return None
+            self._offsets[widget] = offset; self.offset_lookups += 1
+        return x - offset[0], y - offset[1]
+
+    def _tick(self):
+        self._job = None
+        start = time.perf_counter()
+        try: x, y = self.get_position()
+        except Exception: x = y = None
+        fanout_start = time.perf_counter()
+        self.sample_cost.record(fanout_start - start); self.samples += 1
+        if x is not None:
+            for sub in list(self._subscribers.values()):
+                sub[2] -= 1
+                if sub[2] > 0: continue
+                sub[2] = sub[1]
+                sub[0](x, y)
+        self.fanout_cost.record(time.perf_counter() - fanout_start)
+        if self._has_keep_alive(): self._job = self.root.after(self.interval_ms, self._tick)
+
+    def sample_rate(self):
+        elapsed = time.monotonic() - self._started_at
+        return (self.samples - self._samples_at_start) / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        state = f"{self.sample_rate():.1f} samples/s" if self.running else "idle"
+        return (f"cursor sampler: {state}, {len(self._subscribers)} subscribers, "
+                f"sample p50 {self.sample_cost.percentile(50):.2f} ms, fan-out p99 {self.fanout_cost.percentile(99):.2f} ms")
@@ -0,0 +1,100 @@
+# Opt-in tracking of the neutral pressure baseline during a session.
+#
+# The sensor's rest reading drifts (temperature, condensation in the tube), which slowly
+# walks the calibrated NMIN..NMAX band off the user's actual rest pressure. DriftAdapter
+# watches the P: stream and only learns while the user is demonstrably at rest: the reading
+# has stayed within rest_tolerance of the current baseline estimate, and clear of the click
+# thresholds, for rest_min_s. At rest the baseline follows an EWMA (time constant tau_s).
+# The first settled baseline after enabling (or after the user changes a threshold) is the
+# reference; when the baseline has moved by min_step or more, all five pressure thresholds
+# are shifted together, by at most max_step per adjust_interval_s and max_total_shift in
+# total. Every adjustment is appended to a JSON-lines audit log.
+import json
+import math
+import time
+
+from engine import EVENT_SETTING_CHANGED, PRESSURE_KEYS
+
+DRIFT_LOG_PATH = "drift_adjustments.jsonl"
+
+
+class DriftAdapter:
+    def __init__(self, settings, apply=None, log_path=DRIFT_LOG_PATH, status=None, tau_s=20.0, rest_tolerance=12.0,
+                 rest_min_s=2.0, learn_s=5.0, min_step=3, max_step=5, adjust_interval_s=15.0, max_total_shift=80):
+        self.settings = settings; self.apply = apply; self.log_path = log_path; self.status = status
+        self.tau_s = tau_s; self.rest_tolerance = rest_tolerance; self.rest_min_s = rest_min_s; self.learn_s = learn_s
+        self.min_step = min_step; self.max_step = max_step
+        self.adjust_interval_s = adjust_interval_s; self.max_total_shift = max_total_shift
+        self.baseline = None; self.reference = None; self.shift = 0
+        self._rest_since = None; self._learned_s = 0.0; self._last_t = None; self._last_adjust = -math.inf
+        self._adjusting = False
+        self.adjustments = []; self.rest_samples = 0
+        self._unsubscribe = settings.subscribe(EVENT_SETTING_CHANGED, self._on_setting_changed)
+
+    def close(self):
+        self._unsubscribe()
+
+    def reset(self, reason):
+        self.reference = None; self.shift = 0; self._learned_s = 0.0
+        self._audit({"event": "reset", "reason": reason, "baseline": self._round(self.baseline)})
+
+    def _on_setting_changed(self, key, value):
+        # A threshold set by the user (or a profile) becomes the new reference point.
+        if not self._adjusting and key in PRESSURE_KEYS and self.reference is not None: self.reset(f"{key} changed to {value}")
+
+    def feed(self, p, t=None):
+        # Called on the read thread with each P: value.
+        t = time.monotonic() if t is None else t
+        dt = 0.0 if self._last_t is None else min(1.0, t - self._last_t)
+        self._last_t = t
+        s = self.settings
+        if self.baseline is None:
+            if s.get("NMIN") <= p <= s.get("NMAX"): self.baseline = float(p)
+            return
+        if abs(p - self.baseline) > self.rest_tolerance or not s.get("HST") < p < s.get("HPT"):
+            self._rest_since = None; return
+        if self._rest_since is None: self._rest_since = t
+        if t - self._rest_since < self.rest_min_s: return
+        self.rest_samples += 1
+        self.baseline += (1.0 - math.exp(-dt / self.tau_s)) * (p - self.baseline)
+        if self.reference is None:
+            self._learned_s += dt
+            if self._learned_s >= self.learn_s:
+                self.reference = self.baseline - self.shift
+                self._audit({"event": "reference", "baseline": self._round(self.baseline)})
+            return
+        self._maybe_adjust(t)
+
+    def _maybe_adjust(self, t):
+        target = int(round(self.baseline - self.reference))
+        target = max(-self.max_total_shift, min(self.max_total_shift, target))
+        delta = target - self.shift
+        if abs(delta) < self.min_step or t - self._last_adjust < self.adjust_interval_s: return
+        delta = max(-self.max_step, min(self.max_step, delta))
+        old = {k: self.settings.get(k) for k in PRESSURE_KEYS}
+        new = {k: max(0, min(1023, v + delta)) for k, v in old.items()}
+        self._adjusting = True
+        try: self.settings.update(new)
+        finally: self._adjusting = False
+        self.shift += delta; self._last_adjust = t
+        entry = {"event": "adjust", "delta": delta, "total_shift": self.shift, "baseline": self._round(self.baseline),
+                 "reference": self._round(self.reference), "old": old, "new": new}
+        self.adjustments.append(entry); self._audit(entry)
+        if self.status: self.status(f"Drift: thresholds shifted {delta:+d} (total {self.shift:+d}, baseline {self.baseline:.0f})")
+        if self.apply: self.apply()
+
+    @staticmethod
+    def _round(value):
+        return None if value is None else round(value, 1)
+
+    def _audit(self, entry):
+        if not self.log_path: return
+        entry = dict(entry, time=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        try:
+            with open(self.log_path, "a") as f: f.write(json.dumps(entry) + "\n")
+        except OSError as e: print(f"Drift log write failed: {e}")
+
+    def summary(self):
+        if self.baseline is None: return "drift: waiting for a neutral reading"
+        reference = "learning" if self.reference is None else f"ref {self.reference:.1f}"
+        return f"drift: baseline {self.baseline:.1f} ({reference}), shift {self.shift:+d}, {len(self.adjustments)} adjustments"
@@ -0,0 +1,682 @@
+# Headless core of the mouth mouse host: connection, message dispatch, settings, profiles,
+# calibration analysis and the mouse relay, with plain Python state and an observer API.
+# App.py is one subscriber; `python engine.py --port ...` (or `App.py --headless`) runs the
+# device relay as a background service without Tk.
+#
+# Observers are called on the thread that produced the event: the serial read thread for
+# device data, the caller's thread for everything else. GUI subscribers must hand off to
+# their own thread (App.py posts to its UiPump).
+import argparse
+import os
+import queue
+import signal
+import threading
+import time
+
+from serial_reader import SerialReader
+from injection import LatencyStats, MouseInjector, MouseRelay, create_injection_backend
+from pointer import PointerPipeline
+from profiles import open_profile_store
+from calibration import RobustCalibrationAnalyzer, available as robust_calibration_available
+from recording import SessionRecorder, RecordingSerial, open_serial, REPLAY_PREFIX, RECORDING_EXTENSION
+from protocol import (StreamDecoder, encode_setall, split_setall, settings_hash, parse_hash_reply, PROTOCOL_BINARY_COMMAND,
+                      PROTOCOL_BINARY_ACK, SETALL_ACK, SETALL_ERROR, HASH_COMMAND, HASH_ACK, MSG_CALIB, MSG_PRESSURE, MSG_JOY, MSG_MOVE, MSG_EVENT, MSG_STATUS)
+
+PROFILES_DIR = "mouse_profiles"
+RECORDINGS_DIR = "recordings"
+
+DEFAULT_SETTINGS = {
+    "HST": 360, "NMIN": 460, "NMAX": 550, "SPT": 600, "HPT": 700,
+    "JDZ": 20, "CSP": 10, "SAD": 150, "JMT": 5, "JFR": 100, "JCB": 20,
+    "JRC": 0.5, "JIR": 0.3, "JPA": 50,
+}
+FLOAT_SETTINGS = ("JRC", "JIR") # Seconds; sent to the firmware in tenths
+PRESSURE_KEYS = ("HST", "NMIN", "NMAX", "SPT", "HPT")
+CLICK_RELEASES = {"LEFT_CLICK_DOWN": "LEFT_CLICK_UP", "RIGHT_CLICK_DOWN": "RIGHT_CLICK_UP"}
+
+EVENT_CONNECTED = "connected"
+EVENT_DISCONNECTED = "disconnected"
+EVENT_STATUS = "status"
+EVENT_PRESSURE = "pressure"
+EVENT_CALIB = "calib"
+EVENT_JOY = "joy"
+EVENT_SERIAL_ERROR = "serial_error"
+EVENT_SETTING_CHANGED = "setting_changed"
+EVENT_SETTINGS_APPLIED = "settings_applied" # (keys, seconds from first SETALL to last ACK)
+EVENT_DEVICE_READY = "device_ready" # (how the settings were synced, seconds since connect() was called)
+
+
+def coerce_setting(key, value):
+    return float(value) if key in FLOAT_SETTINGS else int(value)
+
+
+def device_value(key, value):
+    return int(round(float(value) * 10)) if key in FLOAT_SETTINGS else int(value)
+
+
+def is_ordered(t):
+    # The zone order processPressure() in V2.ino assumes; any other set scrolls or clicks at rest.
+    return t["HST"] < t["NMIN"] <= t["NMAX"] < t["SPT"] <= t["HPT"]
+
+
+class Observable:
+    def __init__(self):
+        self._observers = {}
+
+    def subscribe(self, event, callback):
+        self._observers.setdefault(event, []).append(callback)
+        return lambda: self.unsubscribe(event, callback)
+
+    def unsubscribe(self, event, callback):
+        callbacks = self._observers.get(event)
+        if callbacks and callback in callbacks: callbacks.remove(callback)
+
+    def emit(self, event, *args):
+        for callback in tuple(self._observers.get(event, ())):
+            try: callback(*args)
+            except Exception as e: print(f"Observer for '{event}' failed: {e}")
+
+
+class TrailingThrottle:
+    # Calls callback() at most once per interval_s, at the end of the interval, so a burst of
+    # trigger()s costs one call and the call always sees the state after the last trigger.
+    def __init__(self, callback, interval_s):
+        self.callback = callback; self.interval_s = interval_s
+        self._lock = threading.Lock(); self._timer = None
+        self.triggers = 0; self.calls = 0
+
+    def trigger(self):
+        with self._lock:
+            self.triggers += 1
+            if self._timer is not None: return
+            self._timer = threading.Timer(self.interval_s, self._fire)
+            self._timer.daemon = True; self._timer.start()
+
+    def _fire(self):
+        with self._lock: self._timer = None
+        self.calls += 1
+        self.callback()
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None: self._timer.cancel(); self._timer = None
+
+
+class SettingsStore(Observable):
+    # Current parameter values; emits EVENT_SETTING_CHANGED(key, value) on real changes only,
+    # so two-way bindings (e.g. Tk variables) don't loop.
+    def __init__(self, defaults=DEFAULT_SETTINGS):
+        super().__init__()
+        self.defaults = dict(defaults)
+        self._values = dict(defaults)
+
+    def get(self, key):
+        return self._values[key]
+
+    def set(self, key, value):
+        if key not in self.defaults: return False
+        value = coerce_setting(key, value)
+        if self._values.get(key) == value: return False
+        self._values[key] = value
+        self.emit(EVENT_SETTING_CHANGED, key, value)
+        return True
+
+    def update(self, values):
+        return [key for key, value in values.items() if self.set(key, value)]
+
+    def reset(self):
+        return self.update(self.defaults)
+
+    def as_dict(self):
+        return dict(self._values)
+
+    def device_values(self):
+        return {key: device_value(key, value) for key, value in self._values.items()}
+
+
+class CalibrationAnalyzer:
+    # Suggests pressure thresholds from per-action sample lists ("Neutral", "Soft Sip", ...).
+    # Used when NumPy is missing; calibration.RobustCalibrationAnalyzer replaces it otherwise.
+    MIN_ZONE_SEPARATION = 25
+    KNOWN_NEUTRAL_LOW = 425  # MODIFIED: User's typical low neutral
+    KNOWN_NEUTRAL_HIGH = 520 # MODIFIED: User's typical high neutral
+
+    def __init__(self, log=print):
+        self.log = log
+
+    def action_stats(self, collected):
+        stats = {}
+        for action, samples in collected.items():
+            if samples:
+                avg = sum(samples) // len(samples)
+                m_min = min(samples)
+                m_max = max(samples)
+            else:
+                avg, m_min, m_max = 0, 0, 0
+            stats[action] = {"avg": avg, "min": m_min, "max": m_max, "count": len(samples)}
+            self.log(f"{action}: Avg={avg}, Min={m_min}, Max={m_max} (Cnt:{len(samples)})")
+        return stats
+
+    def suggest(self, collected, current):
+        log = self.log
+        stats = self.action_stats(collected)
+        sug = {k: current.get(k, DEFAULT_SETTINGS[k]) for k in DEFAULT_SETTINGS}
+        MIN_ZONE_SEPARATION = self.MIN_ZONE_SEPARATION
+        KNOWN_NEUTRAL_LOW = self.KNOWN_NEUTRAL_LOW; KNOWN_NEUTRAL_HIGH = self.KNOWN_NEUTRAL_HIGH
+
+        if KNOWN_NEUTRAL_LOW >= KNOWN_NEUTRAL_HIGH:
+            log(f"Warning: KNOWN_NEUTRAL_LOW ({KNOWN_NEUTRAL_LOW}) is not less than KNOWN_NEUTRAL_HIGH ({KNOWN_NEUTRAL_HIGH}). Using defaults for known range.")
+            known_neutral_low_eff = DEFAULT_SETTINGS["NMIN"]
+            known_neutral_high_eff = DEFAULT_SETTINGS["NMAX"]
+        else:
+            known_neutral_low_eff = KNOWN_NEUTRAL_LOW
+            known_neutral_high_eff = KNOWN_NEUTRAL_HIGH
+
+        sug["NMIN"] = known_neutral_low_eff
+        sug["NMAX"] = known_neutral_high_eff
+
+        neutral_data = stats.get("Neutral")
+        if neutral_data and neutral_data["count"] > 0:
+            log(f"Observed 'Neutral' during calibration: Min={neutral_data['min']}, Avg={neutral_data['avg']}, Max={neutral_data['max']}")
+            log(f"Prioritizing known stable neutral range: {known_neutral_low_eff}-{known_neutral_high_eff} for NMIN/NMAX base.")
+            if sug["NMIN"] >= sug["NMAX"]:
+                 sug["NMIN"] = known_neutral_low_eff
+                 sug["NMAX"] = known_neutral_high_eff
+                 if sug["NMIN"] >= sug["NMAX"]:
+                     sug["NMIN"] = neutral_data["avg"] - 10
+                     sug["NMAX"] = neutral_data["avg"] + 10
+        else:
+            log(f"Warning: No 'Neutral' data collected. Using known stable range: {known_neutral_low_eff}-{known_neutral_high_eff} for NMIN/NMAX.")
+
+        soft_sip_data = stats.get("Soft Sip")
+        hard_sip_data = stats.get("Hard Sip")
+
+        if soft_sip_data and soft_sip_data["count"] > 0:
+            required_nmin_from_softsip = soft_sip_data["max"] + MIN_ZONE_SEPARATION
+            sug["NMIN"] = max(sug["NMIN"], required_nmin_from_softsip)
+
+        if hard_sip_data and hard_sip_data["count"] > 0:
+            sug["HST"] = hard_sip_data["avg"]
+            if soft_sip_data and soft_sip_data["count"] > 0:
+                 sug["HST"] = min(sug["HST"], soft_sip_data["min"] - MIN_ZONE_SEPARATION)
+            sug["HST"] = min(sug["HST"], sug["NMIN"] - MIN_ZONE_SEPARATION)
+        elif soft_sip_data and soft_sip_data["count"] > 0:
+            sug["HST"] = soft_sip_data["min"] - MIN_ZONE_SEPARATION
+
+        soft_puff_data = stats.get("Soft Puff")
+        hard_puff_data = stats.get("Hard Puff")
+
+        if soft_puff_data and soft_puff_data["count"] > 0:
+            required_nmax_from_softpuff = soft_puff_data["min"] - MIN_ZONE_SEPARATION
+            sug["NMAX"] = min(sug["NMAX"], required_nmax_from_softpuff)
+            sug["SPT"] = soft_puff_data["avg"]
+
+        if hard_puff_data and hard_puff_data["count"] > 0:
+            sug["HPT"] = hard_puff_data["avg"]
+            current_spt_base = sug.get("SPT")
+            if current_spt_base is None:
+                current_spt_base = sug.get("NMAX", DEFAULT_SETTINGS["NMAX"]) + MIN_ZONE_SEPARATION
+                sug["SPT"] = current_spt_base
+            sug["HPT"] = max(sug["HPT"], current_spt_base + MIN_ZONE_SEPARATION)
+        elif soft_puff_data and soft_puff_data["count"] > 0:
+            sug["HPT"] = sug.get("SPT", DEFAULT_SETTINGS["SPT"]) + MIN_ZONE_SEPARATION * 2
+
+        for k_val in PRESSURE_KEYS:
+            sug[k_val] = max(0, min(1023, sug.get(k_val, DEFAULT_SETTINGS[k_val])))
+
+        if sug["NMIN"] >= sug["NMAX"]:
+            log(f"Warning: NMIN ({sug['NMIN']}) >= NMAX ({sug['NMAX']}) after sip/puff adjustment. Re-centering neutral band.")
+            neutral_center_target = (known_neutral_low_eff + known_neutral_high_eff) // 2
+            if neutral_data and neutral_data["count"] > 0:
+                if known_neutral_low_eff >= known_neutral_high_eff : neutral_center_target = neutral_data["avg"]
+
+            min_neutral_width = max(10, MIN_ZONE_SEPARATION // 2)
+            sug["NMIN"] = neutral_center_target - (min_neutral_width // 2)
+            sug["NMAX"] = sug["NMIN"] + min_neutral_width
+
+            sug["HST"] = min(sug.get("HST", DEFAULT_SETTINGS["HST"]), sug["NMIN"] - MIN_ZONE_SEPARATION)
+            sug["SPT"] = max(sug.get("SPT", DEFAULT_SETTINGS["SPT"]), sug["NMAX"] + MIN_ZONE_SEPARATION)
+            sug["HPT"] = max(sug.get("HPT", DEFAULT_SETTINGS["HPT"]), sug.get("SPT",DEFAULT_SETTINGS["SPT"]) + MIN_ZONE_SEPARATION)
+
+        sug["HST"] = max(0, min(sug.get("HST", DEFAULT_SETTINGS["HST"]), sug["NMIN"] - MIN_ZONE_SEPARATION, 1023 - 4 * MIN_ZONE_SEPARATION))
+        sug["NMIN"] = max(sug["HST"] + MIN_ZONE_SEPARATION, min(sug.get("NMIN", DEFAULT_SETTINGS["NMIN"]), sug["NMAX"] - MIN_ZONE_SEPARATION, 1023 - 3 * MIN_ZONE_SEPARATION))
+        sug["NMAX"] = max(sug["NMIN"] + MIN_ZONE_SEPARATION, min(sug.get("NMAX", DEFAULT_SETTINGS["NMAX"]), sug.get("SPT", DEFAULT_SETTINGS["SPT"]) - MIN_ZONE_SEPARATION, 1023 - 2 * MIN_ZONE_SEPARATION))
+        sug["SPT"] = max(sug["NMAX"] + MIN_ZONE_SEPARATION, min(sug.get("SPT", DEFAULT_SETTINGS["SPT"]), sug.get("HPT", DEFAULT_SETTINGS["HPT"]) - MIN_ZONE_SEPARATION, 1023 - 1 * MIN_ZONE_SEPARATION))
+        sug["HPT"] = max(sug["SPT"] + MIN_ZONE_SEPARATION, min(sug.get("HPT", DEFAULT_SETTINGS["HPT"]), 1023))
+
+        if sug["NMIN"] >= sug["NMAX"]:
+            sug["NMAX"] = sug["NMIN"] + MIN_ZONE_SEPARATION
+            sug["SPT"] = max(sug["NMAX"] + MIN_ZONE_SEPARATION, sug.get("SPT", DEFAULT_SETTINGS["SPT"]))
+            sug["HPT"] = max(sug["SPT"] + MIN_ZONE_SEPARATION, sug.get("HPT", DEFAULT_SETTINGS["HPT"]))
+
+        return {k_val: int(max(0, min(1023, sug.get(k_val, DEFAULT_SETTINGS[k_val])))) for k_val in PRESSURE_KEYS}
+
+
+class MouthMouseEngine(Observable):
+    INJECTION_BACKEND = "auto" # auto, uinput, sendinput, xtest, pyautogui (see injection.py)
+    RELAY_COALESCE_WINDOW_MS = 5; RELAY_MOVE_SCALE = 1.0
+    POINTER_TICK_HZ = 250
+    SETTING_SEND_INTERVAL_S = 0.02 # Per-key pacing for firmware without SETALL
+    SETTINGS_ACK_TIMEOUT_S = 0.5; SETTINGS_RETRIES = 2
+    LIVE_UPDATE_HZ = 20
+
+    def __init__(self, profiles_dir=PROFILES_DIR, settings=None, profiles=None):
+        super().__init__()
+        self.settings = settings if settings is not None else SettingsStore()
+        self.profiles = profiles if profiles is not None else open_profile_store(profiles_dir)
+        self.profile_name = None # Last profile loaded or saved on this device
+        self.analyzer = RobustCalibrationAnalyzer() if robust_calibration_available() else CalibrationAnalyzer()
+        self.ser = None; self.port = None; self.is_connected = False
+        self.stop_read_thread = threading.Event(); self.read_thread = None
+        self.multiplexer = None # sessions.SerialMultiplexer servicing this port instead of read_thread
+        self.stream_decoder = StreamDecoder(); self.serial_reader = None
+        self.binary_protocol_active = False; self.calibrating = False
+        self.session_recorder = None
+        self.mouse_injector = None; self.mouse_relay = None; self.pointer_pipeline = None
+        self.move_listener = None # Passed on to the injector, see MouseInjector.move_listener
+        self._dropped_releases = set(); self.gated_clicks = 0 # Host pointer click gating (JCB)
+        self._send_lock = threading.Lock()
+        # Settings upload: device_state caches the values the device has acknowledged, so an
+        # upload only sends the difference. It runs on its own thread; requests made while it
+        # is busy are folded into one more pass.
+        self.device_state = {}; self.setall_supported = True
+        self._upload_lock = threading.Lock(); self._upload_thread = None; self._upload_requested = False
+        self._setall_replies = queue.Queue()
+        self.settings_ack_latency = LatencyStats(window=64); self.setall_retries = 0
+        # After connecting, the first upload pass asks for the device's settings hash and skips
+        # the upload if it matches. time_to_usable runs from connect() to settings in sync.
+        self.hash_supported = True; self._verify_device = False; self._hash_replies = queue.Queue()
+        self._connect_t0 = None; self.port_open_s = 0.0; self.time_to_usable = LatencyStats(window=64)
+        self.connect_options = None # Options of the last connect(), for reconnecting
+        self.reconnector = None # See enable_auto_reconnect()
+        # Live tuning: every setting change schedules a diff upload, throttled to LIVE_UPDATE_HZ.
+        self.live_updates = False
+        self.live_throttle = TrailingThrottle(self.apply_all_settings, 1.0 / self.LIVE_UPDATE_HZ)
+        self.drift_adapter = None # See enable_drift_tracking()
+        self.settings.subscribe(EVENT_SETTING_CHANGED, self._on_setting_changed)
+
+    def status(self, message):
+        self.emit(EVENT_STATUS, message)
+
+    # --- Connection ---
+    def connect(self, port, binary=False, record=False, host_pointer=False, apply_settings=True):
+        # Raises serial.SerialException / OSError / ValueError if the port can't be opened.
+        if self.is_connected: self.disconnect()
+        t0 = time.perf_counter()
+        ser = open_serial(port, 115200, timeout=0.1)
+        self.port_open_s = time.perf_counter() - t0; self._connect_t0 = t0
+        self.connect_options = {"binary": binary, "record": record, "host_pointer": host_pointer}
+        if record and not port.startswith(REPLAY_PREFIX): ser = self._start_session_recording(ser)
+        self.ser = ser; self.port = port; self.is_connected = True
+        self.binary_protocol_active = False; self.calibrating = False; self._dropped_releases = set()
+        self.device_state = {}; self.setall_supported = True
+        self.hash_supported = True; self._verify_device = True
+        self.stream_decoder.reset()
+        self.serial_reader = SerialReader(self.ser, self.stream_decoder)
+        self._open_mouse_injector()
+        self.stop_read_thread.clear()
+        if self.multiplexer is None or not self.multiplexer.register(self): # Replays and Windows ports can't be selected on
+            self.read_thread = threading.Thread(target=self.read_from_arduino, name="serial-read", daemon=True)
+            self.read_thread.start()
+        self.emit(EVENT_CONNECTED, port)
+        self.send_command("H\n")
+        if host_pointer: self.start_host_pointer()
+        # Older firmware ignores PROTO:BIN and keeps sending text, which the decoder still handles.
+        if binary: self.send_command(f"{PROTOCOL_BINARY_COMMAND}\n")
+        if apply_settings: self.apply_all_settings()
+
+    def disconnect(self, cancel_reconnect=True):
+        # cancel_reconnect=False is the reconnect manager dropping a dead port it will reopen.
+        if cancel_reconnect and self.reconnector is not None: self.reconnector.cancel()
+        if not self.is_connected: return
+        if self.calibrating: self.stop_calibration()
+        self.stop_host_pointer() # Hand cursor control back to the firmware
+        self.is_connected = False
+        self.live_throttle.cancel()
+        self.stop_read_thread.set()
+        if self.multiplexer is not None: self.multiplexer.unregister(self)
+        if self.read_thread is not None and self.read_thread.is_alive() and self.read_thread is not threading.current_thread():
+            self.read_thread.join(timeout=0.5)
+        self.read_thread = None
+        if self.ser and self.ser.is_open:
+            try: self.ser.close()
+            except Exception: pass
+        self.ser = None
+        self._stop_session_recording()
+        self.binary_protocol_active = False
+        self._close_mouse_injector()
+        self.emit(EVENT_DISCONNECTED)
+
+    def _start_session_recording(self, ser):
+        try:
+            os.makedirs(RECORDINGS_DIR, exist_ok=True)
+            path = os.path.join(RECORDINGS_DIR, time.strftime("session_%Y%m%d_%H%M%S") + RECORDING_EXTENSION)
+            self.session_recorder = SessionRecorder(path)
+        except OSError as e:
+            self.session_recorder = None; self.status(f"Recording disabled: {e}"); return ser
+        return RecordingSerial(ser, self.session_recorder)
+
+    def _stop_session_recording(self):
+        recorder, self.session_recorder = self.session_recorder, None
+        if recorder is None: return
+        recorder.close()
+        print(f"Saved {recorder.path}: {recorder.summary()}")
+
+    def send_command(self, command):
+        ser = self.ser
+        if not ser or not ser.is_open: return False
+        if not command.endswith('\n'): command += '\n'
+        try:
+            with self._send_lock: ser.write(command.encode('utf-8'))
+            return True
+        except Exception as e: # serial.SerialException, or OSError from a vanished pty
+            self.status(f"Send Error: {e}")
+            self.emit(EVENT_SERIAL_ERROR, e)
+            return False
+
+    def send_param_update(self, param_key, value):
+        return self.send_command(f"SET_{param_key}:{value}\n")
+
+    def apply_all_settings(self, wait=False):
+        # Starts (or extends) the background upload; wait=True blocks until it has finished.
+        if not self.is_connected: return False
+        with self._upload_lock:
+            self._upload_requested = True
+            if self._upload_thread is None:
+                self._upload_thread = threading.Thread(target=self._upload_settings, name="settings-upload", daemon=True)
+                self._upload_thread.start()
+            thread = self._upload_thread
+        if wait and thread is not threading.current_thread(): thread.join()
+        return True
+
+    def _upload_settings(self):
+        while True:
+            with self._upload_lock:
+                if not self._upload_requested or not self.is_connected: self._upload_thread = None; return
+                self._upload_requested = False
+            try: self._upload_changed_settings()
+            except Exception as e: self.status(f"Settings upload failed: {e}")
+
+    def _upload_changed_settings(self):
+        values = self.settings.device_values()
+        if not is_ordered(values):
+            self.status("Not sending settings: thresholds must satisfy HST < NMIN <= NMAX < SPT <= HPT."); return False
+        if self._verify_device:
+            self._verify_device = False
+            if self._device_hash_matches(values):
+                self.device_state = dict(values) # Keys outside HASH_KEYS are ignored by the firmware anyway
+                self._device_ready("verified by hash"); return True
+        changed = {key: value for key, value in values.items() if self.device_state.get(key) != value}
+        if not changed:
+            if not self.live_updates: self.status("Arduino settings already up to date.")
+            return True
+        if not self.setall_supported:
+            if not self._upload_settings_per_key(changed): return False
+            self._device_ready("uploaded"); return True
+        start = time.perf_counter()
+        for batch in split_setall(changed):
+            if not self._send_setall(batch):
+                if not self.is_connected: return False
+                self.setall_supported = False
+                self.status("Arduino did not acknowledge SETALL; sending settings one at a time.")
+                if not self._upload_settings_per_key({key: value for key, value in changed.items() if self.device_state.get(key) != value}): return False
+                self._device_ready("uploaded"); return True
+        elapsed = time.perf_counter() - start
+        self.settings_ack_latency.record(elapsed)
+        self.status(f"Applied {len(changed)} setting(s) to Arduino, acknowledged in {elapsed * 1000:.1f} ms.")
+        self.emit(EVENT_SETTINGS_APPLIED, sorted(changed), elapsed)
+        self._device_ready("uploaded")
+        return True
+
+    def _device_hash_matches(self, values):
+        expected = settings_hash(values)
+        if expected is None or not self.hash_supported: return False
+        while not self._hash_replies.empty(): self._hash_replies.get_nowait()
+        if not self.send_command(f"{HASH_COMMAND}\n"): return False
+        try: reply = self._hash_replies.get(timeout=self.SETTINGS_ACK_TIMEOUT_S)
+        except queue.Empty: reply = None
+        device_hash = None if reply is None else parse_hash_reply(reply)
+        if device_hash is None: self.hash_supported = False; return False # Older firmware
+        return device_hash == expected
+
+    def _device_ready(self, how):
+        # Once per connection: the device runs with our settings from here on.
+        if self._connect_t0 is None: return
+        elapsed = time.perf_counter() - self._connect_t0; self._connect_t0 = None
+        self.time_to_usable.record(elapsed)
+        self.status(f"Arduino ready {elapsed * 1000:.0f} ms after connecting (port open {self.port_open_s * 1000:.0f} ms, settings {how}).")
+        self.emit(EVENT_DEVICE_READY, how, elapsed)
+
+    def _send_setall(self, batch):
+        line, checksum = encode_setall(batch)
+        expected = f"{SETALL_ACK}{checksum:02X}"
+        for attempt in range(1 + self.SETTINGS_RETRIES):
+            if attempt: self.setall_retries += 1
+            while not self._setall_replies.empty(): self._setall_replies.get_nowait() # Stale replies
+            if not self.send_command(line): return False
+            deadline = time.monotonic() + self.SETTINGS_ACK_TIMEOUT_S
+            while self.is_connected:
+                try: reply = self._setall_replies.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty: break
+                if reply == expected: self.device_state.update(batch); return True
+                if reply.startswith(SETALL_ERROR): break # Corrupted on the way, send it again
+        return False
+
+    def _upload_settings_per_key(self, changed):
+        # Legacy path: nothing is acknowledged, so device_state records what was written.
+        if len(changed) > 1: self.status("Applying all settings to Arduino...")
+        for key, value in changed.items():
+            if not self.send_param_update(key, value): return False
+            self.device_state[key] = value
+            if len(changed) > 1: time.sleep(self.SETTING_SEND_INTERVAL_S)
+        if len(changed) > 1: self.status("All settings applied to Arduino.")
+        return True
+
+    # --- Device stream ---
+    def read_from_arduino(self):
+        while not self.stop_read_thread.is_set():
+            if not self.service_serial(): break
+
+    def service_serial(self):
+        # One read-and-dispatch pass; False once the port is gone. Runs on read_thread, or on
+        # the multiplexer thread when the port is ready to read.
+        reader = self.serial_reader; ser = self.ser
+        if reader is None or not ser or not ser.is_open: return False
+        try:
+            mouse_messages = None
+            for msg in reader.read_batch():
+                kind = msg[0]
+                if kind == MSG_MOVE or kind == MSG_EVENT:
+                    if mouse_messages is None: mouse_messages = []
+                    mouse_messages.append(msg)
+                else: self.handle_arduino_message(msg)
+            if mouse_messages and not self.calibrating:
+                self.handle_mouse_command_from_arduino(mouse_messages, reader.last_read_time)
+        except (OSError, ValueError, TypeError) as e: # serial.SerialException is an OSError
+            if not self.stop_read_thread.is_set(): self.emit(EVENT_SERIAL_ERROR, e)
+            return False
+        except Exception as e:
+            if not self.stop_read_thread.is_set():
+                print(f"Read thread error: {e}")
+        return True
+
+    # Runs on the read thread.
+    def handle_arduino_message(self, msg):
+        kind = msg[0]
+        if kind == MSG_CALIB:
+            if self.calibrating: self.emit(EVENT_CALIB, msg[1])
+        elif kind == MSG_PRESSURE:
+            if not self.calibrating:
+                if self.drift_adapter is not None: self.drift_adapter.feed(msg[1])
+                self.emit(EVENT_PRESSURE, msg[1])
+        elif kind == MSG_JOY:
+            if self.pointer_pipeline is not None: self.pointer_pipeline.update_joystick(msg[1], msg[2])
+            self.emit(EVENT_JOY, msg[1], msg[2])
+        elif kind == MSG_STATUS:
+            if msg[1].startswith(SETALL_ACK) or msg[1].startswith(SETALL_ERROR): self._setall_replies.put(msg[1]); return
+            if msg[1].startswith(HASH_ACK) or msg[1] == f"ERR:{HASH_COMMAND}": self._hash_replies.put(msg[1]); return
+            if msg[1] == PROTOCOL_BINARY_ACK: self.binary_protocol_active = True
+            self.status(f"Arduino: {msg[1]}")
+        elif kind == MSG_MOVE or kind == MSG_EVENT:
+            if not self.calibrating:
+                self.handle_mouse_command_from_arduino([msg])
+
+    def start_calibration(self):
+        if not self.is_connected: return False
+        self.send_command("START_CALIBRATION\n"); self.calibrating = True
+        return True
+
+    def stop_calibration(self):
+        self.send_command("STOP_CALIBRATION\n"); self.calibrating = False
+
+    # --- Relay ---
+    def _open_mouse_injector(self):
+        try: self.mouse_injector = MouseInjector(create_injection_backend(self.INJECTION_BACKEND), self.RELAY_MOVE_SCALE)
+        except Exception as e:
+            self.mouse_injector = None; self.status(f"Mouse relay unavailable: {str(e)[:80]}"); return
+        on_error = lambda e, name=self.mouse_injector.backend.name: self.status(f"Mouse relay Err ({name}): {str(e)[:50]}")
+        self.mouse_injector.move_listener = self.move_listener
+        self.mouse_relay = MouseRelay(self.mouse_injector, self.RELAY_COALESCE_WINDOW_MS / 1000.0, on_error)
+        self.mouse_relay.start()
+
+    def _close_mouse_injector(self):
+        relay, self.mouse_relay = self.mouse_relay, None
+        if relay is not None: relay.stop()
+        injector, self.mouse_injector = self.mouse_injector, None
+        if injector is None: return
+        try: injector.release_buttons(); injector.backend.close()
+        except Exception: pass
+
+    def handle_mouse_command_from_arduino(self, messages, arrival_time=None):
+        if self.pointer_pipeline is not None: messages = self._gate_clicks(messages)
+        if self.mouse_relay is not None and messages: self.mouse_relay.submit(messages, arrival_time)
+
+    def _gate_clicks(self, messages):
+        # Host pointer with host-relay firmware: a press only counts while the stick is within JCB
+        # of center, so a sip or puff mid-movement doesn't click; the release of a dropped press is
+        # dropped too. V2.ino clicks by itself and applies the uploaded JCB before Mouse.press.
+        allowed = self.pointer_pipeline.clicks_allowed
+        kept = []
+        for msg in messages:
+            if msg[0] == MSG_EVENT:
+                name = msg[1]
+                if name in CLICK_RELEASES:
+                    if not allowed: self._dropped_releases.add(CLICK_RELEASES[name]); self.gated_clicks += 1; continue
+                    self._dropped_releases.discard(CLICK_RELEASES[name])
+                elif name in self._dropped_releases: self._dropped_releases.discard(name); continue
+            kept.append(msg)
+        return kept
+
+    def start_host_pointer(self):
+        if self.pointer_pipeline is not None: return True
+        if self.mouse_relay is None:
+            self.status("Host pointer needs a mouse injection backend."); return False
+        self.send_command("HOSTPTR:1\n") # Firmware stops moving the cursor itself and streams JOY
+        self.pointer_pipeline = PointerPipeline(self.mouse_relay.submit, self.settings.as_dict(), self.POINTER_TICK_HZ)
+        self.pointer_pipeline.start()
+        self.status(f"Host pointer pipeline running at {self.POINTER_TICK_HZ} Hz.")
+        return True
+
+    def stop_host_pointer(self):
+        pipeline, self.pointer_pipeline = self.pointer_pipeline, None
+        if pipeline is None: return
+        pipeline.stop()
+        self.send_command("HOSTPTR:0\n")
+
+    def _on_setting_changed(self, key, value):
+        if self.pointer_pipeline is not None: self.pointer_pipeline.set_params(self.settings.as_dict())
+        if self.live_updates and self.is_connected: self.live_throttle.trigger()
+
+    # --- Drift tracking ---
+    def enable_drift_tracking(self, log_path=None):
+        # Shifts the pressure thresholds with the rest baseline, see drift.py.
+        from drift import DriftAdapter, DRIFT_LOG_PATH
+        if self.drift_adapter is not None: return self.drift_adapter
+        self.drift_adapter = DriftAdapter(self.settings, self.apply_all_settings, log_path or DRIFT_LOG_PATH, self.status)
+        return self.drift_adapter
+
+    def disable_drift_tracking(self):
+        adapter, self.drift_adapter = self.drift_adapter, None
+        if adapter is not None: adapter.close()
+
+    # --- Auto reconnect ---
+    def enable_auto_reconnect(self):
+        # Reopens the same device (by USB VID/PID/serial number) after it drops, see reconnect.py.
+        from reconnect import ReconnectManager
+        if self.reconnector is None: self.reconnector = ReconnectManager(self)
+        return self.reconnector
+
+    def disable_auto_reconnect(self):
+        manager, self.reconnector = self.reconnector, None
+        if manager is not None: manager.close()
+
+    @property
+    def reconnect_pending(self):
+        return self.reconnector is not None and self.reconnector.pending
+
+    # --- Profiles and calibration ---
+    def load_profile(self, name):
+        self.settings.update(self.profiles.load(name)); self.profile_name = name
+
+    def save_profile(self, name):
+        self.profiles.save(name, self.settings.as_dict()); self.profile_name = name
+
+    def suggest_thresholds(self, collected, log=None):
+        if log is not None: self.analyzer.log = log
+        return self.analyzer.suggest(collected, self.settings.as_dict())
+
+    def settings_upload_summary(self):
+        stats = self.settings_ack_latency
+        return f"settings ACK p50 {stats.percentile(50):.1f} ms max {stats.max_ms:.1f} ms ({stats.count} uploads, {self.setall_retries} retries)"
+
+    def connection_summary(self):
+        stats = self.time_to_usable
+        return f"ready after connect p50 {stats.percentile(50):.0f} ms max {stats.max_ms:.0f} ms ({stats.count} connects, last port open {self.port_open_s * 1000:.0f} ms)"
+
+    def summary(self):
+        parts = [self.serial_reader.summary()] if self.serial_reader else []
+        if self.mouse_relay and self.mouse_relay.batches: parts.append(self.mouse_relay.summary())
+        if self.pointer_pipeline: parts.append(self.pointer_pipeline.summary())
+        if self.settings_ack_latency.count: parts.append(self.settings_upload_summary())
+        if self.drift_adapter: parts.append(self.drift_adapter.summary())
+        if self.time_to_usable.count: parts.append(self.connection_summary())
+        if self.reconnector: parts.append(self.reconnector.summary())
+        return " | ".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mouth mouse device relay without the GUI")
+    parser.add_argument("--port", required=True, help="serial port, or replay:<recording>[@speed]")
+    parser.add_argument("--profile", help="profile to load and upload on connect")
+    parser.add_argument("--profiles-dir", default=PROFILES_DIR, help="directory of JSON profiles, or a SQLite profile database (*.db)")
+    parser.add_argument("--binary", action="store_true", help="ask the firmware for binary telemetry")
+    parser.add_argument("--host-pointer", action="store_true", help="run the stick transfer function on this machine")
+    parser.add_argument("--record", action="store_true", help=f"record the session to {RECORDINGS_DIR}/")
+    parser.add_argument("--backend", default=MouthMouseEngine.INJECTION_BACKEND, help="mouse injection backend")
+    parser.add_argument("--track-drift", action="store_true", help="follow the rest baseline and shift the pressure thresholds with it")
+    parser.add_argument("--reconnect", action="store_true", help="reopen the device automatically when it drops off USB")
+    parser.add_argument("--stats", type=float, default=0, help="print stats every N seconds (0 = off)")
+    args = parser.parse_args(argv)
+
+    engine = MouthMouseEngine(args.profiles_dir)
+    engine.INJECTION_BACKEND = args.backend
+    if args.profile: engine.load_profile(args.profile)
+    if args.track_drift: engine.enable_drift_tracking()
+    if args.reconnect: engine.enable_auto_reconnect()
+    stop = threading.Event()
+    engine.subscribe(EVENT_STATUS, print)
+    engine.subscribe(EVENT_SERIAL_ERROR, lambda e: (print(f"Serial error: {e}"), None if engine.reconnect_pending else stop.set()))
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try: signal.signal(sig, lambda *_: stop.set())
+        except (ValueError, OSError): pass
+    engine.connect(args.port, binary=args.binary, record=args.record, host_pointer=args.host_pointer)
+    print(f"Relaying {args.port}; Ctrl+C to stop.")
+    try:
+        while not stop.wait(args.stats or 1.0):
+            if args.stats: print(engine.summary())
+    finally:
+        engine.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# Offline scoring of pressure threshold sets against labeled sessions (needs NumPy).
+#
+#   python evaluator.py SESSION [SESSION ...] [--thresholds HST=360,NMIN=460,...]
+#   python evaluator.py SESSION --grid HST=300:420:10 NMIN=430:490:10 [--processes 8] [--top 10]
+#   python evaluator.py --synthetic 120 --grid SPT=560:680:10 HPT=620:760:10
+#
+# A session is raw ADC samples at the firmware's SAMPLE_PERIOD plus the intended actions as
+# (start s, end s, action) intervals; anything unlabeled is rest. Sessions are JSON
+# ({"sample_period_ms", "samples", "labels"}) or a .mrec recording with --labels FILE.
+# simulate() reimplements processPressure() from V2.ino: the mean of each block of
+# SAMPLE_LENGTH samples (integer division, non-overlapping because sampleCounter resets)
+# goes through the same if/else-if chain, with the button state carried between blocks.
+# A set is scored on false clicks (a press outside an interval that asked for that button),
+# missed clicks, scroll leaks (a scroll tick outside an interval that asked for that
+# direction, e.g. while a hard puff ramps through the soft zone), missed scrolls and the
+# delay from the start of an interval to its first correct event.
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import DEFAULT_SETTINGS, PRESSURE_KEYS, is_ordered
+
+SAMPLE_LENGTH = 8
+SAMPLE_PERIOD_MS = 10
+
+LEFT_PRESS, RIGHT_PRESS, SCROLL_UP, SCROLL_DOWN = range(4)
+EXPECTED_EVENT = {"Hard Puff": LEFT_PRESS, "Hard Sip": RIGHT_PRESS, "Soft Puff": SCROLL_UP, "Soft Sip": SCROLL_DOWN}
+DEFAULT_GRACE_S = 0.25 # Events this long after the end of an interval still belong to it
+
+
+class LabeledSession:
+    def __init__(self, samples, labels, sample_period_ms=SAMPLE_PERIOD_MS, name=""):
+        self.samples = np.asarray(samples, dtype=np.int32)
+        self.labels = sorted((float(s), float(e), action) for s, e, action in labels)
+        self.sample_period_ms = sample_period_ms; self.name = name
+        n = len(self.samples) // SAMPLE_LENGTH
+        # Block means are the same for every threshold set, so they are computed once.
+        self.averages = self.samples[:n * SAMPLE_LENGTH].reshape(n, SAMPLE_LENGTH).sum(axis=1) // SAMPLE_LENGTH
+        self.block_times = (np.arange(1, n + 1) * SAMPLE_LENGTH * sample_period_ms) / 1000.0
+        self.label_starts = np.array([l[0] for l in self.labels]); self.label_ends = np.array([l[1] for l in self.labels])
+        self.label_expect = np.array([EXPECTED_EVENT.get(l[2], -1) for l in self.labels], dtype=np.int64)
+
+    @property
+    def duration(self):
+        return len(self.samples) * self.sample_period_ms / 1000.0
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"name": self.name, "sample_period_ms": self.sample_period_ms, "samples": self.samples.tolist(),
+                       "labels": [list(l) for l in self.labels]}, f)
+
+
+def load_session(path, labels_path=None):
+    if path.endswith(".mrec"): return session_from_recording(path, _load_labels(labels_path))
+    with open(path) as f: data = json.load(f)
+    return LabeledSession(data["samples"], data.get("labels", []), data.get("sample_period_ms", SAMPLE_PERIOD_MS),
+                          data.get("name", os.path.basename(path)))
+
+
+def _load_labels(path):
+    # JSON list of [start, end, action], or CSV lines start,end,action.
+    if path is None: raise ValueError("a .mrec session needs --labels")
+    with open(path) as f: text = f.read()
+    if text.lstrip().startswith("["): return json.loads(text)
+    rows = [line.split(",") for line in text.splitlines() if line.strip() and not line.startswith("#")]
+    return [(float(s), float(e), action.strip()) for s, e, action in rows]
+
+
+def session_from_recording(path, labels, sample_period_ms=SAMPLE_PERIOD_MS):
+    # Pressure values (CALIB_P: or P:) from a session recording; label times are seconds
+    # from the start of the recording and are moved onto the sample clock.
+    from recording import SessionReader, DIR_RX
+    from protocol import StreamDecoder, MSG_CALIB, MSG_PRESSURE
+    reader = SessionReader(path); decoder = StreamDecoder()
+    samples = []; times = []
+    try:
+        for t, _, data in reader.records(DIR_RX):
+            for msg in decoder.feed(data):
+                if msg[0] == MSG_CALIB or msg[0] == MSG_PRESSURE: samples.append(msg[1]); times.append(t)
+    finally: reader.close()
+    times = np.asarray(times)
+    to_sample_clock = lambda t: np.searchsorted(times, t) * sample_period_ms / 1000.0
+    labels = [(to_sample_clock(s), to_sample_clock(e), action) for s, e, action in labels]
+    return LabeledSession(samples, labels, sample_period_ms, os.path.basename(path))
+
+
+def synthetic_session(seconds=60.0, noise=4.0, seed=1, rate_hz=1000.0 / SAMPLE_PERIOD_MS):
+    # A labeled session from the simulator's gesture schedule.
+    from simulator import PressureWaveform
+    wave = PressureWaveform(noise=noise, seed=seed)
+    dt = 1.0 / rate_hz; n = int(seconds * rate_hz)
+    samples = [wave.sample(i * dt, dt) for i in range(n)]
+    names = {"soft_puff": "Soft Puff", "hard_puff": "Hard Puff", "soft_sip": "Soft Sip", "hard_sip": "Hard Sip"}
+    labels = []; t = 0.0
+    while t < seconds:
+        for name, _, length in wave.gestures:
+            if name in names and t < seconds: labels.append((t, min(seconds, t + length), names[name]))
+            t += length
+    return LabeledSession(samples, labels, 1000.0 / rate_hz, f"synthetic {seconds:.0f}s")
+
+
+def _button_presses(pressed_zone, release_zone):
+    # Press on the first block of pressed_zone since the last release_zone block.
+    marker = np.where(pressed_zone, 1, np.where(release_zone, 0, -1))
+    idx = np.where(marker != -1, np.arange(marker.size), -1)
+    np.maximum.accumulate(idx, out=idx)
+    state = np.where(idx >= 0, marker[np.maximum(idx, 0)], 0)
+    before = np.concatenate(([0], state[:-1]))
+    return np.flatnonzero(pressed_zone & (before == 0))
+
+
+def simulate(averages, thresholds):
+    # processPressure() on every block: returns {event kind: block indices}.
+    p = averages
+    hst, nmin, nmax, spt, hpt = (thresholds[k] for k in PRESSURE_KEYS)
+    right = p < hst
+    scroll_down = ~right & (p >= hst) & (p < nmin)
+    neutral = ~right & ~scroll_down & (p >= nmin) & (p <= nmax)
+    scroll_up = ~right & ~scroll_down & ~neutral & (p > nmax) & (p <= spt)
+    left = ~right & ~scroll_down & ~neutral & ~scroll_up & (p > hpt)
+    return {LEFT_PRESS: _button_presses(left, neutral), RIGHT_PRESS: _button_presses(right, neutral),
+            SCROLL_UP: np.flatnonzero(scroll_up), SCROLL_DOWN: np.flatnonzero(scroll_down)}
+
+
+def evaluate_session(session, thresholds, grace_s=DEFAULT_GRACE_S):
+    events = simulate(session.averages, thresholds)
+    starts = session.label_starts; ends = session.label_ends + grace_s; expect = session.label_expect
+    result = {"false_clicks": 0, "missed_clicks": 0, "scroll_leaks": 0, "missed_scrolls": 0,
+              "clicks_expected": int(np.sum((expect == LEFT_PRESS) | (expect == RIGHT_PRESS))),
+              "scrolls_expected": int(np.sum((expect == SCROLL_UP) | (expect == SCROLL_DOWN))),
+              "click_latencies": [], "scroll_latencies": []}
+    first_hit = np.full(len(starts), np.inf)
+    for kind, blocks in events.items():
+        t = session.block_times[blocks]
+        label = np.searchsorted(starts, t, "right") - 1
+        inside = label >= 0
+        inside[inside] &= t[inside] < ends[label[inside]]
+        correct = inside.copy(); correct[inside] &= expect[label[inside]] == kind
+        wrong = int(np.sum(~correct))
+        if kind in (LEFT_PRESS, RIGHT_PRESS): result["false_clicks"] += wrong
+        else: result["scroll_leaks"] += wrong
+        if correct.any(): np.minimum.at(first_hit, label[correct], t[correct])
+    latency = first_hit - starts; hit = np.isfinite(first_hit)
+    is_click = (expect == LEFT_PRESS) | (expect == RIGHT_PRESS); is_scroll = (expect == SCROLL_UP) | (expect == SCROLL_DOWN)
+    result["missed_clicks"] = int(np.sum(is_click & ~hit)); result["missed_scrolls"] = int(np.sum(is_scroll & ~hit))
+    result["click_latencies"] = (latency[is_click & hit] * 1000).tolist()
+    result["scroll_latencies"] = (latency[is_scroll & hit] * 1000).tolist()
+    return result
+
+
+class Score:
+    # Summed over sessions; cost() ranks sets (lower is better).
+    WEIGHTS = {"false_clicks": 10.0, "missed_clicks": 5.0, "scroll_leaks": 1.0, "missed_scrolls": 2.0}
+    LATENCY_WEIGHT_PER_MS = 0.01
+
+    def __init__(self, thresholds, results):
+        self.thresholds = dict(thresholds)
+        self.counts = {key: sum(r[key] for r in results) for key in
+                       ("false_clicks", "missed_clicks", "scroll_leaks", "missed_scrolls", "clicks_expected", "scrolls_expected")}
+        clicks = [v for r in results for v in r["click_latencies"]]; scrolls = [v for r in results for v in r["scroll_latencies"]]
+        self.click_latency_ms = float(np.median(clicks)) if clicks else 0.0
+        self.click_latency_p90_ms = float(np.percentile(clicks, 90)) if clicks else 0.0
+        self.scroll_latency_ms = float(np.median(scrolls)) if scrolls else 0.0
+
+    def cost(self):
+        return (sum(self.counts[key] * w for key, w in self.WEIGHTS.items())
+                + self.LATENCY_WEIGHT_PER_MS * (self.click_latency_ms + self.scroll_latency_ms))
+
+    def summary(self):
+        c = self.counts; t = self.thresholds
+        return (" ".join(f"{k}={t[k]}" for k in PRESSURE_KEYS) + f": false clicks {c['false_clicks']}, "
+                f"missed clicks {c['missed_clicks']}/{c['clicks_expected']}, scroll leaks {c['scroll_leaks']}, "
+                f"missed scrolls {c['missed_scrolls']}/{c['scrolls_expected']}, click latency {self.click_latency_ms:.0f} ms "
+                f"(p90 {self.click_latency_p90_ms:.0f}), scroll latency {self.scroll_latency_ms:.0f} ms, cost {self.cost():.1f}")
+
+
+def evaluate(sessions, thresholds, grace_s=DEFAULT_GRACE_S):
+    return Score(thresholds, [evaluate_session(s, thresholds, grace_s) for s in sessions])
+
+
+def threshold_grid(base, ranges):
+    # ranges: {key: iterable of values}; keys not in ranges keep their base value.
+    keys = list(ranges)
+    for combo in itertools.product(*(ranges[k] for k in keys)):
+        candidate = dict(base); candidate.update(zip(keys, combo))
+        if is_ordered(candidate): yield candidate
+
+
+_worker_sessions = None
+
+
+def _init_worker(sessions, grace_s):
+    global _worker_sessions
+    _worker_sessions = (sessions, grace_s)
+
+
+def _evaluate_chunk(candidates):
+    sessions, grace_s = _worker_sessions
+    scores = [evaluate(sessions, t, grace_s) for t in candidates]
+    return [(s.cost(), s) for s in scores]
+
+
+def grid_search(sessions, candidates, processes=None, chunk_size=64, top=10, grace_s=DEFAULT_GRACE_S):
+    # Sessions go to each worker once (initializer); candidates travel in chunks.
+    candidates = list(candidates)
+    chunks = [candidates[i:i + chunk_size] for i in range(0, len(candidates), chunk_size)]
+    if processes == 1:
+        _init_worker(sessions, grace_s); results = [r for chunk in chunks for r in _evaluate_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(sessions, grace_s)) as pool:
+            results = [r for part in pool.map(_evaluate_chunk, chunks) for r in part]
+    results.sort(key=lambda r: r[0])
+    return [score for _, score in results[:top]], len(candidates)
+
+
+def _parse_range(spec):
+    key, _, rng = spec.partition("=")
+    start, stop, step = (int(v) for v in (rng.split(":") + ["1"])[:3])
+    if key not in PRESSURE_KEYS: raise argparse.ArgumentTypeError(f"unknown threshold {key}")
+    return key, range(start, stop + 1, step)
+
+
+def _parse_thresholds(spec):
+    values = dict((k, int(v)) for k, v in (pair.split("=") for pair in spec.split(",") if pair))
+    unknown = set(values) - set(PRESSURE_KEYS)
+    if unknown: raise argparse.ArgumentTypeError(f"unknown threshold(s) {', '.join(sorted(unknown))}")
+    return values
+
+
+def main(argv=None):
+    import time
+    parser = argparse.ArgumentParser(description="Score pressure thresholds against labeled sessions")
+    parser.add_argument("sessions", nargs="*", help="labeled session .json, or .mrec with --labels")
+    parser.add_argument("--labels", help="labels for a .mrec session: JSON [[start, end, action], ...] or CSV")
+    parser.add_argument("--synthetic", type=float, default=0, help="add a synthetic session of N seconds")
+    parser.add_argument("--thresholds", type=_parse_thresholds, default={}, help="base set, e.g. HST=360,NMIN=460")
+    parser.add_argument("--grid", nargs="+", type=_parse_range, default=[], metavar="KEY=START:STOP[:STEP]")
+    parser.add_argument("--grace", type=float, default=DEFAULT_GRACE_S, help="seconds after an interval that still count")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    sessions = [load_session(path, args.labels) for path in args.sessions]
+    if args.synthetic: sessions.append(synthetic_session(args.synthetic))
+    if not sessions: parser.error("no sessions (give files or --synthetic N)")
+    base = {k: DEFAULT_SETTINGS[k] for k in PRESSURE_KEYS}; base.update(args.thresholds)
+    for s in sessions: print(f"{s.name}: {s.duration:.0f} s, {len(s.labels)} labeled actions")
+    print(f"base  {evaluate(sessions, base, args.grace).summary()}")
+    if not args.grid: return
+    start = time.perf_counter()
+    best, n = grid_search(sessions, threshold_grid(base, dict(args.grid)), args.processes, top=args.top, grace_s=args.grace)
+    print(f"{n} candidate sets in {time.perf_counter() - start:.2f} s")
+    for rank, score in enumerate(best, 1): print(f"#{rank:<3} {score.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# Host-side mouse injection for firmware that relays MOVE/click/scroll commands over serial.
+#
+# Backends, fastest first (create_injection_backend("auto") picks the first that works):
+#   uinput    Linux kernel virtual mouse via python-evdev (needs write access to /dev/uinput)
+#   sendinput Windows SendInput via ctypes
+#   xtest     X11 XTest extension via python-xlib
+#   pyautogui portable fallback, called without the per-call pause and failsafe check
+#   fake      in-process recorder for tests and benchmarks
+import sys
+import threading
+import time
+from collections import deque
+
+from protocol import MSG_MOVE, MSG_EVENT
+
+BUTTON_LEFT = "left"
+BUTTON_RIGHT = "right"
+
+SUBPIXEL_EPSILON = 1e-9 # Keeps 0.3 * 10 from truncating to 2
+# Backends scroll in pyautogui.scroll() units: wheel clicks on X11/uinput, raw wheel delta on
+# Windows. Each SCROLL_UP/DOWN is scaled here, once, to the pyautogui.scroll(20) the relay always sent.
+SCROLL_STEP = 20
+
+EVENT_ACTIONS = {
+    "LEFT_CLICK_DOWN": ("button", BUTTON_LEFT, True), "LEFT_CLICK_UP": ("button", BUTTON_LEFT, False),
+    "RIGHT_CLICK_DOWN": ("button", BUTTON_RIGHT, True), "RIGHT_CLICK_UP": ("button", BUTTON_RIGHT, False),
+    "SCROLL_UP": ("scroll", 1, None), "SCROLL_DOWN": ("scroll", -1, None),
+}
+
+
+class InjectionBackend:
+    name = "base"
+
+    def move(self, dx, dy): raise NotImplementedError
+    def button(self, button, down): raise NotImplementedError
+    def scroll(self, clicks): raise NotImplementedError
+    def close(self): pass
+
+
+class FakeBackend(InjectionBackend):
+    name = "fake"
+
+    def __init__(self):
+        self.events = []
+
+    def move(self, dx, dy): self.events.append(("move", dx, dy, time.perf_counter()))
+    def button(self, button, down): self.events.append(("button", button, down, time.perf_counter()))
+    def scroll(self, clicks): self.events.append(("scroll", clicks, None, time.perf_counter()))
+
+
+class PyAutoGuiBackend(InjectionBackend):
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        pyautogui.FAILSAFE = False
+        self._pyautogui = pyautogui
+
+    def move(self, dx, dy):
+        self._pyautogui.moveRel(dx, dy, duration=0, _pause=False)
+
+    def button(self, button, down):
+        if down: self._pyautogui.mouseDown(button=button, _pause=False)
+        else: self._pyautogui.mouseUp(button=button, _pause=False)
+
+    def scroll(self, clicks):
+        self._pyautogui.scroll(clicks, _pause=False)
+
+
+class UInputBackend(InjectionBackend):
+    name = "uinput"
+
+    def __init__(self):
+        from evdev import UInput, ecodes
+        self._e = ecodes
+        self._ui = UInput({ecodes.EV_REL: [ecodes.REL_X, ecodes.REL_Y, ecodes.REL_WHEEL],
+                           ecodes.EV_KEY: [ecodes.BTN_LEFT, ecodes.BTN_RIGHT]}, name="mouth-mouse-relay")
+        self._buttons = {BUTTON_LEFT: ecodes.BTN_LEFT, BUTTON_RIGHT: ecodes.BTN_RIGHT}
+
+    def move(self, dx, dy):
+        e = self._e
+        if dx: self._ui.write(e.EV_REL, e.REL_X, dx)
+        if dy: self._ui.write(e.EV_REL, e.REL_Y, dy)
+        self._ui.syn()
+
+    def button(self, button, down):
+        self._ui.write(self._e.EV_KEY, self._buttons[button], 1 if down else 0); self._ui.syn()
+
+    def scroll(self, clicks):
+        self._ui.write(self._e.EV_REL, self._e.REL_WHEEL, clicks); self._ui.syn()
+
+    def close(self):
+        self._ui.close()
+
+
+class XTestBackend(InjectionBackend):
+    name = "xtest"
+
+    def __init__(self):
+        from Xlib import X, display
+        from Xlib.ext import xtest
+        self._X = X; self._xtest = xtest
+        self._display = display.Display()
+        if not self._display.has_extension("XTEST"): raise RuntimeError("XTEST extension not available")
+        self._buttons = {BUTTON_LEFT: 1, BUTTON_RIGHT: 3}
+
+    def move(self, dx, dy):
+        # detail=True makes MotionNotify relative to the current pointer position.
+        self._xtest.fake_input(self._display, self._X.MotionNotify, detail=True, x=dx, y=dy); self._display.flush()
+
+    def button(self, button, down):
+        event = self._X.ButtonPress if down else self._X.ButtonRelease
+        self._xtest.fake_input(self._display, event, self._buttons[button]); self._display.flush()
+
+    def scroll(self, clicks):
+        wheel_button = 4 if clicks > 0 else 5
+        for _ in range(abs(clicks)):
+            self._xtest.fake_input(self._display, self._X.ButtonPress, wheel_button)
+            self._xtest.fake_input(self._display, self._X.ButtonRelease, wheel_button)
+        self._display.flush()
+
+    def close(self):
+        self._display.close()
+
+
+class SendInputBackend(InjectionBackend):
+    name = "sendinput"
+    MOUSEEVENTF_MOVE = 0x0001; MOUSEEVENTF_WHEEL = 0x0800
+    BUTTON_FLAGS = {(BUTTON_LEFT, True): 0x0002, (BUTTON_LEFT, False): 0x0004,
+                    (BUTTON_RIGHT, True): 0x0008, (BUTTON_RIGHT, False): 0x0010}
+
+    def __init__(self):
+        if sys.platform != "win32": raise RuntimeError("SendInput is only available on Windows")
+        import ctypes
+        from ctypes import wintypes
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+        class _INPUTUNION(ctypes.Union):
+            _fields_ = [("mi", MOUSEINPUT), ("_pad", ctypes.c_byte * 32)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+        self._ctypes = ctypes; self._INPUT = INPUT
+        self._send_input = ctypes.windll.user32.SendInput
+
+    def _send(self, dx=0, dy=0, data=0, flags=0):
+        inp = self._INPUT(type=0) # INPUT_MOUSE
+        mi = inp.u.mi; mi.dx = dx; mi.dy = dy; mi.mouseData = data & 0xFFFFFFFF; mi.dwFlags = flags
+        self._send_input(1, self._ctypes.byref(inp), self._ctypes.sizeof(inp))
+
+    def move(self, dx, dy): self._send(dx, dy, flags=self.MOUSEEVENTF_MOVE)
+    def button(self, button, down): self._send(flags=self.BUTTON_FLAGS[(button, down)])
+    def scroll(self, clicks): self._send(data=clicks, flags=self.MOUSEEVENTF_WHEEL) # Wheel delta, as pyautogui sends it
+
+
+BACKENDS = {
+    "uinput": UInputBackend, "sendinput": SendInputBackend, "xtest": XTestBackend,
+    "pyautogui": PyAutoGuiBackend, "fake": FakeBackend,
+}
+AUTO_ORDER = ("uinput", "sendinput", "xtest", "pyautogui")
+
+
+def create_injection_backend(preferred="auto"):
+    names = AUTO_ORDER if preferred == "auto" else (preferred,)
+    errors = []
+    for name in names:
+        try: return BACKENDS[name]()
+        except Exception as e: errors.append(f"{name}: {e}")
+    raise RuntimeError("No mouse injection backend available (" + "; ".join(errors) + ")")
+
+
+class LatencyStats:
+    def __init__(self, window=2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0; self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        self.samples.append(ms); self.count += 1
+        if ms > self.max_ms: self.max_ms = ms
+
+    def percentile(self, q):
+        if not self.samples: return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+    def summary(self):
+        return f"p50 {self.percentile(50):.2f} ms p99 {self.percentile(99):.2f} ms max {self.max_ms:.2f} ms"
+
+
+class MouseInjector:
+    # Injects a batch of MOVE/EVENT messages. Moves and scrolls are summed up to the next
+    # button event, so clicks still land where they happened in the stream, and injected in
+    # the order the first of each arrived. Fractional move remainders (from move_scale or
+    # float motion) are carried into the next injection.
+    def __init__(self, backend, move_scale=1.0):
+        self.backend = backend; self.move_scale = move_scale
+        self.latency = LatencyStats()
+        self._rem_x = 0.0; self._rem_y = 0.0
+        self.moves_received = 0; self.moves_injected = 0; self.moves_cancelled = 0
+        self.scrolls_received = 0; self.scrolls_injected = 0; self.scrolls_cancelled = 0; self.buttons_injected = 0
+        self.left_button_down = False; self.right_button_down = False
+        self.move_listener = None # move_listener(dx, dy) after each injected move, on the relay thread
+
+    def inject_batch(self, messages, arrival_time=None):
+        dx = dy = 0.0; moves = 0; scroll = 0; scrolls = 0; scroll_first = False
+        for msg in messages:
+            kind = msg[0]
+            if kind == MSG_MOVE:
+                dx += msg[1]; dy += msg[2]; moves += 1
+                continue
+            if kind != MSG_EVENT: continue
+            action = EVENT_ACTIONS.get(msg[1])
+            if action is None: continue
+            if action[0] == "scroll":
+                if not moves and not scrolls: scroll_first = True
+                scroll += action[1]; scrolls += 1
+                continue
+            if moves or scrolls:
+                self._flush(dx, dy, moves, scroll, scrolls, scroll_first, arrival_time)
+                dx = dy = 0.0; moves = scroll = scrolls = 0; scroll_first = False
+            self.backend.button(action[1], action[2]); self.buttons_injected += 1
+            if action[1] == BUTTON_LEFT: self.left_button_down = action[2]
+            else: self.right_button_down = action[2]
+            if arrival_time is not None: self.latency.record(time.perf_counter() - arrival_time)
+        if moves or scrolls: self._flush(dx, dy, moves, scroll, scrolls, scroll_first, arrival_time)
+
+    def _flush(self, dx, dy, moves, scroll, scrolls, scroll_first, arrival_time):
+        if scroll_first: self._flush_scroll(scroll, scrolls, arrival_time)
+        if moves:
+            self.moves_received += moves
+            fx = dx * self.move_scale + self._rem_x; fy = dy * self.move_scale + self._rem_y
+            ix = int(fx + SUBPIXEL_EPSILON if fx > 0 else fx - SUBPIXEL_EPSILON)
+            iy = int(fy + SUBPIXEL_EPSILON if fy > 0 else fy - SUBPIXEL_EPSILON)
+            self._rem_x = fx - ix; self._rem_y = fy - iy
+            if ix or iy:
+                self.backend.move(ix, iy); self.moves_injected += 1
+                if self.move_listener is not None: self.move_listener(ix, iy)
+                if arrival_time is not None: self.latency.record(time.perf_counter() - arrival_time)
+            else: self.moves_cancelled += moves # Summed to less than a pixel; nothing was merged into a move
+        if scrolls and not scroll_first: self._flush_scroll(scroll, scrolls, arrival_time)
+
+    def _flush_scroll(self, scroll, scrolls, arrival_time):
+        self.scrolls_received += scrolls
+        if scroll:
+            self.backend.scroll(scroll * SCROLL_STEP); self.scrolls_injected += 1
+            if arrival_time is not None: self.latency.record(time.perf_counter() - arrival_time)
+        else: self.scrolls_cancelled += scrolls # Up and down cancelled out
+
+    def reset_motion(self):
+        self._rem_x = 0.0; self._rem_y = 0.0
+
+    def release_buttons(self):
+        if self.left_button_down: self.backend.button(BUTTON_LEFT, False); self.left_button_down = False
+        if self.right_button_down: self.backend.button(BUTTON_RIGHT, False); self.right_button_down = False
+
+    @property
+    def merged_events(self):
+        # Events folded into an injected move or scroll; batches that cancelled out are counted apart.
+        return ((self.moves_received - self.moves_injected - self.moves_cancelled)
+                + (self.scrolls_received - self.scrolls_injected - self.scrolls_cancelled))
+
+    def summary(self):
+        return (f"inject {self.backend.name}: moves {self.moves_received}->{self.moves_injected} "
+                f"({self.moves_cancelled} cancelled), scrolls {self.scrolls_received}->{self.scrolls_injected} "
+                f"({self.scrolls_cancelled} cancelled), {self.latency.summary()}")
+
+
+BUTTON_EVENTS = frozenset(name for name, action in EVENT_ACTIONS.items() if action[0] == "button")
+
+
+class MouseRelay:
+    # Runs injection on its own thread so a slow backend never stalls the serial reader.
+    # Everything that piles up while the backend is busy, or within coalesce_window_s of
+    # the first pending event, is injected as one merged batch. Button events skip the wait.
+    def __init__(self, injector, coalesce_window_s=0.0, on_error=None):
+        self.injector = injector; self.coalesce_window_s = coalesce_window_s; self.on_error = on_error
+        self._cond = threading.Condition()
+        self._pending = []; self._first_arrival = None; self._urgent = False
+        self._running = False; self._thread = None
+        self.batches = 0; self.max_pending = 0
+
+    def start(self):
+        if self._thread is not None: return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="mouse-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=0.5):
+        with self._cond:
+            self._running = False; self._cond.notify()
+        if self._thread is not None: self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def submit(self, messages, arrival_time=None):
+        with self._cond:
+            if not self._pending: self._first_arrival = arrival_time if arrival_time is not None else time.perf_counter()
+            self._pending.extend(messages)
+            if len(self._pending) > self.max_pending: self.max_pending = len(self._pending)
+            if not self._urgent:
+                for msg in messages:
+                    if msg[0] == MSG_EVENT and msg[1] in BUTTON_EVENTS: self._urgent = True; break
+            self._cond.notify()
+
+    def _run(self):
+        cond = self._cond
+        while True:
+            with cond:
+                while self._running and not self._pending: cond.wait()
+                if not self._pending: return
+                if self.coalesce_window_s > 0:
+                    deadline = self._first_arrival + self.coalesce_window_s
+                    while self._running and not self._urgent:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0: break
+                        cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                arrival = self._first_arrival; self._urgent = False
+            self.batches += 1
+            try: self.injector.inject_batch(batch, arrival)
+            except Exception as e:
+                if self.on_error: self.on_error(e)
+
+    def summary(self):
+        return f"{self.injector.summary()}, merged {self.injector.merged_events} in {self.batches} batches (max pending {self.max_pending})"
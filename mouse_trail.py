@@ -0,0 +1,88 @@
+# Retained-mode renderer for the Trainer mouse trail.
+#
+# Canvas items are created once per canvas and then only moved:
+#   TRAIL_LINE  one smoothed polyline whose coords are rewritten every frame
+#   TRAIL_FADE  a fixed pool of two-point segments, oldest faded towards the background;
+#               the colors are precomputed so a frame is only coords calls
+TRAIL_LINE = "line"
+TRAIL_FADE = "fade"
+TRAIL_MODES = (TRAIL_LINE, TRAIL_FADE)
+TRAIL_WIDTH = 2
+TRAIL_SPLINE_STEPS = 5
+
+
+def _blend(canvas, color_from, color_to, t):
+    r0, g0, b0 = canvas.winfo_rgb(color_from); r1, g1, b1 = canvas.winfo_rgb(color_to)
+    mix = lambda a, b: int((a + (b - a) * t) / 257)
+    return f"#{mix(r0, r1):02x}{mix(g0, g1):02x}{mix(b0, b1):02x}"
+
+
+class MouseTrailRenderer:
+    def __init__(self, canvas, max_points, color, bg_color, mode=TRAIL_LINE):
+        if mode not in TRAIL_MODES: raise ValueError(f"Unknown trail mode: {mode}")
+        self.canvas = canvas; self.max_points = max(2, int(max_points)); self.mode = mode
+        self.color = color; self.bg_color = bg_color
+        self._line_id = None; self._segment_ids = []; self._visible = 0
+        self._coords = [0.0] * (2 * self.max_points)
+        self.frames = 0
+
+    def set_colors(self, color, bg_color):
+        if (color, bg_color) == (self.color, self.bg_color): return
+        self.color = color; self.bg_color = bg_color
+        if self._line_id is not None: self.canvas.itemconfig(self._line_id, fill=color)
+        for i, seg_id in enumerate(self._segment_ids): self.canvas.itemconfig(seg_id, fill=self._segment_color(i))
+
+    def clear(self):
+        if self._line_id is not None: self.canvas.delete(self._line_id)
+        for seg_id in self._segment_ids: self.canvas.delete(seg_id)
+        self._line_id = None; self._segment_ids = []; self._visible = 0
+
+    def _segment_color(self, i):
+        # Segment 0 is the oldest; the newest segment gets the full trail color.
+        n = len(self._segment_ids) or self.max_points - 1
+        try: return _blend(self.canvas, self.bg_color, self.color, (i + 1) / float(n))
+        except Exception: return self.color
+
+    def _ensure_items(self):
+        canvas = self.canvas
+        if self.mode == TRAIL_LINE:
+            if self._line_id is None:
+                self._line_id = canvas.create_line(0, 0, 0, 0, fill=self.color, width=TRAIL_WIDTH, tags="trail",
+                                                   smooth=True, splinesteps=TRAIL_SPLINE_STEPS, state="hidden")
+            return
+        if not self._segment_ids:
+            self._segment_ids = [canvas.create_line(0, 0, 0, 0, width=TRAIL_WIDTH, tags="trail", state="hidden", capstyle="round")
+                                 for _ in range(self.max_points - 1)]
+            for i, seg_id in enumerate(self._segment_ids): canvas.itemconfig(seg_id, fill=self._segment_color(i))
+
+    def render(self, points):
+        self._ensure_items()
+        n = min(len(points), self.max_points)
+        if self.mode == TRAIL_LINE: self._render_line(points, n)
+        else: self._render_fade(points, n)
+        self.frames += 1
+
+    def _render_line(self, points, n):
+        canvas = self.canvas
+        if n < 2:
+            if self._visible: canvas.itemconfig(self._line_id, state="hidden"); self._visible = 0
+            return
+        buf = self._coords; skip = len(points) - n; i = 0
+        for x, y in points:
+            if skip: skip -= 1; continue
+            buf[i] = x; buf[i + 1] = y; i += 2
+        canvas.coords(self._line_id, buf if n == self.max_points else buf[:2 * n])
+        if not self._visible: canvas.itemconfig(self._line_id, state="normal"); self._visible = 1
+
+    def _render_fade(self, points, n):
+        # The newest n-1 segments go into the newest pool slots, so each slot keeps its color.
+        canvas = self.canvas; segments = self._segment_ids; count = max(0, n - 1)
+        first = len(segments) - count
+        pts = list(points)[-n:] if n else []
+        for k in range(count):
+            (x0, y0), (x1, y1) = pts[k], pts[k + 1]
+            canvas.coords(segments[first + k], x0, y0, x1, y1)
+        if count != self._visible:
+            for i, seg_id in enumerate(segments):
+                canvas.itemconfig(seg_id, state="normal" if i >= first else "hidden")
+            self._visible = count
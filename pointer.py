@@ -0,0 +1,121 @@
+# Host-side pointer transfer function for the raw JOY:x,y stream (x/y centered, +-512).
+#
+# Per tick: subtract the tracked center, then apply deadzone (JDZ) and move threshold (JMT),
+# scale to the full-range deflection (JFR), shape with the acceleration curve (JPA, 50 is
+# linear) and scale to the cursor speed (CSP, pixels per 10 ms at full deflection, the
+# same unit the firmware uses). While the stick rests inside the deadzone the center decays
+# towards it with time constant JRC. Deflections in the inner band emit single-pixel steps
+# every JIR seconds for precise positioning. Output is float motion; the relay carries the
+# sub-pixel remainder.
+import math
+import threading
+import time
+
+from protocol import MSG_MOVE
+from injection import LatencyStats
+
+STICK_MAX = 512.0
+INNER_BAND = 0.2 # Fraction of the usable range treated as the inner (repeat) band
+CSP_REFERENCE_PERIOD_S = 0.01
+DEFAULT_TICK_HZ = 250
+MAX_CATCHUP_TICKS = 4
+
+
+class PointerParams:
+    def __init__(self, settings):
+        self.deadzone = max(0.0, float(settings.get("JDZ", 0))) / 100.0
+        self.threshold = max(self.deadzone, float(settings.get("JMT", 0)) / 100.0)
+        self.full_range = max(self.threshold + 0.01, float(settings.get("JFR", 100)) / 100.0)
+        self.click_band = float(settings.get("JCB", 0)) / 100.0
+        self.recenter_s = max(0.0, float(settings.get("JRC", 0)))
+        self.repeat_s = max(0.0, float(settings.get("JIR", 0)))
+        self.exponent = 2.0 ** ((float(settings.get("JPA", 50)) - 50.0) / 25.0)
+        self.max_speed = float(settings.get("CSP", 10)) / CSP_REFERENCE_PERIOD_S # px/s
+        self.span = self.full_range - self.threshold
+
+
+class PointerPipeline:
+    def __init__(self, output, settings, tick_hz=DEFAULT_TICK_HZ):
+        self.output = output # output(messages, arrival_time), e.g. MouseRelay.submit
+        self.params = PointerParams(settings)
+        self.tick_hz = tick_hz
+        self._raw_x = 0.0; self._raw_y = 0.0
+        self.center_x = 0.0; self.center_y = 0.0
+        self._repeat_elapsed = None
+        self.deflection = 0.0
+        self.jitter = LatencyStats()
+        self.ticks = 0; self.moves = 0; self.tick_cost = LatencyStats(window=512)
+        self._running = False; self._thread = None
+
+    def set_params(self, settings):
+        self.params = PointerParams(settings)
+
+    def update_joystick(self, x, y):
+        # Called from the serial read thread; two attribute writes, read once per tick.
+        self._raw_x = x; self._raw_y = y
+
+    @property
+    def clicks_allowed(self):
+        return self.deflection <= self.params.click_band
+
+    def reset(self):
+        self.center_x = self.center_y = 0.0; self._repeat_elapsed = None
+
+    def step(self, dt):
+        p = self.params
+        x = self._raw_x - self.center_x; y = self._raw_y - self.center_y
+        r = math.hypot(x, y) / STICK_MAX
+        self.deflection = r
+        if r <= p.deadzone:
+            if p.recenter_s > 0:
+                k = min(1.0, dt / p.recenter_s)
+                self.center_x += x * k; self.center_y += y * k
+            self._repeat_elapsed = None
+            return None
+        if r <= p.threshold:
+            self._repeat_elapsed = None
+            return None
+        ux = x / (r * STICK_MAX); uy = -y / (r * STICK_MAX) # Stick up moves the cursor up
+        norm = min(1.0, (r - p.threshold) / p.span)
+        if p.repeat_s > 0 and norm < INNER_BAND:
+            if self._repeat_elapsed is None or self._repeat_elapsed >= p.repeat_s:
+                self._repeat_elapsed = 0.0
+                return (float(round(ux)), float(round(uy)))
+            self._repeat_elapsed += dt
+            return None
+        self._repeat_elapsed = None
+        distance = (norm ** p.exponent) * p.max_speed * dt
+        return (ux * distance, uy * distance)
+
+    def start(self):
+        if self._thread is not None: return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="pointer-pipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=0.5):
+        self._running = False
+        if self._thread is not None: self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self):
+        period = 1.0 / self.tick_hz
+        clock = time.perf_counter
+        last = next_tick = clock()
+        while self._running:
+            next_tick += period
+            delay = next_tick - clock()
+            if delay > 0: time.sleep(delay)
+            now = clock()
+            self.jitter.record(now - next_tick)
+            if now - next_tick > MAX_CATCHUP_TICKS * period: next_tick = now # Don't burst after a stall
+            motion = self.step(now - last)
+            last = now
+            if motion is not None and (motion[0] or motion[1]):
+                self.output([(MSG_MOVE, motion[0], motion[1])], now); self.moves += 1
+            self.ticks += 1
+            self.tick_cost.record(clock() - now)
+
+    def summary(self):
+        return (f"pointer {self.tick_hz} Hz: jitter {self.jitter.summary()}, "
+                f"tick cost p99 {self.tick_cost.percentile(99) * 1000:.1f} us")
@@ -0,0 +1,145 @@
+# Retained-mode renderer for the Calibrate Sensor pressure graph.
+#
+# Canvas items are created once and then only moved: threshold lines/labels when a
+# threshold or the canvas size changes, the pressure trace on every frame.
+#   STRATEGY_COORDS  one polyline whose points are rewritten from a preallocated buffer
+#   STRATEGY_SCROLL  one short segment per new sample; the canvas view scrolls instead of
+#                    redrawing the history, so per-sample Tk work no longer depends on width
+from collections import deque
+
+THRESHOLD_KEYS = ("HPT", "SPT", "NMAX", "NMIN", "HST")
+THRESHOLD_COLORS = {"HPT": "orangered", "SPT": "gold", "NMAX": "lightgreen", "NMIN": "lightgreen", "HST": "deepskyblue"}
+PRESSURE_MAX = 1023
+Y_PADDING = 10
+LABEL_GAP = 5
+LINE_COLOR = "cyan"
+LINE_WIDTH = 2
+
+STRATEGY_COORDS = "coords"
+STRATEGY_SCROLL = "scroll"
+STRATEGIES = (STRATEGY_COORDS, STRATEGY_SCROLL)
+
+# Scroll mode keeps moving right; rebuild before canvas coordinates get silly.
+MAX_SCROLL_OFFSET = 1000000
+
+
+class PressurePlotRenderer:
+    def __init__(self, canvas, label_area_width, font, strategy=STRATEGY_COORDS):
+        if strategy not in STRATEGIES: raise ValueError(f"Unknown pressure plot strategy: {strategy}")
+        self.canvas = canvas; self.label_area_width = label_area_width; self.font = font
+        self.strategy = strategy
+        self.width = 0; self.height = 0; self.max_points = 1
+        self.thresholds = {}; self.text_color = "black"; self.bg_color = None
+        self._threshold_items = {}; self._line_id = None; self._line_visible = False
+        self._coords = []; self._x_step = 1.0
+        self._segments = deque(); self._scroll_x = 0.0; self._view_x = 0; self._last_point = None
+        self._sample_count = 0; self._needs_rebuild = True
+        if strategy == STRATEGY_SCROLL: canvas.configure(xscrollincrement=1, confine=False)
+
+    def pressure_to_y(self, pressure_val):
+        graph_height = self.height - (2 * Y_PADDING)
+        if graph_height <= 0: graph_height = 1
+        scaled_pressure = max(0, min(PRESSURE_MAX, pressure_val))
+        return (self.height - Y_PADDING) - ((scaled_pressure / float(PRESSURE_MAX)) * graph_height)
+
+    def clear(self):
+        self.canvas.delete("all")
+        if self._view_x: self.canvas.xview_scroll(-self._view_x, "units")
+        self._threshold_items = {}; self._line_id = None; self._line_visible = False
+        self._segments.clear(); self._view_x = 0; self._last_point = None
+        self._needs_rebuild = True
+
+    def set_colors(self, bg_color, text_color):
+        if bg_color != self.bg_color:
+            self.bg_color = bg_color; self.canvas.configure(bg=bg_color)
+        if text_color != self.text_color:
+            self.text_color = text_color
+            for _, text_id in self._threshold_items.values(): self.canvas.itemconfig(text_id, fill=text_color)
+
+    def set_thresholds(self, values):
+        for key, value in values.items():
+            if self.thresholds.get(key) == value: continue
+            self.thresholds[key] = value
+            if key in self._threshold_items and self.height > 1: self._position_threshold(key)
+
+    def resize(self, width, height, max_points):
+        max_points = max(1, int(max_points))
+        if (width, height, max_points) == (self.width, self.height, self.max_points): return False
+        self.width, self.height, self.max_points = width, height, max_points
+        graph_width = max(1, width - self.label_area_width)
+        self._x_step = graph_width / max_points
+        x0 = self.label_area_width; step = self._x_step
+        self._coords = [0.0] * (2 * max_points)
+        self._coords[0::2] = [x0 + i * step for i in range(max_points)]
+        for key in self._threshold_items: self._position_threshold(key)
+        self._needs_rebuild = True
+        return True
+
+    def render(self, history, new_count=0):
+        if self.width <= 1 or self.height <= 1: return
+        self._ensure_items()
+        if self.strategy == STRATEGY_COORDS: self._render_coords(history)
+        elif self._needs_rebuild or new_count >= self.max_points or self._scroll_x > MAX_SCROLL_OFFSET: self._rebuild_scroll(history)
+        elif new_count > 0:
+            self._push_scroll(history[-new_count:] if new_count < len(history) else history)
+
+    def _ensure_items(self):
+        if self._threshold_items: return
+        canvas = self.canvas
+        for key in THRESHOLD_KEYS:
+            line_id = canvas.create_line(0, 0, 0, 0, fill=THRESHOLD_COLORS.get(key, "gray50"), width=1, dash=(4, 2), tags=("threshold", "fixed"))
+            text_id = canvas.create_text(0, 0, text="", fill=self.text_color, anchor="e", font=self.font, tags=("threshold_text", "fixed"))
+            self._threshold_items[key] = (line_id, text_id)
+            if key in self.thresholds: self._position_threshold(key)
+        if self.strategy == STRATEGY_COORDS:
+            self._line_id = canvas.create_line(0, 0, 0, 0, fill=LINE_COLOR, width=LINE_WIDTH, state="hidden", tags=("pressure_line", "fixed"))
+            self._line_visible = False
+
+    def _position_threshold(self, key):
+        line_id, text_id = self._threshold_items[key]
+        value = self.thresholds.get(key, 0); y = self.pressure_to_y(value); vx = self._view_x
+        self.canvas.coords(line_id, self.label_area_width + vx, y, self.width + vx, y)
+        self.canvas.coords(text_id, self.label_area_width - LABEL_GAP + vx, y)
+        self.canvas.itemconfig(text_id, text=f"{key}: {value}")
+
+    def _render_coords(self, history):
+        n = min(len(history), self.max_points)
+        canvas = self.canvas
+        if n < 2:
+            if self._line_visible: canvas.itemconfig(self._line_id, state="hidden"); self._line_visible = False
+            return
+        buf = self._coords
+        if hasattr(history, 'to_canvas_y'): buf[1:2 * n:2] = history.to_canvas_y(self.height, Y_PADDING, PRESSURE_MAX, n)
+        else:
+            to_y = self.pressure_to_y
+            visible = history[-n:] if n < len(history) else history
+            buf[1:2 * n:2] = [to_y(p) for p in visible]
+        canvas.coords(self._line_id, buf if n == self.max_points else buf[:2 * n])
+        if not self._line_visible: canvas.itemconfig(self._line_id, state="normal"); self._line_visible = True
+
+    def _rebuild_scroll(self, history):
+        canvas = self.canvas
+        canvas.delete("pressure_seg"); self._segments.clear()
+        if self._view_x:
+            canvas.xview_scroll(-self._view_x, "units"); canvas.move("fixed", -self._view_x, 0); self._view_x = 0
+        self._scroll_x = float(self.label_area_width); self._last_point = None; self._sample_count = 0
+        self._needs_rebuild = False
+        n = min(len(history), self.max_points)
+        if n: self._push_scroll(history[-n:] if n < len(history) else history)
+
+    def _push_scroll(self, samples):
+        canvas = self.canvas; to_y = self.pressure_to_y; step = self._x_step
+        segments = self._segments; max_segments = max(1, self.max_points - 1)
+        last = self._last_point; x = self._scroll_x
+        for p in samples:
+            y = to_y(p)
+            if last is not None:
+                segments.append(canvas.create_line(last[0], last[1], x, y, fill=LINE_COLOR, width=LINE_WIDTH, tags="pressure_seg"))
+            last = (x, y); x += step
+        while len(segments) > max_segments: canvas.delete(segments.popleft())
+        self._last_point = last; self._scroll_x = x
+        self._sample_count += len(samples)
+        new_view = int(round(max(0, self._sample_count - self.max_points) * step))
+        dx = new_view - self._view_x
+        if dx:
+            canvas.xview_scroll(dx, "units"); canvas.move("fixed", dx, 0); self._view_x = new_view
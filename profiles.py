@@ -0,0 +1,457 @@
+# Profile storage.
+#
+# ProfileRepository keeps one JSON file per profile in a directory (possibly a shared
+# network drive) behind an in-memory index of name -> ProfileInfo (path, mtime, size), so
+# listing never touches the disk. Loads go through an LRU cache that is keyed by the
+# file's mtime. Saves write a temp file in the same directory and os.replace() it over the
+# profile, so readers see the old or the new file, never a torn one. The index follows
+# changes made by other processes through a watcher: watchdog (pip install watchdog) when
+# it is installed, otherwise a thread that stats the directory and rescans only when its
+# mtime moves (which every create, delete and atomic save does).
+#
+# File format, schema 2: {"schema_version": 2, "profile_name_meta": name, "saved_at": ...,
+# "settings": {...}}. Schema 1 had no version or saved_at, schema 0 was a bare settings
+# dict; both are migrated on load (migrate_all() rewrites them). Optional "user" and
+# "device" keys tag a profile for find().
+#
+# SqliteProfileStore offers the same API from a single SQLite file, for installations with
+# hundreds of users: indexed lookup by user and device, every save kept as a numbered
+# version that rollback() can restore, and import_directory()/export_directory() moving a
+# whole directory of JSON profiles in one transaction. open_profile_store() picks the
+# backend from the path (*.db, *.sqlite, *.sqlite3 -> SQLite).
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+SCHEMA_VERSION = 2
+PROFILE_EXTENSION = ".json"
+DATABASE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+_UMASK = os.umask(0); os.umask(_UMASK) # Read once: mkstemp creates files 0600 regardless
+
+
+def _migrate_v0(data):
+    return {"profile_name_meta": None, "settings": data}
+
+
+def _migrate_v1(data):
+    return dict(data, schema_version=2, saved_at=None)
+
+
+MIGRATIONS = {0: _migrate_v0, 1: _migrate_v1} # version -> function producing version + 1
+
+
+def schema_version(data):
+    if "schema_version" in data: return data["schema_version"]
+    return 1 if "settings" in data else 0
+
+
+def migrate(data):
+    version = schema_version(data)
+    if version > SCHEMA_VERSION: raise ValueError(f"profile schema {version} is newer than this program ({SCHEMA_VERSION})")
+    while version < SCHEMA_VERSION:
+        data = MIGRATIONS[version](data); version += 1
+    return data
+
+
+def make_document(name, settings, user=None, device=None, saved_at=None):
+    document = {"schema_version": SCHEMA_VERSION, "profile_name_meta": name,
+                "saved_at": saved_at or time.strftime("%Y-%m-%dT%H:%M:%S"), "settings": dict(settings)}
+    if user is not None: document["user"] = user
+    if device is not None: document["device"] = device
+    return document
+
+
+def _matches(document, user, device):
+    return (user is None or document.get("user") == user) and (device is None or document.get("device") == device)
+
+
+def is_profile_database(location):
+    return str(location).lower().endswith(DATABASE_EXTENSIONS)
+
+
+def open_profile_store(location, **kwargs):
+    return SqliteProfileStore(location) if is_profile_database(location) else ProfileRepository(location, **kwargs)
+
+
+class ProfileInfo:
+    __slots__ = ("name", "path", "mtime", "size")
+
+    def __init__(self, name, path, mtime, size):
+        self.name = name; self.path = path; self.mtime = mtime; self.size = size
+
+
+class ProfileRepository:
+    def __init__(self, directory, cache_size=64, poll_interval_s=2.0):
+        self.directory = directory; self.cache_size = cache_size; self.poll_interval_s = poll_interval_s
+        self._lock = threading.RLock()
+        self._index = None; self._dir_mtime = None
+        self._cache = OrderedDict() # name -> (mtime, document)
+        self.on_change = None # on_change(names) after the index picked up outside changes, on the watcher thread
+        self._watcher = None; self._observer = None; self._stop = threading.Event()
+        self.scans = 0; self.cache_hits = 0; self.cache_misses = 0
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}{PROFILE_EXTENSION}")
+
+    # --- Index ---
+    def _scan(self):
+        # Full directory listing, diffed against the index; returns the names that changed.
+        self.scans += 1
+        found = {}
+        try:
+            self._dir_mtime = os.stat(self.directory).st_mtime
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(PROFILE_EXTENSION) or not entry.is_file(): continue
+                    st = entry.stat(); name = entry.name[:-len(PROFILE_EXTENSION)]
+                    found[name] = ProfileInfo(name, entry.path, st.st_mtime, st.st_size)
+        except FileNotFoundError: self._dir_mtime = None
+        old = self._index or {}
+        changed = [n for n in found if n not in old or old[n].mtime != found[n].mtime or old[n].size != found[n].size]
+        changed += [n for n in old if n not in found]
+        self._index = found
+        for name in changed: self._cache.pop(name, None)
+        return changed
+
+    def _ensure_index(self):
+        if self._index is None: self._scan()
+        return self._index
+
+    def _refresh_entry(self, name):
+        # Re-stat one profile (watchdog events); returns True if the index changed.
+        path = self._path(name)
+        with self._lock:
+            index = self._ensure_index()
+            try: st = os.stat(path)
+            except FileNotFoundError:
+                self._cache.pop(name, None)
+                return index.pop(name, None) is not None
+            old = index.get(name)
+            if old is not None and old.mtime == st.st_mtime and old.size == st.st_size: return False
+            index[name] = ProfileInfo(name, path, st.st_mtime, st.st_size); self._cache.pop(name, None)
+            return True
+
+    def refresh(self):
+        with self._lock: return self._scan()
+
+    def info(self, name):
+        with self._lock: return self._ensure_index().get(name)
+
+    def list_names(self):
+        with self._lock: return sorted(self._ensure_index())
+
+    # --- Documents ---
+    def load_document(self, name):
+        with self._lock:
+            info = self._ensure_index().get(name)
+            if info is None: raise FileNotFoundError(self._path(name))
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == info.mtime:
+                self._cache.move_to_end(name); self.cache_hits += 1
+                return cached[1]
+        self.cache_misses += 1
+        with open(info.path, 'r') as f: document = migrate(json.load(f))
+        if document.get("profile_name_meta") is None: document["profile_name_meta"] = name
+        with self._lock:
+            self._cache[name] = (info.mtime, document); self._cache.move_to_end(name)
+            while len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return document
+
+    def load(self, name):
+        return dict(self.load_document(name)["settings"])
+
+    def save(self, name, settings, user=None, device=None):
+        self._write(name, make_document(name, settings, user, device))
+
+    def find(self, user=None, device=None):
+        # Names tagged with user and/or device; reads every profile, use the SQLite store for many.
+        return [name for name in self.list_names() if _matches(self.load_document(name), user, device)]
+
+    def _write(self, name, document):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(name)
+        try: mode = os.stat(path).st_mode & 0o7777 # Keep the mode of the profile we replace
+        except OSError: mode = 0o666 & ~_UMASK # What open(path, 'w') would have created
+        fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(document, f, indent=2); f.flush(); os.fsync(f.fileno())
+            os.chmod(tmp, mode)
+            os.replace(tmp, path)
+        except BaseException:
+            try: os.remove(tmp)
+            except OSError: pass
+            raise
+        st = os.stat(path)
+        with self._lock:
+            self._ensure_index()[name] = ProfileInfo(name, path, st.st_mtime, st.st_size)
+            self._cache[name] = (st.st_mtime, document); self._cache.move_to_end(name)
+            try: self._dir_mtime = os.stat(self.directory).st_mtime # Our own change, don't report it
+            except OSError: pass
+
+    def delete(self, name):
+        os.remove(self._path(name))
+        with self._lock:
+            self._ensure_index().pop(name, None); self._cache.pop(name, None)
+            try: self._dir_mtime = os.stat(self.directory).st_mtime
+            except OSError: pass
+
+    def migrate_all(self):
+        # Rewrites every profile stored in an older schema; returns the migrated names.
+        migrated = []
+        for name in self.list_names():
+            with open(self.info(name).path, 'r') as f: raw = json.load(f)
+            if schema_version(raw) < SCHEMA_VERSION: self._write(name, self.load_document(name)); migrated.append(name)
+        return migrated
+
+    # --- Watching ---
+    def start_watching(self):
+        if self._watcher is not None or self._observer is not None: return
+        with self._lock: self._ensure_index()
+        self._stop.clear()
+        try: self._observer = self._start_watchdog()
+        except (ImportError, OSError): self._observer = None
+        if self._observer is None:
+            self._watcher = threading.Thread(target=self._poll_directory, name="profile-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        observer, self._observer = self._observer, None
+        if observer is not None: observer.stop(); observer.join(timeout=1.0)
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None: watcher.join(timeout=1.0)
+
+    @property
+    def watch_mode(self):
+        return "watchdog" if self._observer is not None else "poll" if self._watcher is not None else "off"
+
+    def _notify(self, changed):
+        if changed and self.on_change is not None:
+            try: self.on_change(changed)
+            except Exception as e: print(f"Profile change listener failed: {e}")
+
+    def _poll_directory(self):
+        while not self._stop.wait(self.poll_interval_s):
+            try: mtime = os.stat(self.directory).st_mtime
+            except OSError: mtime = None
+            if mtime == self._dir_mtime: continue
+            with self._lock: changed = self._scan()
+            self._notify(changed)
+
+    def _start_watchdog(self):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+        repo = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory: return
+                names = set()
+                for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+                    base = os.path.basename(path or "")
+                    if base.endswith(PROFILE_EXTENSION) and not base.startswith("."): names.add(base[:-len(PROFILE_EXTENSION)])
+                repo._notify([name for name in names if repo._refresh_entry(name)])
+
+        os.makedirs(self.directory, exist_ok=True)
+        observer = Observer(); observer.schedule(Handler(), self.directory, recursive=False); observer.start()
+        return observer
+
+    def summary(self):
+        with self._lock: count = len(self._index or {})
+        return f"profiles: {count} indexed, {self.scans} scans, cache {self.cache_hits} hits / {self.cache_misses} misses, watcher {self.watch_mode}"
+
+
+class SqliteProfileStore:
+    DB_SCHEMA = 1 # PRAGMA user_version
+    _DDL = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            name TEXT PRIMARY KEY, user TEXT, device TEXT, version INTEGER NOT NULL,
+            saved_at TEXT, updated REAL NOT NULL, settings TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS profiles_user ON profiles (user, device);
+        CREATE INDEX IF NOT EXISTS profiles_device ON profiles (device);
+        CREATE TABLE IF NOT EXISTS profile_versions (
+            name TEXT NOT NULL, version INTEGER NOT NULL, user TEXT, device TEXT,
+            saved_at TEXT, settings TEXT NOT NULL, note TEXT, PRIMARY KEY (name, version));
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # One connection shared by the GUI and engine threads, serialised by the lock.
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._names = None # Sorted name list, dropped on every write
+        self.on_change = None # Same hook as ProfileRepository; this store has no outside watcher
+        self.queries = 0
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL"); self._db.execute("PRAGMA synchronous=NORMAL")
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version > self.DB_SCHEMA: raise ValueError(f"profile database schema {version} is newer than this program ({self.DB_SCHEMA})")
+            self._db.executescript(self._DDL)
+            self._db.execute(f"PRAGMA user_version={self.DB_SCHEMA}")
+
+    def close(self):
+        with self._lock: self._db.close()
+
+    def _query(self, sql, args=()):
+        self.queries += 1
+        return self._db.execute(sql, args)
+
+    def _transaction(self, fn):
+        # Runs fn() inside BEGIN IMMEDIATE .. COMMIT, rolling back on any error.
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try: result = fn()
+            except BaseException: self._db.execute("ROLLBACK"); raise
+            self._db.execute("COMMIT"); self._names = None
+            return result
+
+    # --- Same API as ProfileRepository ---
+    def refresh(self):
+        with self._lock: self._names = None
+        return []
+
+    def list_names(self):
+        with self._lock:
+            if self._names is None: self._names = [row[0] for row in self._query("SELECT name FROM profiles ORDER BY name")]
+            return list(self._names)
+
+    def info(self, name):
+        with self._lock: row = self._query("SELECT updated, length(settings) FROM profiles WHERE name=?", (name,)).fetchone()
+        return None if row is None else ProfileInfo(name, self.path, row[0], row[1])
+
+    def load_document(self, name):
+        with self._lock:
+            row = self._query("SELECT user, device, version, saved_at, settings FROM profiles WHERE name=?", (name,)).fetchone()
+        if row is None: raise FileNotFoundError(f"{self.path}:{name}")
+        document = make_document(name, json.loads(row[4]), row[0], row[1], row[3]); document["version"] = row[2]
+        return document
+
+    def load(self, name):
+        return self.load_document(name)["settings"]
+
+    def save(self, name, settings, user=None, device=None, note=None):
+        document = make_document(name, settings, user, device)
+        return self._transaction(lambda: self._put(document, note))
+
+    def _put(self, document, note=None):
+        # Inside a transaction: writes the next version of the profile; returns its number.
+        name = document["profile_name_meta"]
+        row = self._query("SELECT max(version) FROM profile_versions WHERE name=?", (name,)).fetchone()
+        version = (row[0] or 0) + 1
+        settings = json.dumps(document["settings"], sort_keys=True)
+        user = document.get("user"); device = document.get("device"); saved_at = document.get("saved_at")
+        self._query("INSERT OR REPLACE INTO profiles (name, user, device, version, saved_at, updated, settings) VALUES (?,?,?,?,?,?,?)",
+                    (name, user, device, version, saved_at, time.time(), settings))
+        self._query("INSERT INTO profile_versions (name, version, user, device, saved_at, settings, note) VALUES (?,?,?,?,?,?,?)",
+                    (name, version, user, device, saved_at, settings, note))
+        return version
+
+    def delete(self, name):
+        def run():
+            if self._query("DELETE FROM profiles WHERE name=?", (name,)).rowcount == 0: raise FileNotFoundError(f"{self.path}:{name}")
+            self._query("DELETE FROM profile_versions WHERE name=?", (name,))
+        self._transaction(run)
+
+    def migrate_all(self):
+        return [] # Rows are written in the current format
+
+    def find(self, user=None, device=None):
+        clauses = []; args = []
+        if user is not None: clauses.append("user=?"); args.append(user)
+        if device is not None: clauses.append("device=?"); args.append(device)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock: return [row[0] for row in self._query(f"SELECT name FROM profiles{where} ORDER BY name", args)]
+
+    def start_watching(self):
+        pass
+
+    def stop_watching(self):
+        pass
+
+    watch_mode = "off"
+
+    # --- History ---
+    def history(self, name):
+        # [(version, saved_at, note)], oldest first.
+        with self._lock:
+            return self._query("SELECT version, saved_at, note FROM profile_versions WHERE name=? ORDER BY version", (name,)).fetchall()
+
+    def load_version(self, name, version):
+        with self._lock:
+            row = self._query("SELECT user, device, saved_at, settings FROM profile_versions WHERE name=? AND version=?",
+                              (name, version)).fetchone()
+        if row is None: raise KeyError(f"{name} has no version {version}")
+        document = make_document(name, json.loads(row[3]), row[0], row[1], row[2]); document["version"] = version
+        return document
+
+    def rollback(self, name, version):
+        # Restores an earlier version as a new one, so the rollback itself can be undone.
+        old = self.load_version(name, version)
+        document = make_document(name, old["settings"], old.get("user"), old.get("device"))
+        return self._transaction(lambda: self._put(document, f"rollback to v{version}"))
+
+    # --- Bulk ---
+    def import_directory(self, directory, user=None, device=None):
+        # Imports every *.json profile (any schema) in one transaction; returns the names.
+        # The file name is the profile name, as in ProfileRepository; a stale
+        # profile_name_meta (a copied file) must not merge two profiles.
+        repo = ProfileRepository(directory)
+        documents = []
+        for name in repo.list_names():
+            document = dict(repo.load_document(name), profile_name_meta=name)
+            if user is not None: document["user"] = user
+            if device is not None: document["device"] = device
+            documents.append(document)
+        note = f"imported from {directory}"
+        self._transaction(lambda: [self._put(document, note) for document in documents])
+        return [document["profile_name_meta"] for document in documents]
+
+    def export_directory(self, directory):
+        # Writes the current version of every profile as a schema 2 JSON file; returns the count.
+        with self._lock:
+            rows = self._query("SELECT name, user, device, saved_at, settings FROM profiles ORDER BY name").fetchall()
+        repo = ProfileRepository(directory)
+        for name, user, device, saved_at, settings in rows:
+            repo._write(name, make_document(name, json.loads(settings), user, device, saved_at))
+        return len(rows)
+
+    def summary(self):
+        with self._lock: count = self._query("SELECT count(*) FROM profiles").fetchone()[0]
+        return f"profiles: {count} in {os.path.basename(self.path)}, {self.queries} queries"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile database maintenance")
+    parser.add_argument("database", help="SQLite profile database (*.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="import a directory of JSON profiles"); p.add_argument("directory")
+    p.add_argument("--user"); p.add_argument("--device")
+    p = sub.add_parser("export", help="export every profile as JSON"); p.add_argument("directory")
+    p = sub.add_parser("list", help="list profiles"); p.add_argument("--user"); p.add_argument("--device")
+    p = sub.add_parser("history", help="list the saved versions of a profile"); p.add_argument("name")
+    p = sub.add_parser("rollback", help="restore an earlier version"); p.add_argument("name"); p.add_argument("version", type=int)
+    args = parser.parse_args(argv)
+    store = SqliteProfileStore(args.database)
+    try:
+        if args.command == "import":
+            names = store.import_directory(args.directory, args.user, args.device); print(f"Imported {len(names)} profiles.")
+        elif args.command == "export": print(f"Exported {store.export_directory(args.directory)} profiles.")
+        elif args.command == "list":
+            for name in store.find(args.user, args.device): print(name)
+        elif args.command == "history":
+            for version, saved_at, note in store.history(args.name): print(f"v{version}  {saved_at}  {note or ''}")
+        else: print(f"{args.name}: restored v{args.version} as v{store.rollback(args.name, args.version)}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
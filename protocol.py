@@ -0,0 +1,212 @@
+# Wire protocol shared by App.py and the V2.ino firmware.
+#
+# The device speaks newline-terminated text by default (CALIB_P:, P:, JOY:, MOVE,x,y ...).
+# After the host sends PROTO:BIN and the device answers ACK:PROTO:BIN, telemetry is sent as
+# fixed-size binary packets instead. Text lines (ACK:, ERR: ...) may still be interleaved, so
+# the decoder below always understands both; 0xA5 never occurs in the ASCII text protocol.
+#
+# Packet layout (little endian, 9 bytes):
+#   sync(0xA5) | type(u8) | pressure(u16) | joy_x(i16) | joy_y(i16) | checksum(u8)
+# The checksum is the XOR of the type..joy_y bytes. For PKT_MOVE the joystick fields carry
+# the relative move, for PKT_EVENT the pressure field carries an EVENT_CODES key.
+#
+# Settings are uploaded as one text command, SETALL:<KEY>=<v>,<KEY>=<v>...*<CS>, where CS is
+# the XOR of the characters between ':' and '*' as two hex digits. The device applies all of
+# them or none and answers ACK:SETALL:<CS> (or ERR:SETALL:CHECKSUM / ERR:SETALL:FORMAT).
+#
+# HASH asks the device what it is running with: it answers ACK:HASH:<hex>, the 32-bit FNV-1a
+# hash of "HST=360,NMIN=460,...,JCB=20" over HASH_KEYS (its settings table, in order). The
+# host compares it with settings_hash() of its own values to skip a redundant upload after
+# a reconnect. Firmware without HASH stays silent (or answers ERR:HASH).
+import struct
+
+SYNC_BYTE = 0xA5
+PACKET_STRUCT = struct.Struct("<BBHhhB")
+PACKET_SIZE = PACKET_STRUCT.size
+_BODY_STRUCT = struct.Struct("<BHhh")
+
+PKT_TELEMETRY = 0x01
+PKT_CALIBRATION = 0x02
+PKT_MOVE = 0x03
+PKT_EVENT = 0x04
+
+EVENT_CODES = {
+    1: "LEFT_CLICK_DOWN", 2: "LEFT_CLICK_UP", 3: "RIGHT_CLICK_DOWN",
+    4: "RIGHT_CLICK_UP", 5: "SCROLL_UP", 6: "SCROLL_DOWN",
+}
+EVENT_NAMES = {name: code for code, name in EVENT_CODES.items()}
+
+PROTOCOL_BINARY_COMMAND = "PROTO:BIN"
+PROTOCOL_TEXT_COMMAND = "PROTO:TXT"
+PROTOCOL_BINARY_ACK = "ACK:PROTO:BIN"
+SETALL_COMMAND = "SETALL"
+SETALL_ACK = "ACK:SETALL:"
+SETALL_ERROR = "ERR:SETALL:"
+HASH_COMMAND = "HASH"
+HASH_ACK = "ACK:HASH:"
+HASH_KEYS = ("HST", "NMIN", "NMAX", "SPT", "HPT", "CSP", "JCB") # V2.ino settings[] order
+MAX_COMMAND_LINE = 120 # V2.ino COMMAND_BUFFER_LENGTH is 128, keep a margin
+
+# Decoded messages are small tuples, the first item is the kind.
+MSG_CALIB = "CALIB_P"   # (MSG_CALIB, pressure)
+MSG_PRESSURE = "P"      # (MSG_PRESSURE, pressure)
+MSG_JOY = "JOY"         # (MSG_JOY, x, y)
+MSG_MOVE = "MOVE"       # (MSG_MOVE, dx, dy)
+MSG_EVENT = "EVENT"     # (MSG_EVENT, name) with name one of EVENT_CODES values
+MSG_STATUS = "STATUS"   # (MSG_STATUS, line) for ACK:/ERR:/CMD_RECV:
+MSG_TEXT = "TEXT"       # (MSG_TEXT, line) for anything else
+
+MAX_TEXT_LINE = 256
+
+
+def packet_checksum(body):
+    checksum = 0
+    for b in body: checksum ^= b
+    return checksum
+
+
+def encode_packet(pkt_type, pressure=0, joy_x=0, joy_y=0):
+    body = _BODY_STRUCT.pack(pkt_type, pressure & 0xFFFF, joy_x, joy_y)
+    return bytes((SYNC_BYTE,)) + body + bytes((packet_checksum(body),))
+
+
+def encode_event(name):
+    return encode_packet(PKT_EVENT, EVENT_NAMES[name])
+
+
+def decode_packet(pkt_type, pressure, joy_x, joy_y, out):
+    if pkt_type == PKT_TELEMETRY:
+        out.append((MSG_PRESSURE, pressure)); out.append((MSG_JOY, joy_x, joy_y))
+    elif pkt_type == PKT_CALIBRATION:
+        out.append((MSG_CALIB, pressure)); out.append((MSG_JOY, joy_x, joy_y))
+    elif pkt_type == PKT_MOVE:
+        out.append((MSG_MOVE, joy_x, joy_y))
+    elif pkt_type == PKT_EVENT:
+        name = EVENT_CODES.get(pressure)
+        if name: out.append((MSG_EVENT, name))
+        else: return False
+    else:
+        return False
+    return True
+
+
+def text_checksum(text):
+    return packet_checksum(text.encode("ascii"))
+
+
+def encode_setall(values):
+    # {"HST": 360, ...} -> ("SETALL:HST=360,...*4F\n", 0x4F); values must already be device ints.
+    payload = ",".join(f"{key}={int(value)}" for key, value in values.items())
+    checksum = text_checksum(payload)
+    return f"{SETALL_COMMAND}:{payload}*{checksum:02X}\n", checksum
+
+
+def settings_hash(values):
+    # None if values lack a HASH_KEYS entry (the device hashes all of them).
+    if any(key not in values for key in HASH_KEYS): return None
+    h = 0x811C9DC5
+    for b in ",".join(f"{key}={int(values[key])}" for key in HASH_KEYS).encode("ascii"):
+        h = ((h ^ b) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def parse_hash_reply(line):
+    try: return int(line[len(HASH_ACK):], 16) if line.startswith(HASH_ACK) else None
+    except ValueError: return None
+
+
+def split_setall(values, max_line=MAX_COMMAND_LINE):
+    # Splits a settings dict into batches whose SETALL lines fit the device command buffer.
+    batches = []; batch = {}
+    for key, value in values.items():
+        batch[key] = value
+        if len(encode_setall(batch)[0]) > max_line and len(batch) > 1:
+            del batch[key]; batches.append(batch); batch = {key: value}
+    if batch: batches.append(batch)
+    return batches
+
+
+def parse_setall(command):
+    # Device side of encode_setall: returns (values, checksum), or (None, error) for SETALL_ERROR.
+    payload, star, cs = command[len(SETALL_COMMAND) + 1:].rpartition("*")
+    if not star or not payload: return None, "FORMAT"
+    try: checksum = int(cs, 16)
+    except ValueError: return None, "FORMAT"
+    if text_checksum(payload) != checksum: return None, "CHECKSUM"
+    values = {}
+    for pair in payload.split(","):
+        key, eq, value = pair.partition("=")
+        try: values[key] = int(value)
+        except ValueError: return None, "FORMAT"
+        if not eq: return None, "FORMAT"
+    return values, checksum
+
+
+def parse_text_line(line):
+    try:
+        if line.startswith("CALIB_P:"): return (MSG_CALIB, int(line[8:]))
+        if line.startswith("P:"): return (MSG_PRESSURE, int(line[2:]))
+        if line.startswith("JOY:"):
+            x, y = line[4:].split(',')
+            return (MSG_JOY, int(x), int(y))
+        if line.startswith("ACK:") or line.startswith("ERR:") or line.startswith("CMD_RECV:"):
+            return (MSG_STATUS, line)
+        if line.startswith("MOVE,"):
+            _, x, y = line.split(',')
+            return (MSG_MOVE, int(x), int(y))
+    except ValueError:
+        return None
+    if line in EVENT_NAMES: return (MSG_EVENT, line)
+    return (MSG_TEXT, line)
+
+
+class StreamDecoder:
+    # Incremental decoder for a mixed text/binary byte stream. feed() takes whatever
+    # ser.read() returned and returns every complete message in it; partial data is kept.
+    def __init__(self, max_line_length=MAX_TEXT_LINE):
+        self.buffer = bytearray()
+        self.max_line_length = max_line_length
+        self.binary_packets = 0; self.text_lines = 0
+        self.bad_checksums = 0; self.dropped_bytes = 0; self.dropped_frames = 0
+
+    def reset(self):
+        self.buffer.clear()
+
+    @property
+    def pending_bytes(self):
+        return len(self.buffer)
+
+    def feed(self, data):
+        out = []
+        buf = self.buffer
+        if data: buf += data
+        n = len(buf); pos = 0
+        while pos < n:
+            byte = buf[pos]
+            if byte == SYNC_BYTE:
+                if n - pos < PACKET_SIZE: break
+                _, pkt_type, pressure, joy_x, joy_y, checksum = PACKET_STRUCT.unpack_from(buf, pos)
+                if packet_checksum(buf[pos + 1:pos + PACKET_SIZE - 1]) == checksum and decode_packet(pkt_type, pressure, joy_x, joy_y, out):
+                    self.binary_packets += 1; pos += PACKET_SIZE
+                else:
+                    self.bad_checksums += 1; self.dropped_frames += 1; self.dropped_bytes += 1; pos += 1
+                continue
+            if byte in (0x0A, 0x0D):
+                pos += 1; continue
+            end = buf.find(b'\n', pos)
+            sync = buf.find(SYNC_BYTE, pos, end if end != -1 else n)
+            if sync != -1:
+                # Text can't contain the sync byte: whatever precedes it is a torn line.
+                self.dropped_frames += 1; self.dropped_bytes += sync - pos; pos = sync; continue
+            if end == -1:
+                if n - pos > self.max_line_length:
+                    self.dropped_frames += 1; self.dropped_bytes += n - pos; pos = n
+                break
+            line = buf[pos:end].decode('utf-8', errors='ignore').strip()
+            pos = end + 1
+            if line:
+                msg = parse_text_line(line)
+                if msg is not None:
+                    self.text_lines += 1; out.append(msg)
+        del buf[:pos]
+        return out
@@ -0,0 +1,118 @@
+# Automatic reconnect after the device drops off USB.
+#
+# USB-serial links on shared hubs drop out and come back, often under another port name
+# (COM5 -> COM7, ttyACM0 -> ttyACM1). ReconnectManager remembers the USB identity (VID, PID,
+# serial number) of the port the engine connected to. When the engine reports a serial
+# error it closes the dead port and polls the port list with exponential backoff for a port
+# with the same identity (or the same name, for ports without one such as a simulator pty),
+# then reconnects with the same options and resumes calibration if it was running. The
+# engine's first upload pass compares the device's settings hash with ours, so a device that
+# kept its settings is usable as soon as the port is open; the time from the device
+# reappearing to settings in sync is recorded here.
+import threading
+import time
+
+from engine import EVENT_CONNECTED, EVENT_SERIAL_ERROR, EVENT_DEVICE_READY
+from injection import LatencyStats
+from recording import REPLAY_PREFIX
+
+
+def port_identity(port):
+    # (vid, pid, serial_number) of a USB serial port, or None.
+    try: from serial.tools import list_ports
+    except ImportError: return None
+    for info in list_ports.comports():
+        if info.device == port and info.vid is not None: return (info.vid, info.pid, info.serial_number)
+    return None
+
+
+def find_port(identity, last_port):
+    # The port currently carrying identity; without one, keep trying the last port name.
+    if identity is None: return last_port
+    try: from serial.tools import list_ports
+    except ImportError: return last_port
+    for info in list_ports.comports():
+        if info.vid is not None and (info.vid, info.pid, info.serial_number) == identity: return info.device
+    return None
+
+
+class ReconnectManager:
+    def __init__(self, engine, backoff_start_s=0.05, backoff_max_s=2.0, give_up_s=None, find=find_port, identify=port_identity):
+        self.engine = engine; self.find = find; self.identify = identify
+        self.backoff_start_s = backoff_start_s; self.backoff_max_s = backoff_max_s; self.give_up_s = give_up_s
+        self.port = None; self.identity = None
+        self.pending = False; self._lock = threading.Lock(); self._cancel = threading.Event(); self._thread = None
+        self._dropped_at = None; self._seen_at = None
+        self.reconnects = 0; self.attempts = 0; self.failed_opens = 0
+        self.ready_after_replug = LatencyStats(window=64) # Device seen again -> settings in sync
+        self.downtime = LatencyStats(window=64)           # Serial error -> settings in sync
+        self._unsubscribe = [engine.subscribe(EVENT_CONNECTED, self._on_connected),
+                             engine.subscribe(EVENT_SERIAL_ERROR, self._on_serial_error),
+                             engine.subscribe(EVENT_DEVICE_READY, self._on_device_ready)]
+
+    def close(self):
+        self.cancel()
+        for unsubscribe in self._unsubscribe: unsubscribe()
+
+    def cancel(self):
+        self._cancel.set(); self.pending = False
+
+    def _on_connected(self, port):
+        self.port = port
+        if self.pending or port.startswith(REPLAY_PREFIX): return
+        self.identity = None
+        # Enumerating ports can take a while on Windows; keep it off the connecting thread.
+        threading.Thread(target=self._remember_identity, args=(port,), name="port-identity", daemon=True).start()
+
+    def _remember_identity(self, port):
+        try: identity = self.identify(port)
+        except Exception: identity = None
+        if self.port == port: self.identity = identity
+
+    def _on_serial_error(self, error):
+        # Read thread, or whichever thread failed a write.
+        engine = self.engine
+        with self._lock:
+            if self.pending or self.port is None or self.port != engine.port or self.port.startswith(REPLAY_PREFIX): return
+            self.pending = True; self._cancel.clear()
+            self._dropped_at = time.perf_counter(); self._seen_at = None
+        options = dict(engine.connect_options or {}, host_pointer=engine.pointer_pipeline is not None)
+        self._thread = threading.Thread(target=self._reconnect, args=(options, engine.calibrating), name="reconnect", daemon=True)
+        self._thread.start()
+
+    def _reconnect(self, options, calibrating):
+        engine = self.engine
+        engine.disconnect(cancel_reconnect=False)
+        engine.status(f"Lost {self.port}; waiting for the device to come back...")
+        delay = self.backoff_start_s
+        while not self._cancel.is_set():
+            port = self.find(self.identity, self.port)
+            if port is not None:
+                if self._seen_at is None: self._seen_at = time.perf_counter()
+                self.attempts += 1
+                try: engine.connect(port, **options)
+                except Exception: self.failed_opens += 1 # Still enumerating, or the old handle is not released yet
+                else: break
+            if self.give_up_s is not None and time.perf_counter() - self._dropped_at > self.give_up_s:
+                engine.status(f"Gave up reconnecting after {self.give_up_s:.0f} s."); self.pending = False; return
+            if self._cancel.wait(delay): return
+            delay = min(delay * 2, self.backoff_max_s)
+        if self._cancel.is_set(): engine.disconnect(cancel_reconnect=False); return # Cancelled while connecting
+        self.reconnects += 1; self.pending = False
+        if calibrating: engine.start_calibration()
+
+    def _on_device_ready(self, how, elapsed):
+        if self._dropped_at is None: return
+        now = time.perf_counter()
+        down = now - self._dropped_at; replug = now - (self._seen_at or self._dropped_at)
+        self._dropped_at = self._seen_at = None
+        self.downtime.record(down); self.ready_after_replug.record(replug)
+        self.engine.status(f"Reconnected to {self.port}: usable {replug * 1000:.0f} ms after it reappeared "
+                           f"(port open {self.engine.port_open_s * 1000:.0f} ms, settings {how}; down {down:.1f} s).")
+
+    def summary(self):
+        if self.pending: return f"reconnect: waiting for {self.port} ({self.attempts} attempts)"
+        if not self.reconnects: return "reconnect: armed"
+        stats = self.ready_after_replug
+        return (f"reconnect: {self.reconnects} reconnects, usable after replug p50 {stats.percentile(50):.0f} ms "
+                f"max {stats.max_ms:.0f} ms, {self.failed_opens} failed opens")
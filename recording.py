@@ -0,0 +1,228 @@
+# Raw serial session recording and replay.
+#
+# File layout (little endian, append-only):
+#   header  FILE_HEADER: magic, version, wall-clock start, monotonic start
+#   chunks  CHUNK_HEADER: tag, compressed size, raw size, record count, first/last timestamp
+#           followed by a zlib stream of records: RECORD_HEADER (t, direction, size) + bytes
+# Timestamps are monotonic seconds since the start of the recording. A chunk is written
+# whole or not at all, so a recording cut short by a crash stays readable up to the last
+# complete chunk. SessionReader mmaps the file and indexes chunk headers without
+# decompressing anything; ReplaySerial stands in for serial.Serial.
+import mmap
+import struct
+import threading
+import time
+import zlib
+
+FILE_MAGIC = b"MOMREC"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<6sHdd")
+CHUNK_TAG = b"CHNK"
+CHUNK_HEADER = struct.Struct("<4sIIIdd")
+RECORD_HEADER = struct.Struct("<dBI")
+DIR_RX = 0 # device -> host
+DIR_TX = 1 # host -> device
+REPLAY_PREFIX = "replay:"
+RECORDING_EXTENSION = ".mrec"
+
+DEFAULT_CHUNK_BYTES = 65536
+DEFAULT_FLUSH_INTERVAL_S = 1.0
+
+
+class SessionRecorder:
+    def __init__(self, path, chunk_bytes=DEFAULT_CHUNK_BYTES, flush_interval_s=DEFAULT_FLUSH_INTERVAL_S, level=6):
+        self.path = path; self.chunk_bytes = chunk_bytes; self.flush_interval_s = flush_interval_s; self.level = level
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._t0 = time.monotonic()
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, time.time(), self._t0)); self._file.flush()
+        self._pending = bytearray(); self._count = 0; self._t_first = 0.0; self._t_last = 0.0
+        self._last_flush = self._t0
+        self.records = 0; self.raw_bytes = 0; self.file_bytes = FILE_HEADER.size; self.chunks = 0
+
+    def record(self, direction, data, t=None):
+        if not data: return
+        now = time.monotonic() if t is None else t
+        ts = now - self._t0
+        with self._lock:
+            if self._file is None: return
+            if not self._count: self._t_first = ts
+            self._pending += RECORD_HEADER.pack(ts, direction, len(data)); self._pending += data
+            self._count += 1; self._t_last = ts
+            self.records += 1; self.raw_bytes += len(data)
+            if len(self._pending) >= self.chunk_bytes or now - self._last_flush >= self.flush_interval_s: self._flush_locked(now)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None: self._flush_locked(time.monotonic())
+
+    def _flush_locked(self, now):
+        self._last_flush = now
+        if not self._count: return
+        payload = zlib.compress(bytes(self._pending), self.level)
+        self._file.write(CHUNK_HEADER.pack(CHUNK_TAG, len(payload), len(self._pending), self._count, self._t_first, self._t_last) + payload)
+        self._file.flush()
+        self.file_bytes += CHUNK_HEADER.size + len(payload); self.chunks += 1
+        self._pending = bytearray(); self._count = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is None: return
+            self._flush_locked(time.monotonic())
+            self._file.close(); self._file = None
+
+    def summary(self):
+        ratio = self.raw_bytes / max(1, self.file_bytes)
+        return f"recording: {self.records} records, {self.raw_bytes / 1024:.1f} KB raw, {self.file_bytes / 1024:.1f} KB on disk ({ratio:.1f}x)"
+
+
+class RecordingSerial:
+    # Wraps an open port and records everything read from or written to it.
+    def __init__(self, ser, recorder):
+        self._ser = ser; self.recorder = recorder
+
+    def read(self, size=1):
+        data = self._ser.read(size)
+        if data: self.recorder.record(DIR_RX, data)
+        return data
+
+    def readline(self, *args, **kwargs):
+        data = self._ser.readline(*args, **kwargs)
+        if data: self.recorder.record(DIR_RX, data)
+        return data
+
+    def write(self, data):
+        self.recorder.record(DIR_TX, bytes(data))
+        return self._ser.write(data)
+
+    def close(self):
+        try: self._ser.close()
+        finally: self.recorder.close()
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+
+class SessionReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < FILE_HEADER.size: raise ValueError(f"{path}: not a session recording")
+        magic, version, self.start_wall_time, _ = FILE_HEADER.unpack_from(self._mm, 0)
+        if magic != FILE_MAGIC: raise ValueError(f"{path}: not a session recording")
+        if version > FILE_VERSION: raise ValueError(f"{path}: recording version {version} is newer than this reader")
+        self.version = version
+        self.chunks = self._index()
+
+    def _index(self):
+        chunks = []; mm = self._mm; offset = FILE_HEADER.size; end = len(mm)
+        while offset + CHUNK_HEADER.size <= end:
+            tag, comp, raw, count, t_first, t_last = CHUNK_HEADER.unpack_from(mm, offset)
+            if tag != CHUNK_TAG or offset + CHUNK_HEADER.size + comp > end: break # Torn tail
+            chunks.append((offset + CHUNK_HEADER.size, comp, raw, count, t_first, t_last))
+            offset += CHUNK_HEADER.size + comp
+        return chunks
+
+    @property
+    def duration(self):
+        return self.chunks[-1][5] if self.chunks else 0.0
+
+    @property
+    def record_count(self):
+        return sum(chunk[3] for chunk in self.chunks)
+
+    def records(self, direction=None, start_time=0.0):
+        # Yields (t, direction, data), decompressing one chunk at a time.
+        for offset, comp, raw, count, t_first, t_last in self.chunks:
+            if t_last < start_time: continue
+            payload = zlib.decompress(self._mm[offset:offset + comp])
+            pos = 0; header = RECORD_HEADER
+            for _ in range(count):
+                t, d, size = header.unpack_from(payload, pos); pos += header.size
+                data = payload[pos:pos + size]; pos += size
+                if t >= start_time and (direction is None or d == direction): yield t, d, data
+
+    def close(self):
+        self._mm.close()
+
+
+class ReplaySerial:
+    # Plays the device->host side of a recording through the pyserial calls the app uses.
+    # speed=1.0 is real time, 4.0 is four times faster, 0 (or None) is as fast as possible.
+    def __init__(self, path, speed=1.0, timeout=0.1, loop=False):
+        self.port = f"{REPLAY_PREFIX}{path}"; self.timeout = timeout
+        self.speed = speed or 0; self.loop = loop
+        self._reader = SessionReader(path)
+        self._records = self._reader.records(DIR_RX)
+        self._buffer = bytearray(); self._next = None; self._exhausted = False
+        self._t0 = time.monotonic()
+        self.is_open = True; self.bytes_written = 0; self.bytes_replayed = 0
+
+    @property
+    def finished(self):
+        return self._exhausted and not self._buffer
+
+    def _due(self):
+        return (time.monotonic() - self._t0) * self.speed if self.speed else float("inf")
+
+    def _pump(self, want):
+        due = self._due()
+        while len(self._buffer) < want:
+            if self._next is None:
+                try: self._next = next(self._records)
+                except StopIteration:
+                    if not self.loop or not self._reader.chunks: self._exhausted = True; return
+                    self._records = self._reader.records(DIR_RX); self._t0 = time.monotonic(); due = 0.0
+                    continue
+            if self._next[0] > due: return
+            self._buffer += self._next[2]; self.bytes_replayed += len(self._next[2]); self._next = None
+
+    def _time_until_next(self):
+        if self._next is None or not self.speed: return 0.0
+        return max(0.0, self._next[0] / self.speed - (time.monotonic() - self._t0))
+
+    @property
+    def in_waiting(self):
+        self._pump(DEFAULT_CHUNK_BYTES)
+        return len(self._buffer)
+
+    def read(self, size=1):
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            self._pump(size)
+            if len(self._buffer) >= size or (self._exhausted and self._next is None): break
+            wait = self._time_until_next()
+            if deadline is not None: wait = min(wait, deadline - time.monotonic())
+            if wait <= 0 and deadline is not None and time.monotonic() >= deadline: break
+            time.sleep(max(0.0, wait))
+        data = bytes(self._buffer[:size]); del self._buffer[:size]
+        if not data and self.finished and self.timeout: time.sleep(self.timeout) # Behave like an idle port
+        return data
+
+    def readline(self):
+        line = bytearray()
+        while not line.endswith(b"\n"):
+            chunk = self.read(1)
+            if not chunk: break
+            line += chunk
+        return bytes(line)
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return len(data)
+
+    def reset_input_buffer(self):
+        self._buffer.clear()
+
+    def close(self):
+        if self.is_open: self._reader.close(); self.is_open = False
+
+
+def open_serial(port, baudrate=115200, timeout=0.1):
+    # "replay:<file>[@<speed>]" opens a recording instead of a device.
+    if port.startswith(REPLAY_PREFIX):
+        path, _, speed = port[len(REPLAY_PREFIX):].rpartition("@") if "@" in port else (port[len(REPLAY_PREFIX):], "", "1")
+        return ReplaySerial(path, float(speed), timeout)
+    import serial
+    return serial.Serial(port, baudrate, timeout=timeout)
@@ -0,0 +1,123 @@
+# Fixed-capacity sample ring buffer (int16 by default).
+#
+# Every sample is written twice, at i and i + capacity, so the newest n samples are always
+# one contiguous slice of the backing store. last(n) therefore returns a view without
+# copying: a NumPy view when NumPy is installed, a memoryview over array('h') otherwise.
+# Views are live; take copy() if the data must survive later pushes. Integer stores clamp
+# values to their range (a corrupted "P:40000" line must not raise in the UI pump). The store
+# is allocated on first use, so creating buffers at startup doesn't import NumPy.
+from array import array
+
+np = None # Imported when the first buffer is allocated, not at startup (it takes ~130 ms)
+_numpy_missing = False
+
+_NUMPY_DTYPES = {'h': 'int16', 'i': 'int32', 'f': 'float32', 'd': 'float64'}
+_INT_RANGES = {'h': (-32768, 32767), 'i': (-2147483648, 2147483647)}
+
+
+def _load_numpy():
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try: import numpy as np
+        except ImportError: _numpy_missing = True
+    return np
+
+
+class RingBuffer:
+    def __init__(self, capacity, typecode='h', use_numpy=True):
+        self.typecode = typecode
+        self._lo, self._hi = _INT_RANGES.get(typecode, (None, None))
+        self.use_numpy = use_numpy
+        self.capacity = max(1, int(capacity)); self._buf = None
+        self._write = 0; self._count = 0
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.use_numpy = self.use_numpy and _load_numpy() is not None
+        if self.use_numpy: self._buf = np.zeros(2 * capacity, dtype=_NUMPY_DTYPES[self.typecode])
+        else: self._buf = array(self.typecode, bytes(2 * capacity * array(self.typecode).itemsize))
+        self._write = 0; self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def clear(self):
+        self._write = 0; self._count = 0
+
+    def append(self, value):
+        if self._buf is None: self._allocate(self.capacity)
+        w = self._write; cap = self.capacity
+        if self._hi is not None: value = self._lo if value < self._lo else self._hi if value > self._hi else value
+        self._buf[w] = value; self._buf[w + cap] = value
+        w += 1
+        self._write = 0 if w == cap else w
+        if self._count < cap: self._count += 1
+
+    def extend(self, values):
+        cap = self.capacity
+        if len(values) > cap: values = values[-cap:]
+        k = len(values)
+        if not k: return
+        if self._buf is None: self._allocate(self.capacity)
+        if self.use_numpy:
+            if self._hi is not None and not (isinstance(values, np.ndarray) and values.dtype == self._buf.dtype):
+                values = np.clip(np.asarray(values, dtype=np.int64), self._lo, self._hi)
+            values = np.asarray(values, dtype=self._buf.dtype)
+        elif not isinstance(values, array) or values.typecode != self.typecode:
+            lo, hi = self._lo, self._hi
+            values = array(self.typecode, values if hi is None else [lo if v < lo else hi if v > hi else v for v in values])
+        buf = self._buf; w = self._write
+        first = min(k, cap - w)
+        buf[w:w + first] = values[:first]; buf[w + cap:w + cap + first] = values[:first]
+        rest = k - first
+        if rest: buf[0:rest] = values[first:]; buf[cap:cap + rest] = values[first:]
+        self._write = (w + k) % cap
+        self._count = min(cap, self._count + k)
+
+    def last(self, n=None):
+        if self._buf is None: self._allocate(self.capacity)
+        n = self._count if n is None else max(0, min(int(n), self._count))
+        end = self._write + self.capacity
+        if self.use_numpy: return self._buf[end - n:end]
+        return memoryview(self._buf)[end - n:end]
+
+    def __getitem__(self, index):
+        # Only the "newest n" slices the plot code uses: buf[-n:] and buf[:].
+        if isinstance(index, slice):
+            if index.step not in (None, 1) or index.stop is not None:
+                raise IndexError("RingBuffer only supports [-n:] and [:] slices")
+            start = index.start or 0
+            return self.last(-start if start < 0 else self._count - start)
+        if index < 0: index += self._count
+        if not 0 <= index < self._count: raise IndexError("RingBuffer index out of range")
+        return self._buf[self._write + self.capacity - self._count + index]
+
+    def __iter__(self):
+        return iter(self.last())
+
+    def copy(self):
+        view = self.last()
+        return view.copy() if self.use_numpy else array(self.typecode, view)
+
+    def tolist(self):
+        return self.last().tolist()
+
+    def resize(self, capacity):
+        capacity = max(1, int(capacity))
+        if capacity == self.capacity: return
+        if self._buf is None: self.capacity = capacity; return
+        keep = self.copy()[-capacity:] if self._count else []
+        self._allocate(capacity)
+        self.extend(keep)
+
+    def to_canvas_y(self, height, y_padding, value_max, n=None):
+        # Maps the newest n samples to canvas y coordinates, top = value_max.
+        view = self.last(n)
+        graph_height = max(1, height - 2 * y_padding)
+        base = height - y_padding; scale = graph_height / float(value_max)
+        if self.use_numpy:
+            return (base - np.clip(view, 0, value_max) * scale).tolist()
+        return [base - (0 if p < 0 else value_max if p > value_max else p) * scale for p in view]
@@ -0,0 +1,69 @@
+# Bulk serial reader: one blocking read for the first byte, one read for everything
+# else that is already queued, then the whole chunk goes through the StreamDecoder.
+# Nothing polls or sleeps, so a message is handed on as soon as the OS delivers it.
+import time
+
+from protocol import StreamDecoder
+
+READ_CHUNK_LIMIT = 65536
+STATS_MIN_INTERVAL_S = 0.25
+
+
+class ReaderStats:
+    def __init__(self):
+        self.bytes_total = 0; self.messages_total = 0; self.reads = 0
+        self.backlog_bytes = 0; self.max_backlog_bytes = 0; self.max_batch = 0
+        self.bytes_per_s = 0.0; self.messages_per_s = 0.0
+        self._last_time = time.monotonic(); self._last_bytes = 0; self._last_messages = 0
+
+    def record(self, nbytes, nmessages, backlog):
+        self.reads += 1
+        self.bytes_total += nbytes; self.messages_total += nmessages
+        self.backlog_bytes = backlog
+        if backlog > self.max_backlog_bytes: self.max_backlog_bytes = backlog
+        if nmessages > self.max_batch: self.max_batch = nmessages
+
+    def update_rates(self, now=None):
+        now = time.monotonic() if now is None else now
+        dt = now - self._last_time
+        if dt < STATS_MIN_INTERVAL_S: return
+        self.bytes_per_s = (self.bytes_total - self._last_bytes) / dt
+        self.messages_per_s = (self.messages_total - self._last_messages) / dt
+        self._last_time = now; self._last_bytes = self.bytes_total; self._last_messages = self.messages_total
+
+
+class SerialReader:
+    def __init__(self, ser, decoder=None):
+        self.ser = ser
+        self.decoder = decoder if decoder is not None else StreamDecoder()
+        self.stats = ReaderStats()
+        self.last_read_time = 0.0 # perf_counter() when the latest batch arrived
+
+    def read_batch(self):
+        # Blocks for at most the port timeout when the line is idle.
+        ser = self.ser
+        waiting = ser.in_waiting
+        data = ser.read(min(waiting, READ_CHUNK_LIMIT) if waiting else 1)
+        if not data: return []
+        if not waiting:
+            waiting = ser.in_waiting
+            if waiting: data += ser.read(min(waiting, READ_CHUNK_LIMIT))
+        self.last_read_time = time.perf_counter()
+        messages = self.decoder.feed(data)
+        self.stats.record(len(data), len(messages), ser.in_waiting + self.decoder.pending_bytes)
+        return messages
+
+    def iter_batches(self, stop_event):
+        while not stop_event.is_set():
+            batch = self.read_batch()
+            if batch: yield batch
+
+    @property
+    def dropped_frames(self):
+        return self.decoder.dropped_frames
+
+    def summary(self):
+        stats = self.stats
+        stats.update_rates()
+        return (f"{stats.bytes_per_s / 1024:.1f} KB/s | {stats.messages_per_s:.0f} msg/s | "
+                f"backlog {stats.backlog_bytes} B (max {stats.max_backlog_bytes}) | dropped {self.decoder.dropped_frames}")
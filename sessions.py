@@ -0,0 +1,219 @@
+# Several devices on one host.
+#
+# SessionManager holds one MouthMouseEngine per device (its own port, decoder, reader
+# stats, settings, bound profile, reconnect and drift state) around a shared profile store.
+# Instead of a read thread per port, a SerialMultiplexer thread waits on every open port at
+# once with selectors and runs MouthMouseEngine.service_serial() for the ones that are ready,
+# so N devices cost one thread. Ports without a file descriptor to select on (replays,
+# Windows COM ports) fall back to the engine's own read thread.
+#
+#   python sessions.py --device alice=/dev/ttyACM0:alice --device bob=/dev/ttyACM1 --stats 5
+import argparse
+import os
+import selectors
+import signal
+import threading
+from collections import OrderedDict
+
+from engine import (MouthMouseEngine, Observable, PROFILES_DIR, EVENT_STATUS, EVENT_SERIAL_ERROR, EVENT_CONNECTED,
+                    EVENT_DISCONNECTED)
+from profiles import open_profile_store
+from recording import REPLAY_PREFIX
+
+EVENT_SESSION_ADDED = "session_added"       # (name, engine)
+EVENT_SESSION_REMOVED = "session_removed"   # (name,)
+EVENT_SESSION_STATE = "session_state"       # (name, connected)
+
+
+class SerialMultiplexer:
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False); os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._lock = threading.Lock(); self._changes = [] # (engine, fd or None to remove, done Event)
+        self._engines = {} # engine -> fd
+        self._thread = None; self._running = False
+        self.passes = 0; self.wakeups = 0
+
+    def register(self, engine):
+        # True if engine.ser can be selected on; it is serviced from the next loop pass.
+        try: fd = engine.ser.fileno()
+        except (AttributeError, OSError, ValueError): return False # io.UnsupportedOperation is both
+        if not isinstance(fd, int) or fd < 0: return False
+        self._change(engine, fd)
+        return True
+
+    def unregister(self, engine):
+        # Returns once the loop no longer touches engine (like joining its read thread).
+        if threading.current_thread() is self._thread: self._remove(engine); return
+        done = self._change(engine, None)
+        if done is not None: done.wait(timeout=0.5)
+
+    def _change(self, engine, fd):
+        if fd is None and engine not in self._engines and not self._changes: return None
+        done = threading.Event()
+        with self._lock:
+            self._changes.append((engine, fd, done))
+            if self._thread is None:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, name="serial-mux", daemon=True)
+                self._thread.start()
+        try: os.write(self._wake_w, b"\0")
+        except BlockingIOError: pass # A wakeup is already pending
+        return done
+
+    def _apply_changes(self):
+        with self._lock: changes, self._changes = self._changes, []
+        for engine, fd, done in changes:
+            self._remove(engine)
+            if fd is not None:
+                try: self._selector.register(fd, selectors.EVENT_READ, engine); self._engines[engine] = fd
+                except (ValueError, OSError, KeyError) as e: engine.emit(EVENT_SERIAL_ERROR, e)
+            done.set()
+
+    def _remove(self, engine):
+        fd = self._engines.pop(engine, None)
+        if fd is None: return
+        try: self._selector.unregister(fd)
+        except (KeyError, ValueError, OSError): pass # Already closed
+
+    def _run(self):
+        while self._running:
+            for key, _ in self._selector.select(timeout=1.0):
+                engine = key.data
+                if engine is None:
+                    self.wakeups += 1
+                    try:
+                        while os.read(self._wake_r, 512): pass
+                    except BlockingIOError: pass
+                    continue
+                if engine not in self._engines: continue # Removed earlier in this pass
+                self.passes += 1
+                if not engine.service_serial(): self._remove(engine)
+            self._apply_changes()
+
+    def close(self):
+        self._running = False
+        try: os.write(self._wake_w, b"\0")
+        except OSError: pass
+        if self._thread is not None and self._thread is not threading.current_thread(): self._thread.join(timeout=1.0)
+        self._thread = None
+        self._selector.close()
+        for fd in (self._wake_r, self._wake_w): os.close(fd)
+
+    def summary(self):
+        return f"serial mux: {len(self._engines)} ports on one thread, {self.passes} reads, {self.wakeups} wakeups"
+
+
+class SessionManager(Observable):
+    def __init__(self, profiles_location=PROFILES_DIR, multiplex=True):
+        super().__init__()
+        self.profiles = open_profile_store(profiles_location)
+        self.multiplexer = SerialMultiplexer() if multiplex and os.name != "nt" else None # select() on Windows is sockets only
+        self.sessions = OrderedDict() # name -> MouthMouseEngine
+        self._unsubscribe = {}
+
+    def add(self, name, profile=None):
+        if name in self.sessions: raise ValueError(f"device '{name}' already exists")
+        engine = MouthMouseEngine(profiles=self.profiles)
+        engine.multiplexer = self.multiplexer
+        self._unsubscribe[name] = [
+            engine.subscribe(EVENT_CONNECTED, lambda port, name=name: self.emit(EVENT_SESSION_STATE, name, True)),
+            engine.subscribe(EVENT_DISCONNECTED, lambda name=name: self.emit(EVENT_SESSION_STATE, name, False)),
+            engine.subscribe(EVENT_SERIAL_ERROR, lambda e, engine=engine: self._on_serial_error(engine)),
+        ]
+        self.sessions[name] = engine
+        if profile: engine.load_profile(profile)
+        self.emit(EVENT_SESSION_ADDED, name, engine)
+        return engine
+
+    def remove(self, name):
+        engine = self.sessions.pop(name)
+        engine.disable_auto_reconnect(); engine.disable_drift_tracking(); engine.disconnect()
+        for unsubscribe in self._unsubscribe.pop(name): unsubscribe()
+        self.emit(EVENT_SESSION_REMOVED, name)
+
+    def get(self, name):
+        return self.sessions[name]
+
+    def names(self):
+        return list(self.sessions)
+
+    def name_of(self, engine):
+        for name, candidate in self.sessions.items():
+            if candidate is engine: return name
+        return None
+
+    def port_in_use(self, port, exclude=None):
+        # Name of another session connected to port, or None.
+        for name, engine in self.sessions.items():
+            if engine is not exclude and engine.is_connected and engine.port == port: return name
+        return None
+
+    def _on_serial_error(self, engine):
+        # A device nobody will reopen is disconnected here, whether or not the GUI shows it.
+        if engine.reconnector is not None and not (engine.port or "").startswith(REPLAY_PREFIX): return
+        engine.disconnect()
+
+    def close(self):
+        for name in list(self.sessions): self.remove(name)
+        if self.multiplexer is not None: self.multiplexer.close()
+        self.profiles.stop_watching()
+
+    def overview(self, exclude=None):
+        # One line of every other device's state, for the GUI.
+        parts = []
+        for name, engine in self.sessions.items():
+            if engine is exclude: continue
+            parts.append(f"{name}: {engine.port if engine.is_connected else 'reconnecting' if engine.reconnect_pending else 'off'}")
+        return "Other devices: " + ", ".join(parts)
+
+    def summary(self):
+        lines = []
+        for name, engine in self.sessions.items():
+            state = f"{engine.port}" if engine.is_connected else "reconnecting" if engine.reconnect_pending else "disconnected"
+            profile = f", profile {engine.profile_name}" if engine.profile_name else ""
+            lines.append(f"[{name}] {state}{profile}" + (f": {engine.summary()}" if engine.is_connected else ""))
+        if self.multiplexer is not None: lines.append(self.multiplexer.summary())
+        return "\n".join(lines)
+
+
+def parse_device(spec):
+    # "NAME=PORT[:PROFILE]"; a Windows "COM3" has no ':' of its own, a replay path may.
+    name, eq, rest = spec.partition("=")
+    if not eq or not name or not rest: raise argparse.ArgumentTypeError(f"expected NAME=PORT[:PROFILE], got '{spec}'")
+    port, profile = rest, None
+    if not rest.startswith(REPLAY_PREFIX) and ":" in rest[2:]: port, _, profile = rest.rpartition(":")
+    return name, port, profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relay several mouth mouse devices from one process")
+    parser.add_argument("--device", action="append", type=parse_device, required=True, metavar="NAME=PORT[:PROFILE]")
+    parser.add_argument("--profiles-dir", default=PROFILES_DIR)
+    parser.add_argument("--reconnect", action="store_true", help="reopen devices that drop off USB")
+    parser.add_argument("--threads", action="store_true", help="one read thread per port instead of the multiplexer")
+    parser.add_argument("--stats", type=float, default=0, help="print stats every N seconds (0 = off)")
+    args = parser.parse_args(argv)
+
+    manager = SessionManager(args.profiles_dir, multiplex=not args.threads)
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try: signal.signal(sig, lambda *_: stop.set())
+        except (ValueError, OSError): pass
+    try:
+        for name, port, profile in args.device:
+            engine = manager.add(name, profile)
+            engine.subscribe(EVENT_STATUS, lambda m, name=name: print(f"[{name}] {m}"))
+            if args.reconnect: engine.enable_auto_reconnect()
+            engine.connect(port)
+        print(f"Relaying {len(args.device)} devices; Ctrl+C to stop.")
+        while not stop.wait(args.stats or 1.0):
+            if args.stats: print(manager.summary())
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
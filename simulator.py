@@ -0,0 +1,226 @@
+# Host-side stand-in for a Leonardo running V2.ino, served over a pseudo-terminal.
+#
+#   python simulator.py [--rate 100] [--joy-rate 50] [--noise 4] [--binary] [--duration 0]
+#
+# Prints the pty path to connect to (App.py or anything else that opens a serial port).
+# Understands H, SET_XXX:v, SETALL, HASH, START_CALIBRATION, STOP_CALIBRATION, PROTO:BIN/TXT and
+# HOSTPTR:1/0, and streams P:/CALIB_P: and JOY: lines (or binary telemetry packets) from
+# synthetic waveforms. Samples are generated in batches per write, so rates of several kHz
+# cost one os.write() per batch rather than one per line. POSIX only (os.openpty).
+import argparse
+import math
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from protocol import (encode_packet, parse_setall, settings_hash, PKT_TELEMETRY, PKT_CALIBRATION, PROTOCOL_BINARY_COMMAND,
+                      PROTOCOL_TEXT_COMMAND, PROTOCOL_BINARY_ACK, SETALL_COMMAND, SETALL_ACK, SETALL_ERROR, HASH_COMMAND, HASH_ACK)
+
+NEUTRAL_PRESSURE = 505
+JOY_MAX = 512
+BATCH_INTERVAL_S = 0.005
+MAX_OUTPUT_BACKLOG = 65536
+FIRMWARE_SETTINGS = {"HST": 360, "NMIN": 460, "NMAX": 550, "SPT": 600, "HPT": 700, "CSP": 10, "JCB": 20} # V2.ino power-on values
+
+# (name, target pressure, seconds); levels sit inside the DEFAULT_SETTINGS bands of App.py
+DEFAULT_GESTURES = (
+    ("neutral", NEUTRAL_PRESSURE, 1.0), ("soft_puff", 640, 0.6), ("neutral", NEUTRAL_PRESSURE, 0.8),
+    ("hard_puff", 780, 0.4), ("neutral", NEUTRAL_PRESSURE, 0.8), ("soft_sip", 410, 0.6),
+    ("neutral", NEUTRAL_PRESSURE, 0.8), ("hard_sip", 300, 0.4),
+)
+
+
+class PressureWaveform:
+    # Cycles through a gesture schedule with first-order onsets (time constant rise_s),
+    # plus gaussian noise and slow baseline drift.
+    def __init__(self, gestures=DEFAULT_GESTURES, noise=4.0, rise_s=0.05, drift=0.0, seed=None):
+        self.gestures = list(gestures); self.noise = noise; self.rise_s = rise_s; self.drift = drift
+        self._rnd = random.Random(seed)
+        self.period = sum(g[2] for g in self.gestures)
+        self._value = float(self.gestures[0][1]) if self.gestures else float(NEUTRAL_PRESSURE)
+
+    def gesture_at(self, t):
+        t %= self.period
+        for gesture in self.gestures:
+            if t < gesture[2]: return gesture
+            t -= gesture[2]
+        return self.gestures[-1]
+
+    def sample(self, t, dt):
+        target = self.gesture_at(t)[1] + self.drift * math.sin(2 * math.pi * t / 60.0)
+        k = 1.0 if self.rise_s <= 0 else min(1.0, dt / self.rise_s)
+        self._value += (target - self._value) * k
+        value = self._value + (self._rnd.gauss(0, self.noise) if self.noise else 0.0)
+        return max(0, min(1023, int(round(value))))
+
+
+class JoystickWaveform:
+    # Slow circle of the given amplitude (fraction of full deflection) with noise.
+    def __init__(self, amplitude=0.5, period_s=4.0, noise=3.0, seed=None):
+        self.amplitude = amplitude; self.period_s = period_s; self.noise = noise
+        self._rnd = random.Random(seed)
+
+    def sample(self, t):
+        a = 2 * math.pi * t / self.period_s if self.period_s > 0 else 0.0
+        r = self.amplitude * JOY_MAX
+        x = r * math.cos(a) + (self._rnd.gauss(0, self.noise) if self.noise else 0.0)
+        y = r * math.sin(a) + (self._rnd.gauss(0, self.noise) if self.noise else 0.0)
+        return (max(-JOY_MAX, min(JOY_MAX, int(x))), max(-JOY_MAX, min(JOY_MAX, int(y))))
+
+
+class DeviceSimulator:
+    def __init__(self, rate_hz=100, joy_rate_hz=50, pressure=None, joystick=None, binary=False):
+        self.rate_hz = rate_hz; self.joy_rate_hz = joy_rate_hz
+        self.pressure = pressure if pressure is not None else PressureWaveform()
+        self.joystick = joystick if joystick is not None else JoystickWaveform()
+        self.binary = binary; self.host_pointer = False; self.calibrating = False
+        self.settings = dict(FIRMWARE_SETTINGS); self._joy = (0, 0)
+        self._master = None; self._slave = None; self.port = None
+        self._thread = None; self._running = False
+        self._rx = bytearray(); self._tx = bytearray()
+        self.commands = 0; self.samples_sent = 0; self.bytes_sent = 0; self.dropped_bytes = 0
+        self._started_at = 0.0
+
+    def open(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave) # No echo or line editing: the host sees exactly what we write
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        return self.port
+
+    def close(self):
+        self.stop()
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try: os.close(fd)
+                except OSError: pass
+        self._master = self._slave = None
+
+    def start(self):
+        if self._master is None: self.open()
+        if self._thread is not None: return self.port
+        self._running = True
+        self._thread = threading.Thread(target=self.run, name="device-simulator", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread is not None: self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _reply(self, line):
+        self._tx += line.encode() + b"\n"
+
+    def handle_command(self, command):
+        self.commands += 1
+        if command == "H":
+            self._reply("Pro Micro Mouth-Operated Mouse")
+        elif command.startswith("SET_") and ":" in command:
+            key, _, value = command[4:].partition(":")
+            try: self.settings[key] = int(value)
+            except ValueError: self._reply(f"ERR:{command}"); return
+            self._reply(f"ACK:{command}")
+        elif command.startswith(SETALL_COMMAND + ":"):
+            values, checksum = parse_setall(command)
+            if values is None: self._reply(f"{SETALL_ERROR}{checksum}"); return
+            self.settings.update(values); self._reply(f"{SETALL_ACK}{checksum:02X}")
+        elif command == HASH_COMMAND:
+            self._reply(f"{HASH_ACK}{settings_hash(self.settings):X}")
+        elif command == "START_CALIBRATION":
+            self.calibrating = True; self._reply("ACK:START_CALIBRATION")
+        elif command == "STOP_CALIBRATION":
+            self.calibrating = False; self._reply("ACK:STOP_CALIBRATION")
+        elif command == PROTOCOL_BINARY_COMMAND:
+            self._reply(PROTOCOL_BINARY_ACK); self.binary = True
+        elif command == PROTOCOL_TEXT_COMMAND:
+            self.binary = False; self._reply("ACK:PROTO:TXT")
+        elif command in ("HOSTPTR:1", "HOSTPTR:0"):
+            self.host_pointer = command.endswith("1"); self._reply(f"ACK:{command}")
+        elif command:
+            self._reply(f"ERR:{command}")
+
+    def _read_commands(self):
+        try: data = os.read(self._master, 4096)
+        except (BlockingIOError, OSError): return
+        self._rx += data
+        while b"\n" in self._rx:
+            line, _, rest = self._rx.partition(b"\n"); self._rx = bytearray(rest)
+            self.handle_command(line.decode("utf-8", "replace").strip())
+
+    def generate(self, t0, t1):
+        # Appends every pressure and joystick sample due in [t0, t1) to the output buffer.
+        out = self._tx; dt = 1.0 / self.rate_hz
+        i0 = int(math.ceil(t0 * self.rate_hz)); i1 = int(math.ceil(t1 * self.rate_hz))
+        joy_every = max(1, int(round(self.rate_hz / self.joy_rate_hz))) if self.joy_rate_hz else 0
+        for i in range(i0, i1):
+            t = i * dt
+            p = self.pressure.sample(t, dt)
+            new_joy = joy_every and i % joy_every == 0
+            if new_joy: self._joy = self.joystick.sample(t)
+            if self.binary:
+                out += encode_packet(PKT_CALIBRATION if self.calibrating else PKT_TELEMETRY, p, self._joy[0], self._joy[1])
+            else:
+                out += f"CALIB_P:{p}\n".encode() if self.calibrating else f"P:{p}\n".encode()
+                if new_joy: out += f"JOY:{self._joy[0]},{self._joy[1]}\n".encode()
+        self.samples_sent += max(0, i1 - i0)
+
+    def _flush(self):
+        if not self._tx: return
+        try: n = os.write(self._master, self._tx)
+        except BlockingIOError: n = 0
+        except OSError: self._running = False; return
+        self.bytes_sent += n; del self._tx[:n]
+        if len(self._tx) > MAX_OUTPUT_BACKLOG: # Nobody is reading; behave like a full USB buffer
+            self.dropped_bytes += len(self._tx); self._tx.clear()
+
+    def run(self, duration=0):
+        clock = time.monotonic
+        self._started_at = start = clock(); last = 0.0
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], BATCH_INTERVAL_S)
+            if ready: self._read_commands()
+            now = clock() - start
+            if now > last: self.generate(last, now); last = now
+            self._flush()
+            if duration and now >= duration: break
+
+    def summary(self):
+        elapsed = max(1e-6, time.monotonic() - self._started_at)
+        return (f"simulator {self.port}: {self.samples_sent / elapsed:.0f} samples/s, {self.bytes_sent / elapsed / 1024:.1f} KB/s, "
+                f"{self.commands} commands, dropped {self.dropped_bytes} B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated mouth mouse on a pseudo-terminal")
+    parser.add_argument("--rate", type=float, default=100, help="pressure samples per second")
+    parser.add_argument("--joy-rate", type=float, default=50, help="joystick samples per second (0 = off)")
+    parser.add_argument("--noise", type=float, default=4.0, help="pressure noise, standard deviation in ADC counts")
+    parser.add_argument("--joy-amplitude", type=float, default=0.5, help="joystick circle radius, fraction of full deflection")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--binary", action="store_true", help="start in binary telemetry mode")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run (0 = until interrupted)")
+    args = parser.parse_args()
+    sim = DeviceSimulator(args.rate, args.joy_rate, PressureWaveform(noise=args.noise, seed=args.seed),
+                          JoystickWaveform(args.joy_amplitude, seed=args.seed), args.binary)
+    print(f"Simulated device on {sim.open()}", flush=True)
+    sim._running = True
+    try: sim.run(args.duration)
+    except KeyboardInterrupt: pass
+    finally:
+        print(sim.summary())
+        sim.close()
+
+
+if __name__ == "__main__":
+    main()
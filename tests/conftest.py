@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def simulator():
+    # A running DeviceSimulator; connect to simulator.port like a real device.
+    if not hasattr(os, "openpty"): pytest.skip("the device simulator needs a pty")
+    from simulator import DeviceSimulator, PressureWaveform, JoystickWaveform
+    with DeviceSimulator(rate_hz=200, pressure=PressureWaveform(seed=1), joystick=JoystickWaveform(seed=1)) as sim:
+        yield sim
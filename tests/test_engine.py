@@ -0,0 +1,46 @@
+import queue
+import time
+
+import pytest
+
+pytest.importorskip("serial")
+
+from engine import MouthMouseEngine, EVENT_CALIB
+from protocol import settings_hash
+
+
+def test_upload_then_calibration_stream(simulator, tmp_path):
+    engine = MouthMouseEngine(profiles_dir=str(tmp_path / "profiles"))
+    engine.INJECTION_BACKEND = "fake" # Nothing reaches the real pointer
+    samples = queue.Queue(); engine.subscribe(EVENT_CALIB, samples.put)
+    engine.connect(simulator.port, apply_settings=False)
+    try:
+        assert engine.mouse_injector.backend.name == "fake"
+        engine.settings.update({"HST": 340, "SPT": 620})
+        assert engine.apply_all_settings(wait=True)
+        assert simulator.settings["HST"] == 340 and simulator.settings["SPT"] == 620
+        assert settings_hash(simulator.settings) == settings_hash(engine.settings.device_values())
+
+        assert engine.start_calibration()
+        received = []; deadline = time.monotonic() + 2.0
+        while len(received) < 50 and time.monotonic() < deadline:
+            try: received.append(samples.get(timeout=0.1))
+            except queue.Empty: pass
+        assert simulator.calibrating and len(received) >= 50
+        assert all(0 <= p <= 1023 for p in received)
+        assert not engine.mouse_injector.backend.events # Calibration never drives the pointer
+    finally:
+        engine.disconnect()
+
+
+def test_unordered_thresholds_are_not_uploaded(simulator, tmp_path):
+    engine = MouthMouseEngine(profiles_dir=str(tmp_path / "profiles"))
+    engine.INJECTION_BACKEND = "fake"
+    engine.connect(simulator.port, apply_settings=False)
+    try:
+        assert engine.apply_all_settings(wait=True)
+        engine.settings.set("NMAX", 5) # Half-typed "530": every rest sample would scroll up
+        assert engine.apply_all_settings(wait=True)
+        assert simulator.settings["NMAX"] == 550
+    finally:
+        engine.disconnect()
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiles import ProfileRepository, SqliteProfileStore
+
+
+def test_import_directory_keys_profiles_by_file_name(tmp_path):
+    directory = tmp_path / "profiles"; directory.mkdir()
+    # bob.json was copied from default.json and still carries its meta name.
+    for name, hst in (("default", 360), ("bob", 340)):
+        document = {"schema_version": 2, "profile_name_meta": "default", "saved_at": None, "settings": {"HST": hst}}
+        (directory / f"{name}.json").write_text(json.dumps(document))
+    (directory / "old1.json").write_text(json.dumps({"profile_name_meta": "x", "settings": {"HST": 300}}))
+
+    store = SqliteProfileStore(str(tmp_path / "profiles.db"))
+    try:
+        assert sorted(store.import_directory(str(directory))) == ["bob", "default", "old1"]
+        assert store.list_names() == ["bob", "default", "old1"]
+        assert store.load("bob") == {"HST": 340} and store.load("default") == {"HST": 360}
+        assert store.load_document("old1")["profile_name_meta"] == "old1"
+        assert [version for version, _, _ in store.history("default")] == [1]
+    finally:
+        store.close()
+
+
+def test_save_keeps_shared_file_modes(tmp_path):
+    repo = ProfileRepository(str(tmp_path))
+    umask = os.umask(0o022); os.umask(umask)
+    repo.save("a", {"HST": 360})
+    assert os.stat(tmp_path / "a.json").st_mode & 0o777 == 0o666 & ~umask
+    os.chmod(tmp_path / "a.json", 0o664) # Group-writable on a shared drive
+    repo.save("a", {"HST": 350})
+    assert os.stat(tmp_path / "a.json").st_mode & 0o777 == 0o664